@@ -0,0 +1,70 @@
+"""
+Pomôcky pre administráciu veľkých tabuliek (napr. riešenia počas opravovania).
+"""
+from typing import Optional
+
+from django.core.paginator import Paginator
+from django.db import connections, router, transaction
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+# Od koľkých riadkov stačí odhad počtu namiesto COUNT(*)
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimated_count(queryset: QuerySet) -> Optional[int]:
+    """
+    Odhad počtu riadkov nefiltrovaného querysetu zo štatistík PostgreSQL.
+    Pre filtrovaný queryset alebo inú databázu vráti None.
+    """
+    if queryset.query.has_filters() or queryset.query.distinct:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                       [queryset.model._meta.db_table])  # pylint: disable=protected-access
+        row = cursor.fetchone()
+    # Tabuľka bez štatistík (ešte neprebehol ANALYZE) má -1
+    if row is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Pri veľkej nefiltrovanej tabuľke počíta strany z odhadu počtu riadkov"""
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if estimate is not None and estimate >= ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class BulkListEditableMixin:
+    """
+    Zmeny z `list_editable` v zozname sa neukladajú po jednom, ale jedným
+    `bulk_update` na konci requestu. Neposielajú sa pri tom signály a nevolá
+    sa `save` modelu, `list_editable` preto smie obsahovať iba polia, na ktoré
+    nič také nereaguje.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'POST' or '_save' not in request.POST:
+            return super().changelist_view(request, extra_context)
+        request.bulk_edited_objects = []
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            response = super().changelist_view(request, extra_context)
+            if request.bulk_edited_objects:
+                self.model._default_manager.bulk_update(  # pylint: disable=protected-access
+                    request.bulk_edited_objects, self.list_editable)
+        return response
+
+    def save_model(self, request, obj, form, change):
+        edited = getattr(request, 'bulk_edited_objects', None)
+        if edited is None:
+            super().save_model(request, obj, form, change)
+        else:
+            edited.append(obj)
@@ -0,0 +1,58 @@
+"""
+Pomôcky na kešovanie malých, takmer nemenných tabuliek v rámci procesu.
+"""
+from django.core.exceptions import MultipleObjectsReturned
+from django.db import models
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+_ANY = object()
+
+
+class TableCache:
+    """
+    Celá tabuľka načítaná naraz pri prvom použití a držaná v pamäti procesu.
+    Zahodí sa pri každej zmene modelu (save, delete) a po migrácii,
+    hromadné `update` signály nevysiela, preto ho treba doplniť o `invalidate`.
+    """
+
+    def __init__(self, model: type[models.Model]):
+        self.model = model
+        self._meta = model._meta  # pylint: disable=protected-access
+        self._rows = None
+        for signal in (post_save, post_delete):
+            signal.connect(self.invalidate, sender=model, weak=False)
+        post_migrate.connect(self.invalidate, weak=False)
+
+    def invalidate(self, *args, **kwargs):
+        # pylint: disable=unused-argument
+        self._rows = None
+
+    def _load(self) -> dict:
+        rows = self._rows
+        if rows is None:
+            rows = {obj.pk: obj for obj in self._meta.default_manager.all()}
+            self._rows = rows
+        return rows
+
+    def all(self) -> list[models.Model]:
+        return list(self._load().values())
+
+    def get(self, pk=_ANY, **lookup) -> models.Model:
+        """Ako `Model.objects.get`, ale iba s rovnosťou polí a bez dotazu do databázy"""
+        rows = self._load()
+        if pk is not _ANY:
+            pk = self._meta.pk.to_python(pk)
+            candidates = [rows[pk]] if pk in rows else []
+        else:
+            candidates = rows.values()
+        matching = [
+            obj for obj in candidates
+            if all(getattr(obj, field) == value for field, value in lookup.items())
+        ]
+        if not matching:
+            raise self.model.DoesNotExist(
+                f'{self._meta.object_name} neexistuje')
+        if len(matching) > 1:
+            raise MultipleObjectsReturned(
+                f'Viacero {self._meta.object_name} pre {lookup}')
+        return matching[0]
@@ -1,25 +1,99 @@
-from django.core.mail import EmailMultiAlternatives, get_connection
-from django.template.loader import render_to_string
-
-
-def send_bulk_html_emails(emails, template, subject, context):
-    messages = []
-
-    for email in emails:
-        ctx = context
-
-        text = render_to_string(f"{template}.txt", ctx)
-        html = render_to_string(f"{template}.html", ctx)
-
-        msg = EmailMultiAlternatives(
-            subject=subject,
-            body=text,
-            from_email=None,
-            to=[email],
-        )
-        msg.attach_alternative(html, "text/html")
-        messages.append(msg)
-
-    # open **one connection** for efficiency
-    connection = get_connection()
-    connection.send_messages(messages)
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils.timezone import now
+
+from base.models import EmailContent, QueuedEmail
+
+EMAIL_BATCH_SIZE = 100
+EMAIL_MAX_ATTEMPTS = 5
+EMAIL_RETRY_DELAY = timedelta(minutes=1)
+RETRY_FIELDS = ['attempts', 'last_error', 'next_attempt_at']
+
+
+def send_bulk_html_emails(emails, template, subject, context):
+    """
+    Zaradí emaily do fronty. Šablóny sa vyrenderujú raz pre všetkých adresátov,
+    samotné odoslanie spraví príkaz send_emails mimo requestu.
+    """
+    emails = [email for email in emails if email]
+    if not emails:
+        return
+
+    with transaction.atomic():
+        content = EmailContent.objects.create(
+            subject=subject,
+            text=render_to_string(f"{template}.txt", context),
+            html=render_to_string(f"{template}.html", context),
+        )
+        QueuedEmail.objects.bulk_create(
+            QueuedEmail(content=content, recipient=email) for email in emails
+        )
+
+
+def _build_message(queued: QueuedEmail) -> EmailMultiAlternatives:
+    msg = EmailMultiAlternatives(
+        subject=queued.content.subject,
+        body=queued.content.text,
+        from_email=None,
+        to=[queued.recipient],
+    )
+    msg.attach_alternative(queued.content.html, "text/html")
+    return msg
+
+
+def _schedule_retry(queued: QueuedEmail, exc: Exception) -> None:
+    queued.attempts += 1
+    queued.last_error = str(exc)
+    queued.next_attempt_at = now() + EMAIL_RETRY_DELAY * 2 ** (queued.attempts - 1)
+
+
+def send_queued_emails(connection=None, batch_size=EMAIL_BATCH_SIZE) -> tuple[int, int]:
+    """
+    Odošle jednu dávku emailov z fronty cez jedno otvorené spojenie.
+    Neúspešné emaily sa skúsia znova s rastúcim odstupom, najviac
+    EMAIL_MAX_ATTEMPTS krát, rovnako celá dávka, ak sa spojenie nepodarí
+    otvoriť. Vráti počet odoslaných a neúspešných emailov.
+    Spojenie odovzdané zvonka ostáva otvorené pre ďalšie dávky.
+    Počíta s jediným bežiacim workerom.
+    """
+    batch = list(
+        QueuedEmail.objects.filter(
+            sent_at__isnull=True,
+            attempts__lt=EMAIL_MAX_ATTEMPTS,
+            next_attempt_at__lte=now()
+        ).select_related('content').order_by('next_attempt_at', 'pk')[:batch_size]
+    )
+    if not batch:
+        return 0, 0
+
+    own_connection = connection is None
+    connection = connection or get_connection()
+    try:
+        connection.open()
+    except Exception as exc:  # pylint: disable=broad-exception-caught
+        for queued in batch:
+            _schedule_retry(queued, exc)
+        QueuedEmail.objects.bulk_update(batch, RETRY_FIELDS)
+        return 0, len(batch)
+
+    sent, failed = [], []
+    try:
+        for queued in batch:
+            try:
+                connection.send_messages([_build_message(queued)])
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                _schedule_retry(queued, exc)
+                failed.append(queued)
+            else:
+                sent.append(queued.pk)
+    finally:
+        if own_connection:
+            connection.close()
+        QueuedEmail.objects.filter(pk__in=sent).update(
+            sent_at=now(), attempts=F('attempts') + 1)
+        QueuedEmail.objects.bulk_update(failed, RETRY_FIELDS)
+    return len(sent), len(failed)
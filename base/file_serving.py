@@ -0,0 +1,129 @@
+"""
+Posielanie uložených súborov s predpočítanými metadátami.
+
+Veľkosť a SHA-256 súboru sa spočítajú raz pri jeho uložení. Hash slúži ako
+silný ETag a je súčasťou adresy súboru, takže obsah na danej adrese sa
+nikdy nezmení a prehliadače aj proxy si ho môžu nechať natrvalo. Podporuje
+sa jeden rozsah bajtov (Range, If-Range), napr. pre pokračovanie sťahovania
+alebo postupné načítavanie PDF v prehliadači.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Optional
+
+from django.core.files import File
+from django.http import (FileResponse, HttpResponse, HttpResponseBase,
+                         StreamingHttpResponse)
+from django.utils.cache import patch_cache_control
+from django.utils.http import content_disposition_header, parse_etags
+
+CHUNK_SIZE = 64 * 1024
+# Súbor na adrese s hashom sa nemení, môže sa kešovať rok
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def file_metadata(file: File) -> tuple[int, str]:
+    """Veľkosť a SHA-256 súboru, číta sa po blokoch od začiatku"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks(CHUNK_SIZE):
+        size += len(chunk)
+        digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Začiatok a koniec (vrátane) rozsahu z hlavičky Range. Pre neplatnú,
+    neznámu alebo viacnásobnú hlavičku vráti None, teda celý súbor.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Posledných `last` bajtov
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(file: File, start: int, length: int):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def _requested_range(request, etag: str, size: int) -> Optional[tuple[int, int]]:
+    if 'Range' not in request.headers:
+        return None
+    # If-Range s iným ETagom znamená, že klient má starú verziu, dostane celý súbor
+    if_range = request.headers.get('If-Range')
+    if if_range is not None and if_range != etag:
+        return None
+    return parse_range(request.headers['Range'], size)
+
+
+def _range_response(file: File, start: int, end: int, size: int,
+                    filename: str) -> StreamingHttpResponse:
+    file.open('rb')
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = StreamingHttpResponse(
+        _read_range(file, start, end - start + 1), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Disposition'] = content_disposition_header(False, filename)
+    return response
+
+
+def serve_file(request, file: File, size: int, etag: str,
+               immutable: bool = False) -> HttpResponseBase:
+    """
+    Odpoveď so súborom `file` známej veľkosti. Pri zhode If-None-Match
+    vráti 304, pri platnom Range iba požadovanú časť (206).
+    """
+    filename = os.path.basename(file.name)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponse(status=304)
+    else:
+        try:
+            byte_range = _requested_range(request, etag, size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if byte_range is not None:
+            response = _range_response(file, *byte_range, size, filename)
+        else:
+            file.open('rb')
+            response = FileResponse(file, filename=filename)
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    if immutable:
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
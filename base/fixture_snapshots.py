@@ -0,0 +1,134 @@
+"""
+Snímky fixtures pre testy.
+
+Django pri každej testovacej triede s `fixtures` znova spustí loaddata,
+teda parsuje JSON a ukladá objekty po jednom (školy sú tisíce riadkov).
+Pri prvom načítaní každého súboru fixtures sa preto zapamätajú riadky,
+ktoré pridal alebo zmenil (aj vedľajšie efekty signálov, napr. vyhľadávací
+index), a ďalšie triedy ich iba zapíšu hromadným INSERTom. Zapína ich
+testovací runner (base.test_runner), bežný loaddata sa nemení.
+"""
+from typing import Callable
+
+from django.apps import apps
+from django.db import connections, models
+from django.db.models.signals import post_save
+
+# Limit počtu parametrov v jednom dotaze na SQLite
+CHUNK_SIZE = 500
+
+_enabled = False  # pylint: disable=invalid-name
+_snapshots: dict[tuple[str, str], 'FixtureSnapshot'] = {}
+
+
+def enable() -> None:
+    global _enabled  # pylint: disable=global-statement
+    _enabled = True
+
+
+def disable() -> None:
+    global _enabled  # pylint: disable=global-statement
+    _enabled = False
+    _snapshots.clear()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _tables(connection) -> dict[str, type[models.Model]]:
+    existing = set(connection.introspection.table_names())
+    tables = {}
+    for model in apps.get_models(include_auto_created=True):
+        opts = model._meta  # pylint: disable=protected-access
+        if opts.managed and not opts.proxy and opts.db_table in existing:
+            tables.setdefault(opts.db_table, model)
+    return tables
+
+
+def _read(connection, model) -> tuple[list[str], dict]:
+    """Stĺpce a riadky tabuľky podľa primárneho kľúča"""
+    opts = model._meta  # pylint: disable=protected-access
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT * FROM {connection.ops.quote_name(opts.db_table)}')
+        columns = [column[0] for column in cursor.description]
+        pk_index = columns.index(opts.pk.column)
+        return columns, {row[pk_index]: row for row in cursor.fetchall()}
+
+
+def _chunks(items: list, size: int = CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class FixtureSnapshot:
+    """Riadky, ktoré pridalo alebo zmenilo načítanie jedného súboru fixtures"""
+
+    def __init__(self, rows: dict[type[models.Model], tuple[list[str], list[tuple]]],
+                 object_count: int):
+        self.rows = rows
+        self.object_count = object_count
+
+    @property
+    def models(self) -> set[type[models.Model]]:
+        return set(self.rows)
+
+    @classmethod
+    def capture(cls, using: str, load_fixture: Callable[[], int]) -> 'FixtureSnapshot':
+        """
+        Zavolá `load_fixture` (bežné načítanie, vráti počet objektov)
+        a zapamätá si, čo zmenilo
+        """
+        connection = connections[using]
+        tables = _tables(connection).values()
+        before = {model: _read(connection, model)[1] for model in tables}
+        object_count = load_fixture()
+        rows = {}
+        for model in tables:
+            columns, after = _read(connection, model)
+            changed = [row for pk, row in after.items() if before[model].get(pk) != row]
+            if changed:
+                rows[model] = (columns, changed)
+        return cls(rows, object_count)
+
+    def restore(self, using: str) -> None:
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            for model, (columns, rows) in self.rows.items():
+                opts = model._meta  # pylint: disable=protected-access
+                table = quote(opts.db_table)
+                pk_index = columns.index(opts.pk.column)
+                for chunk in _chunks(rows):
+                    cursor.execute(
+                        f'DELETE FROM {table} WHERE {quote(opts.pk.column)} '
+                        f'IN ({", ".join(["%s"] * len(chunk))})',
+                        [row[pk_index] for row in chunk])
+                cursor.executemany(
+                    f'INSERT INTO {table} ({", ".join(map(quote, columns))}) '
+                    f'VALUES ({", ".join(["%s"] * len(columns))})', rows)
+
+        # Cache a indexy v pamäti sa zneplatňujú podľa modelu, stačí im
+        # jeden signál za model. created=False, aby sa nezopakovali akcie
+        # pri vytvorení objektu, ich výsledok už je v snímke.
+        for model in self.rows:
+            if model._meta.auto_created:  # pylint: disable=protected-access
+                continue
+            instance = model._base_manager.using(using).first()  # pylint: disable=protected-access
+            if instance is not None:
+                post_save.send(sender=model, instance=instance, created=False,
+                               raw=True, using=using, update_fields=None)
+
+
+def load(using: str, fixture_label: str, load_fixture: Callable[[], int]) -> FixtureSnapshot:
+    """
+    Načíta súbor fixtures zo snímky, pri prvom použití ju vytvorí pomocou
+    `load_fixture`, ktorý súbor načíta bežne a vráti počet objektov.
+    """
+    key = (using, fixture_label)
+    snapshot = _snapshots.get(key)
+    if snapshot is None:
+        snapshot = _snapshots[key] = FixtureSnapshot.capture(using, load_fixture)
+    else:
+        snapshot.restore(using)
+    return snapshot
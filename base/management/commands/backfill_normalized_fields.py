@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.core.management import BaseCommand
+
+from base.models import backfill_normalized_fields, normalized_fields
+
+
+class Command(BaseCommand):
+    help = 'Prepočíta normalizované (vyhľadávacie) stĺpce všetkých modelov'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in apps.get_models():
+            if not normalized_fields(model):
+                continue
+            count = backfill_normalized_fields(
+                model, batch_size=options['batch_size'])
+            self.stdout.write(f'{model._meta.label}: {count}')  # pylint: disable=protected-access
+        self.stdout.write(self.style.SUCCESS(
+            'Normalizované stĺpce boli prepočítané'))
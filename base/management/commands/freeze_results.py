@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand, CommandError
+
+from competition.models import Competition
+from competition.results import freeze_competition_year
+
+
+class Command(BaseCommand):
+    help = 'Uzavrie výsledky všetkých sérií a semestrov ročníka súťaže'
+
+    def add_arguments(self, parser):
+        parser.add_argument('competition', type=int, help='id súťaže')
+        parser.add_argument('year', type=int, help='ročník')
+
+    def handle(self, *args, **options):
+        try:
+            competition = Competition.objects.get(pk=options['competition'])
+        except Competition.DoesNotExist as exc:
+            raise CommandError('Súťaž neexistuje') from exc
+
+        blockers = freeze_competition_year(competition, options['year'])
+        if blockers:
+            for series, diagnostics in blockers.items():
+                self.stderr.write(f'{series}:')
+                for blocker in diagnostics.messages():
+                    self.stderr.write(f'  {blocker}')
+            raise CommandError('Ročník sa nepodarilo uzavrieť')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{competition.name}, {options["year"]}. ročník bol uzavretý'))
@@ -0,0 +1,24 @@
+from concurrent.futures import as_completed
+
+from django.core.management import BaseCommand
+
+from competition.models import Solution
+from competition.previews import get_executor, process_in_worker
+
+
+class Command(BaseCommand):
+    help = 'Doplní počet strán a náhľady riešení, ktoré ich ešte nemajú'
+
+    def handle(self, *args, **options):
+        pks = list(Solution.objects.exclude(solution='').filter(
+            page_count__isnull=True).values_list('pk', flat=True))
+        executor = get_executor()
+        futures = [executor.submit(process_in_worker, pk) for pk in pks]
+        failed = 0
+        for done, future in enumerate(as_completed(futures), start=1):
+            failed += not future.result()
+            self.stdout.write(f'Riešenia: {done}/{len(pks)}')
+        if failed:
+            self.stdout.write(self.style.WARNING(
+                f'Náhľady {failed} riešení sa nepodarilo vytvoriť, podrobnosti sú v logu'))
+        self.stdout.write(self.style.SUCCESS('Náhľady riešení boli doplnené'))
@@ -1,21 +1,24 @@
 import datetime
 import json
-import re
+import multiprocessing
+import os
 import sqlite3
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from os import path
 
 import pytz
-import unidecode
 from allauth.account.models import EmailAddress
-from django.core.management import BaseCommand
-from django.db.models import Q
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import connection, connections, transaction
 from django.forms.models import model_to_dict
 from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
 
 from competition.models import (Competition, EventRegistration, Grade, Problem,
-                                Semester, Series, Solution)
+                                Semester, Series, Solution, grade_cache)
 from competition.utils.school_year_manipulation import get_school_year_by_date
 from personal.models import Profile, School
+from personal.school_matching import SchoolMatcher
 from user.models import User
 
 SERIES_QUERY = '''
@@ -37,10 +40,11 @@ PROBLEM_QUERY = '''
     INNER JOIN problems_problem AS problem ON problem.id=inset.problem_id
 '''
 
+# id súťaže v starej databáze -> id súťaže v novej databáze
 COMPETITION_ID_MAPPING = {
-    1: Competition.objects.get(pk=1),
-    2: Competition.objects.get(pk=3),
-    3: Competition.objects.get(pk=2)
+    1: 1,
+    2: 3,
+    3: 2
 }
 
 SCHOOL_QUERY = '''
@@ -68,6 +72,11 @@ SEMESTERREG_QUERY = '''
     FROM profiles_userseasonregistration
 '''
 
+BATCH_SIZE = 1000
+
+SCHOOL_MAPPING_FILE = path.join(
+    'base', 'management', 'commands', 'schools_mapping.json')
+
 SUM_METHOD_DICT = {
     'SUCET_SERIE_35': '',
     'SUCET_SERIE_32': '',
@@ -92,264 +101,400 @@ def to_school_year(year, competition):
     )
 
 
-def get_type(name):
-    clean_name = unidecode.unidecode(name.lower())
-    if 'gymnazium' in clean_name:
-        return 0
-    if 'stredna' in clean_name or 'ss' in clean_name:
-        return 1
-    if 'zakladna' in clean_name or 'zs' in clean_name:
-        return 2
-    if 'spojena skola' in clean_name:
-        return 3
-    return 4
-
-
-def estimate_school(school_dict):
-    school_type = get_type(school_dict['school_name'])
-    city_regex = r'^'+re.escape(school_dict['school_city'])+r'(-.*)?$'
-    schools_in_city = School.objects.filter(
-        Q(zip_code=school_dict['school_zip_code'].replace(' ', '')) |
-        Q(city__regex=city_regex)
-    )
-    schools = schools_in_city.filter(
-        name__iexact=school_dict['school_name'].lower())
-    if schools.count() == 1:
-        return schools.first()
-
-    # Filter by type
-    schools = [school for school in schools_in_city if get_type(
-        school.name) == school_type]
-    if len(schools) == 1:
-        return schools[0]
-
-    # Filter by address
-    def match_address(addr1, addr2):
-        def parse(addr):
-            street = ''.join(filter(lambda ch: ch.isalpha(), addr))
-            street = unidecode.unidecode(street.lower()).replace(' ', '')
-            number = re.search(r'(\d+/)?(\d+)', addr)
-            if number is not None:
-                number = number.group(2)
-            return street, number
-        street1, number1 = parse(addr1)
-        street2, number2 = parse(addr2)
-        if street1 == street2:
-            if number1 is None or number2 is None or number1 == number2:
-                return True
-        return False
-
-    schools = [school for school in schools
-               if match_address(school.street, school_dict['school_street'])]
-    if len(schools) == 1:
-        return schools[0]
-    raise School.DoesNotExist
+def estimate_school(school_dict, matcher: SchoolMatcher) -> School:
+    code = matcher.match(school_dict['school_name'], school_dict['school_street'],
+                         school_dict['school_city'], school_dict['school_zip_code'])
+    if code is None:
+        raise School.DoesNotExist
+    return School.objects.get(pk=code)
+
+
+class Stage:  # pylint: disable=too-few-public-methods
+    """Krok importu, beží v jednej transakcii a vráti mapovanie starých id na nové"""
+
+    def __init__(self, name: str, depends_on: tuple[str, ...] = ()):
+        self.name = name
+        self.depends_on = depends_on
+
+
+# Poradie zodpovedá sekvenčnému behu, paralelne môžu bežať kroky,
+# ktorých závislosti sú už hotové
+STAGES = [
+    Stage('schools'),
+    Stage('competitions'),
+    Stage('semesters', ('competitions',)),
+    Stage('series', ('semesters',)),
+    Stage('problems', ('series',)),
+    Stage('users', ('schools',)),
+    Stage('registrations', ('schools', 'semesters', 'users')),
+    Stage('solutions', ('problems', 'users', 'registrations')),
+]
+
+
+class ImportState:
+    """
+    Stav importu v JSON súbore: dokončené kroky a ich mapovania id.
+    Zapisuje sa atomicky po každom dokončenom kroku.
+    """
+
+    def __init__(self, file_name: str, source: str):
+        self.file_name = file_name
+        self.source = source
+        self.stages = {}
+        if path.exists(file_name):
+            with open(file_name, 'r', encoding='utf-8') as state_file:
+                state = json.load(state_file)
+            if state['source'] != source:
+                raise CommandError(
+                    f'Stav importu {file_name} patrí k databáze {state["source"]}')
+            self.stages = state['stages']
+
+    def is_done(self, name: str) -> bool:
+        return name in self.stages
+
+    def mappings(self) -> dict[str, dict]:
+        return {name: stage['mapping'] for name, stage in self.stages.items()}
+
+    def checkpoint(self, name: str, mapping: dict) -> None:
+        self.stages[name] = {'finished_at': now().isoformat(), 'mapping': mapping}
+        temporary = f'{self.file_name}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as state_file:
+            json.dump({'source': self.source, 'stages': self.stages}, state_file)
+        os.replace(temporary, self.file_name)
+
+
+def _dict_factory(cursor, row):
+    row_dict = {}
+    for idx, col in enumerate(cursor.description):
+        row_dict[col[0]] = row[idx]
+    return row_dict
+
+
+def _run_stage_in_worker(name: str, source: str, mappings: dict, batch_size: int,
+                         match_schools: bool) -> dict:
+    """Spustí krok v samostatnom procese (fork už nastaveného Djanga)"""
+    command = Command()
+    command.batch_size = batch_size
+    command.match_schools = match_schools
+    return command.run_stage(name, source, mappings)
 
 
 class Command(BaseCommand):
+    help = (
+        'Načíta súťaže, používateľov, registrácie a riešenia zo starej databázy. '
+        'Dokončené kroky sa ukladajú do súboru so stavom, po chybe sa import '
+        'spustí znova od prvého nedokončeného kroku.'
+    )
 
-    def _load_semester(self, conn, competition_id_mapping):
-        semester_id_mapping = {}
+    batch_size = BATCH_SIZE
+    match_schools = False
+
+    def _progress(self, label, done, total):
+        self.stdout.write(f'{label}: {done}/{total}')
+
+    def _bulk_create(self, model, objects, label):
+        """Uloží objekty po dávkach a vráti ich (s pk) v pôvodnom poradí"""
+        created = []
+        for start in range(0, len(objects), self.batch_size):
+            created += model.objects.bulk_create(
+                objects[start:start + self.batch_size])
+            self._progress(label, len(created), len(objects))
+        return created
+
+    def _fetch(self, conn, query):
         cursor = conn.cursor()
-        cursor.execute(SEMESTER_QUERY)
-        semesters = cursor.fetchall()
-        for semester in semesters:
+        cursor.execute(query)
+        return cursor.fetchall()
+
+    @staticmethod
+    def _school_id(school_map, old_id):
+        return school_map.get(str(old_id), school_map['None'])
+
+    def _stage_schools(self, conn, maps):
+        # pylint: disable=unused-argument
+        with open(SCHOOL_MAPPING_FILE, 'r', encoding='utf-8') as mapping_file:
+            # JSON má hodnoty ako reťazce, primárne kľúče škôl sú čísla
+            mapping = {key: int(pk) for key, pk in json.load(mapping_file).items()}
+        if self.match_schools:
+            # Ručné mapovanie má prednosť pred odhadnutým
+            mapping = {**self._create_school_mapping(conn), **mapping}
+        existing = set(School.objects.filter(
+            pk__in=set(mapping.values())).values_list('pk', flat=True))
+        missing = {key: pk for key, pk in mapping.items() if pk not in existing}
+        if missing:
+            raise CommandError(f'Neexistujúce školy v mapovaní: {missing}')
+        mapping['None'] = School.objects.get_unspecified_value().pk
+        return mapping
+
+    def _stage_competitions(self, conn, maps):
+        # pylint: disable=unused-argument
+        competitions = set(Competition.objects.filter(
+            pk__in=COMPETITION_ID_MAPPING.values()).values_list('pk', flat=True))
+        return {
+            str(old_id): new_id for old_id, new_id in COMPETITION_ID_MAPPING.items()
+            if new_id in competitions
+        }
+
+    def _stage_semesters(self, conn, maps):
+        # Semester dedí od Event (multi-table), bulk_create preň nejde,
+        # semestrov je však iba niekoľko desiatok
+        competitions = Competition.objects.in_bulk(maps['competitions'].values())
+        semester_id_mapping = {}
+        for semester in self._fetch(conn, SEMESTER_QUERY):
+            competition = competitions[
+                maps['competitions'][str(semester['competition_id'])]]
             new_semester = Semester(
                 season_code=semester['number']-1,
-                competition=competition_id_mapping[semester['competition_id']],
+                competition=competition,
                 year=semester['year'],
-                school_year=to_school_year(
-                    semester['year'],
-                    competition_id_mapping[semester['competition_id']]),
+                school_year=to_school_year(semester['year'], competition),
                 start=localize(semester['start']),
                 end=localize(semester['end'])
             )
             new_semester.save()
-            semester_id_mapping[semester['id']] = new_semester
+            semester_id_mapping[str(semester['id'])] = new_semester.pk
+        self._progress('Semestre', len(semester_id_mapping),
+                       len(semester_id_mapping))
         return semester_id_mapping
 
-    def _load_series(self, conn, semester_id_mapping):
-        series_id_mapping = {}
-        cursor = conn.cursor()
-        cursor.execute(SERIES_QUERY)
-        series_all = cursor.fetchall()
-        for series in series_all:
-            new_series = Series(
-                semester=semester_id_mapping[series['season_id']],
+    def _stage_series(self, conn, maps):
+        series_all = self._fetch(conn, SERIES_QUERY)
+        new_series = self._bulk_create(Series, [
+            Series(
+                semester_id=maps['semesters'][str(series['season_id'])],
                 order=series['number'],
                 deadline=localize(series['submission_deadline']),
-                complete=False,
                 sum_method=SUM_METHOD_DICT[series['sum_method']]
-
             )
-            new_series.save()
-            series_id_mapping[series['id']] = new_series
-        return series_id_mapping
-
-    def _load_problems(self, conn, series_id_mapping):
-        problem_id_mapping = {}
-        cursor = conn.cursor()
-        cursor.execute(PROBLEM_QUERY)
-        problems = cursor.fetchall()
-        for problem in problems:
-            new_problem = Problem(
+            for series in series_all
+        ], 'Série')
+        return {
+            str(series['id']): new.pk for series, new in zip(series_all, new_series)
+        }
+
+    def _stage_problems(self, conn, maps):
+        """Mapovanie id úlohy -> (id novej úlohy, id semestra)"""
+        problems = self._fetch(conn, PROBLEM_QUERY)
+        new_problems = self._bulk_create(Problem, [
+            Problem(
                 text=problem['text'],
-                series=series_id_mapping[problem['series_id']],
+                series_id=maps['series'][str(problem['series_id'])],
                 order=problem['position']
             )
-            new_problem.save()
-            problem_id_mapping[problem['id']] = new_problem
-        return problem_id_mapping
-
-    def _load_competitions(self, conn):
-        semester_id_mapping = self._load_semester(conn, COMPETITION_ID_MAPPING)
-        series_id_mapping = self._load_series(conn, semester_id_mapping)
-        problem_id_mapping = self._load_problems(conn, series_id_mapping)
-        return semester_id_mapping, series_id_mapping, problem_id_mapping
-
-    def _load_users(self, conn, school_id_map):
-        user_id_mapping = {}
-        cursor = conn.cursor()
-        cursor.execute(USERS_QUERY)
-        users = cursor.fetchall()
-        for user in users:
-            new_user = None
-            if user['email'] != '':
-                new_user = User.objects.create(
-                    email=user['email'],
-                    verified_email=True,
-                    is_staff=user['is_staff'],
-                    is_active=user['is_active'],
-                    date_joined=localize(user['date_joined']),
-
-                )
-
-                EmailAddress.objects.create(
-                    user=new_user,
-                    email=user['email'],
-                    verified=True,
-                    primary=True
-                )
-                new_user.password = user['password']
-                new_user.save()
-            try:
-                grade = Grade.objects.get(
-                    tag=user['classlevel']).get_year_of_graduation_by_date()
-            except Grade.DoesNotExist:
-                grade = 2000
-            profile = Profile.objects.create(
+            for problem in problems
+        ], 'Úlohy')
+        semester_by_series = dict(Series.objects.filter(
+            pk__in=maps['series'].values()).values_list('pk', 'semester_id'))
+        return {
+            str(problem['id']): (new.pk, semester_by_series[new.series_id])
+            for problem, new in zip(problems, new_problems)
+        }
+
+    @staticmethod
+    def _grade(tag, default=None):
+        try:
+            return grade_cache.get(tag=tag)
+        except Grade.DoesNotExist:
+            return default
+
+    def _stage_users(self, conn, maps):
+        """Mapovanie id používateľa -> id profilu"""
+        users = self._fetch(conn, USERS_QUERY)
+        with_email = [user for user in users if user['email'] != '']
+        new_users = self._bulk_create(User, [
+            User(
+                email=user['email'],
+                verified_email=True,
+                is_staff=user['is_staff'],
+                is_active=user['is_active'],
+                date_joined=localize(user['date_joined']),
+                # Heslo je už zahashované
+                password=user['password']
+            )
+            for user in with_email
+        ], 'Používatelia')
+        self._bulk_create(EmailAddress, [
+            EmailAddress(user=new_user, email=new_user.email,
+                         verified=True, primary=True)
+            for new_user in new_users
+        ], 'Emailové adresy')
+        user_by_old_id = {
+            user['id']: new_user for user, new_user in zip(with_email, new_users)
+        }
+
+        def year_of_graduation(tag):
+            grade = self._grade(tag)
+            return 2000 if grade is None else grade.get_year_of_graduation_by_date()
+
+        profiles = self._bulk_create(Profile, [
+            Profile(
                 first_name=user['first_name'],
                 last_name=user['last_name'],
-                user=new_user,
-                school=school_id_map.get(
-                    user['school_id'], School.objects.get_unspecified_value()),
-                year_of_graduation=grade,
+                user=user_by_old_id.get(user['id']),
+                school_id=self._school_id(maps['schools'], user['school_id']),
+                year_of_graduation=year_of_graduation(user['classlevel']),
                 phone=user['phone_number'] or '',
                 parent_phone=user['parent_phone_number'] or ''
             )
-            user_id_mapping[user['id']] = profile
-        return user_id_mapping
+            for user in users
+        ], 'Profily')
+        return {str(user['id']): profile.pk for user, profile in zip(users, profiles)}
 
     def _create_school_mapping(self, conn):
-        school_id_mapping = {None: School.objects.get_unspecified_value()}
-        cursor = conn.cursor()
-        cursor.execute(SCHOOL_QUERY)
-        schools = cursor.fetchall()
+        school_id_mapping = {'None': School.objects.get_unspecified_value().pk}
+        schools = self._fetch(conn, SCHOOL_QUERY)
+        matcher = SchoolMatcher()
         with open('school.csv', 'w', encoding='utf-8') as school_file:
             success_counter = 0
             for school in schools:
                 try:
-                    school_id = estimate_school(school)
-                    school_id_mapping[school['id']] = school_id.pk
+                    school_id = estimate_school(school, matcher)
+                    school_id_mapping[str(school['id'])] = school_id.pk
                     success_counter += 1
                 except School.DoesNotExist:
                     print(f'Nepodarilo sa matchnút {school}')
-                    school_id_mapping[school['id']
-                                      ] = None  # School.objects.get_unspecified_value()
+                    school_id = None
                 old_school = ';'.join([str(x) for x in school.values()])
                 new_school = ';'.join([str(x) for x in model_to_dict(
-                    school_id).values()]) if school_id_mapping[school['id']] is not None else ';'*7
+                    school_id).values()]) if school_id is not None else ';'*7
                 school_file.write(
-                    old_school+';' + str(school_id_mapping[school['id']])+';'+new_school+'\n')
+                    old_school+';' + str(school_id and school_id.pk)+';'+new_school+'\n')
             print(
-                f'Úspešne pripárovaných {success_counter}/{len(school_id_mapping)}')
+                f'Úspešne pripárovaných {success_counter}/{len(schools)}')
         return school_id_mapping
 
-    def _load_user_registrations(self, conn, user_id_map, season_id_map, school_id_map):
-        cursor = conn.cursor()
-        cursor.execute(SEMESTERREG_QUERY)
-        user_registrations = cursor.fetchall()
-        for user_registration in user_registrations:
-            try:
-                grade = Grade.objects.get(tag=user_registration['classlevel'])
-            except Grade.DoesNotExist:
-                grade = Grade.objects.get(tag='XX')
-            EventRegistration.objects.create(
-                profile=user_id_map[user_registration['user_id']],
-                school=school_id_map[user_registration['school_id']],
-                grade=grade,
-                event=season_id_map[user_registration['season_id']]
+    def _stage_registrations(self, conn, maps):
+        """Mapovanie 'id semestra:id profilu' -> id registrácie"""
+        user_registrations = self._fetch(conn, SEMESTERREG_QUERY)
+        unknown_grade = grade_cache.get(tag='XX')
+        registrations = self._bulk_create(EventRegistration, [
+            EventRegistration(
+                profile_id=maps['users'][str(user_registration['user_id'])],
+                school_id=self._school_id(
+                    maps['schools'], user_registration['school_id']),
+                grade=self._grade(user_registration['classlevel'], unknown_grade),
+                event_id=maps['semesters'][str(user_registration['season_id'])]
             )
-
-    def _load_solutions(self, conn, problem_id_map, user_id_map):
-        cursor = conn.cursor()
-        cursor.execute(SOLUTION_QUERY)
-        solutions = cursor.fetchall()
-        for solution in solutions:
-            try:
-                Solution.objects.create(
-                    problem=problem_id_map[solution['problem_id']],
-                    semester_registration=EventRegistration.objects.get(
-                        event=problem_id_map[solution['problem_id']
-                                             ].series.semester,
-                        profile=user_id_map[solution['user_id']]),
-                    score=solution['score'],
-                    uploaded_at=solution['added_at']
-                )
-            except EventRegistration.DoesNotExist:
-                print(problem_id_map[solution['problem_id']
-                                     ].series.semester)
-                print(user_id_map[solution['user_id']])
-                print('-'*30)
-
-    def _get_school_mapping_from_file(self, file_name):
-        with open(file_name, 'r', encoding='utf-8') as mapping_file:
-            mapping = json.load(mapping_file)
-        new_mapping = {None: School.objects.get_unspecified_value()}
-        for key in mapping:
-            new_mapping[int(key)] = School.objects.get(pk=mapping[key])
-        return new_mapping
+            for user_registration in user_registrations
+        ], 'Registrácie')
+        return {
+            f'{registration.event_id}:{registration.profile_id}': registration.pk
+            for registration in registrations
+        }
+
+    def _stage_solutions(self, conn, maps):
+        solutions = []
+        for solution in self._fetch(conn, SOLUTION_QUERY):
+            problem_id, semester_id = maps['problems'][str(solution['problem_id'])]
+            profile_id = maps['users'][str(solution['user_id'])]
+            registration_id = maps['registrations'].get(f'{semester_id}:{profile_id}')
+            if registration_id is None:
+                self.stderr.write(
+                    f'Chýba registrácia profilu {profile_id} do semestra {semester_id}')
+                continue
+            solutions.append(Solution(
+                problem_id=problem_id,
+                semester_registration_id=registration_id,
+                score=solution['score'],
+                uploaded_at=solution['added_at']
+            ))
+        created = self._bulk_create(Solution, solutions, 'Riešenia')
+        return {'count': len(created)}
+
+    def run_stage(self, name: str, source: str, mappings: dict) -> dict:
+        """Spustí jeden krok nad starou databázou v transakcii"""
+        conn = sqlite3.connect(source)
+        conn.row_factory = _dict_factory
+        try:
+            with transaction.atomic():
+                return getattr(self, f'_stage_{name}')(conn, mappings)
+        finally:
+            conn.close()
 
     def add_arguments(self, parser):
         # Positional arguments
         parser.add_argument('db', type=str)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--state', type=str,
+            help='Súbor so stavom importu (predvolene <db>.import.json)')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Zahodí uložený stav a začne import od začiatku')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Počet procesov pre nezávislé kroky (nie pre SQLite)')
+        parser.add_argument(
+            '--match-schools', action='store_true',
+            help='Školy chýbajúce v mapovaní odhadne podľa názvu a adresy')
 
     def handle(self, *args, **options):
-        conn = None
-        try:
-            conn = sqlite3.connect(options['db'])
-
-            def dict_factory(cursor, row):
-                row_dict = {}
-                for idx, col in enumerate(cursor.description):
-                    row_dict[col[0]] = row[idx]
-                return row_dict
-            conn.row_factory = dict_factory
-            semester_id_map, _, problem_id_map = self._load_competitions(
-                conn)
-            # In case of auto-mapping
-            # school_id_map = self._create_school_mapping(conn)
-            # Save mapping
-            # json.dump(school_id_map, open(
-            #     'schools.json', 'w', encoding='utf-8'))
-            school_id_map = self._get_school_mapping_from_file(
-                path.join('base', 'management', 'commands', 'schools_mapping.json'))
-            user_id_map = self._load_users(conn, school_id_map)
-            print(f'Načítaných {len(user_id_map)} používateľov')
-            self._load_user_registrations(
-                conn, user_id_map, semester_id_map, school_id_map)
-            print('Načítané registrácie')
-            self._load_solutions(conn, problem_id_map, user_id_map)
-        finally:
-            if conn:
-                conn.close()
+        self.batch_size = options['batch_size']
+        self.match_schools = options['match_schools']
+        source = path.abspath(options['db'])
+        state_file = options['state'] or f'{source}.import.json'
+        if options['restart'] and path.exists(state_file):
+            os.remove(state_file)
+        state = ImportState(state_file, source)
+        for name in state.stages:
+            self.stdout.write(f'Krok {name} je už hotový, preskakujem')
+
+        workers = options['workers']
+        if workers > 1 and connection.vendor == 'sqlite':
+            self.stdout.write('SQLite nezvládne súbežný zápis, kroky pobežia postupne')
+            workers = 1
+        if workers > 1:
+            failed = self._run_parallel(state, source, workers)
+        else:
+            failed = self._run_sequential(state, source)
+        if failed:
+            raise CommandError(
+                f'Import zlyhal v kroku {", ".join(failed)}. Dokončené kroky sú '
+                f'uložené v {state_file}, po oprave spusti príkaz znova.')
+
+        # bulk_create neposiela signály, vyhľadávací index sa prepočíta naraz
+        call_command('rebuild_search_index', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS('Import dokončený'))
+
+    def _ready_stages(self, state, running=()):
+        return [stage for stage in STAGES
+                if not state.is_done(stage.name) and stage.name not in running
+                and all(state.is_done(dependency) for dependency in stage.depends_on)]
+
+    def _run_sequential(self, state, source) -> list[str]:
+        while ready := self._ready_stages(state):
+            stage = ready[0]
+            self.stdout.write(f'Krok {stage.name}')
+            try:
+                mapping = self.run_stage(stage.name, source, state.mappings())
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                self.stderr.write(f'Krok {stage.name} zlyhal: {exc!r}')
+                return [stage.name]
+            state.checkpoint(stage.name, mapping)
+        return []
+
+    def _run_parallel(self, state, source, workers) -> list[str]:
+        failed = []
+        running = {}
+        # Deti dedia nastavené Django, nie však otvorené spojenie do databázy
+        connections.close_all()
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) \
+                as executor:
+            while True:
+                if not failed:
+                    for stage in self._ready_stages(state, running.values()):
+                        self.stdout.write(f'Krok {stage.name}')
+                        future = executor.submit(
+                            _run_stage_in_worker, stage.name, source,
+                            state.mappings(), self.batch_size, self.match_schools)
+                        running[future] = stage.name
+                if not running:
+                    return failed
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        state.checkpoint(name, future.result())
+                    except Exception as exc:  # pylint: disable=broad-exception-caught
+                        self.stderr.write(f'Krok {name} zlyhal: {exc!r}')
+                        failed.append(name)
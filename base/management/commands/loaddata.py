@@ -0,0 +1,49 @@
+from django.core import serializers
+from django.core.management.commands import loaddata
+from django.db import connections
+
+from base import fixture_snapshots
+
+
+class Command(loaddata.Command):
+    """
+    loaddata, ktorý v testoch načítava už raz načítané súbory fixtures
+    zo snímky (pozri base.fixture_snapshots)
+    """
+
+    def loaddata(self, fixture_labels):
+        # pylint: disable=attribute-defined-outside-init
+        if (not fixture_snapshots.is_enabled() or self.app_label or self.format
+                or self.excluded_models or self.excluded_apps):
+            super().loaddata(fixture_labels)
+            return
+
+        # Rovnaký priebeh ako v pôvodnom loaddata, iba po súboroch
+        connection = connections[self.using]
+        self.fixture_count = 0
+        self.loaded_object_count = 0
+        self.fixture_object_count = 0
+        self.models = set()
+        self.serialization_formats = serializers.get_public_serializer_formats()
+        self.objs_with_deferred_fields = []
+        with connection.constraint_checks_disabled():
+            for fixture_label in fixture_labels:
+                snapshot = fixture_snapshots.load(
+                    self.using, fixture_label, lambda label=fixture_label: self._load_label(label))
+                self.models |= snapshot.models
+            for obj in self.objs_with_deferred_fields:
+                obj.save_deferred_fields(using=self.using)
+
+        try:
+            connection.check_constraints(
+                table_names=[model._meta.db_table for model in self.models])  # pylint: disable=protected-access
+        except Exception as exc:
+            exc.args = (f'Problem installing fixtures: {exc}',)
+            raise
+        if self.models:
+            self.reset_sequences(connection, self.models)
+
+    def _load_label(self, fixture_label) -> int:
+        loaded = self.loaded_object_count
+        self.load_label(fixture_label)
+        return self.loaded_object_count - loaded
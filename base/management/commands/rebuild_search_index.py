@@ -0,0 +1,11 @@
+from django.core.management import BaseCommand
+
+from base.search import search_index
+
+
+class Command(BaseCommand):
+    help = 'Prepočíta celý vyhľadávací index'
+
+    def handle(self, *args, **options):
+        search_index.rebuild()
+        self.stdout.write(self.style.SUCCESS('Vyhľadávací index bol prepočítaný'))
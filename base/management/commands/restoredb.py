@@ -77,3 +77,5 @@ class Command(BaseCommand):
                      'info_banner',
                      'events'
                      )
+        call_command('backfill_normalized_fields')
+        call_command('rebuild_search_index')
@@ -0,0 +1,42 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management import BaseCommand
+
+from base.emails import EMAIL_BATCH_SIZE, send_queued_emails
+
+
+class Command(BaseCommand):
+    help = 'Odošle emaily čakajúce vo fronte cez jedno spojenie so serverom'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true',
+                            help='bežať stále a priebežne odosielať nové emaily')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='počet sekúnd čakania, keď je fronta prázdna')
+        parser.add_argument('--batch-size', type=int, default=EMAIL_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        connection = None
+        try:
+            while True:
+                if connection is None:
+                    # Otvorí ho až send_queued_emails, ktorý zvládne aj nedostupný server
+                    connection = get_connection()
+                sent, failed = send_queued_emails(
+                    connection, options['batch_size'])
+                if sent or failed:
+                    self.stdout.write(
+                        f'Odoslaných emailov: {sent}, neúspešných: {failed}')
+                if failed:
+                    # Spojenie mohlo spadnúť, ďalšia dávka pôjde cez nové
+                    connection.close()
+                    connection = None
+                if sent:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            if connection is not None:
+                connection.close()
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='predmet')),
+                ('text', models.TextField(verbose_name='text')),
+                ('html', models.TextField(verbose_name='html')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='vytvorené')),
+            ],
+            options={
+                'verbose_name': 'obsah emailu',
+                'verbose_name_plural': 'obsahy emailov',
+            },
+        ),
+        migrations.CreateModel(
+            name='QueuedEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='adresát')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='odoslané')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='počet pokusov')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='ďalší pokus')),
+                ('last_error', models.TextField(blank=True, verbose_name='posledná chyba')),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='base.emailcontent', verbose_name='obsah')),
+            ],
+            options={
+                'verbose_name': 'email vo fronte',
+                'verbose_name_plural': 'emaily vo fronte',
+                'indexes': [models.Index(fields=['sent_at', 'next_attempt_at'], name='base_queued_sent_at_2fdc6d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:18
+
+import django.db.models.deletion
+from django.db import OperationalError, migrations, models
+
+POSTGRESQL_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX base_searchindexentry_document_trgm '
+    'ON base_searchindexentry USING gin (document gin_trgm_ops)',
+]
+
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS base_searchindexentry_document_trgm',
+]
+
+# FTS5 tabuľka nad base_searchindexentry (external content), synchronizovaná triggermi
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE base_searchindexentry_fts USING fts5("
+    "document, content='base_searchindexentry', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER base_searchindexentry_ai AFTER INSERT ON base_searchindexentry BEGIN "
+    "INSERT INTO base_searchindexentry_fts(rowid, document) VALUES (new.id, new.document); "
+    "END",
+    "CREATE TRIGGER base_searchindexentry_ad AFTER DELETE ON base_searchindexentry BEGIN "
+    "INSERT INTO base_searchindexentry_fts(base_searchindexentry_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); "
+    "END",
+    "CREATE TRIGGER base_searchindexentry_au AFTER UPDATE ON base_searchindexentry BEGIN "
+    "INSERT INTO base_searchindexentry_fts(base_searchindexentry_fts, rowid, document) "
+    "VALUES ('delete', old.id, old.document); "
+    "INSERT INTO base_searchindexentry_fts(rowid, document) VALUES (new.id, new.document); "
+    "END",
+]
+
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS base_searchindexentry_ai',
+    'DROP TRIGGER IF EXISTS base_searchindexentry_ad',
+    'DROP TRIGGER IF EXISTS base_searchindexentry_au',
+    'DROP TABLE IF EXISTS base_searchindexentry_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRESQL_FORWARD)
+    elif vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD)
+        except OperationalError:
+            # SQLite bez FTS5 alebo trigramového tokenizeru,
+            # hľadá sa priamo v base_searchindexentry
+            _run(schema_editor, SQLITE_BACKWARD)
+
+
+def drop_search_backend(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRESQL_BACKWARD)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0002_email_queue'),
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('document', models.TextField()),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name': 'záznam vyhľadávacieho indexu',
+                'verbose_name_plural': 'záznamy vyhľadávacieho indexu',
+                'constraints': [models.UniqueConstraint(fields=('content_type', 'object_id'), name='single_search_index_entry')],
+            },
+        ),
+        migrations.RunPython(create_search_backend, drop_search_backend),
+    ]
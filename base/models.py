@@ -1,7 +1,9 @@
+from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils.timezone import now
 
-from base.utils import mime_type
+from base.utils import mime_type, normalize
 
 
 class RestrictedFileField(models.FileField):
@@ -27,8 +29,152 @@ class RestrictedFileField(models.FileField):
         return file
 
 
+class NormalizedField(models.CharField):
+    """
+    Uložená kópia poľa `source` bez diakritiky a malými písmenami,
+    prepočítaná pri každom uložení objektu. Vyhľadávanie porovnáva priamo
+    tento indexovaný stĺpec, bez volania funkcií v databáze.
+    """
+
+    def __init__(self, *args, source=None, **kwargs):
+        self.source = source
+        kwargs.setdefault('editable', False)
+        kwargs.setdefault('blank', True)
+        kwargs.setdefault('default', '')
+        kwargs.setdefault('db_index', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        # pylint: disable=no-member
+        name, path, args, kwargs = super().deconstruct()
+        kwargs['source'] = self.source
+        return name, path, args, kwargs
+
+    def normalized_value(self, model_instance) -> str:
+        value = getattr(model_instance, self.source)
+        return '' if value is None else normalize(value)
+
+    def pre_save(self, model_instance, add):
+        # pylint: disable=unused-argument
+        value = self.normalized_value(model_instance)
+        setattr(model_instance, self.attname, value)
+        return value
+
+
+def normalized_fields(model) -> list[NormalizedField]:
+    return [field for field in model._meta.concrete_fields
+            if isinstance(field, NormalizedField)]
+
+
+def backfill_normalized_fields(model, batch_size=500) -> int:
+    """Prepočíta normalizované polia všetkých objektov modelu, vráti ich počet"""
+    fields = normalized_fields(model)
+    if not fields:
+        return 0
+    # pylint: disable=protected-access
+    queryset = model._default_manager.only(
+        'pk', *(field.source for field in fields)).order_by('pk')
+    batch = []
+    count = 0
+    for instance in queryset.iterator(chunk_size=batch_size):
+        for field in fields:
+            setattr(instance, field.attname, field.normalized_value(instance))
+        batch.append(instance)
+        if len(batch) >= batch_size:
+            model._default_manager.bulk_update(
+                batch, [field.attname for field in fields])
+            count += len(batch)
+            batch = []
+    if batch:
+        model._default_manager.bulk_update(
+            batch, [field.attname for field in fields])
+        count += len(batch)
+    return count
+
+
+class NormalizedFieldsModel(models.Model):
+    """
+    Model s poľami NormalizedField. Pri uložení s `update_fields`
+    pribalí aj normalizované kópie zmenených polí.
+    """
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            kwargs['update_fields'] = update_fields | {
+                field.attname for field in normalized_fields(type(self))
+                if field.source in update_fields
+            }
+        super().save(*args, **kwargs)
+
+
 class Site(models.Model):
     name = models.CharField(max_length=10, unique=True)
 
     def __str__(self):
         return self.name
+
+
+class EmailContent(models.Model):
+    """Vyrenderovaný email, spoločný pre všetkých adresátov s rovnakým kontextom"""
+    class Meta:
+        verbose_name = 'obsah emailu'
+        verbose_name_plural = 'obsahy emailov'
+
+    subject = models.CharField(verbose_name='predmet', max_length=255)
+    text = models.TextField(verbose_name='text')
+    html = models.TextField(verbose_name='html')
+    created_at = models.DateTimeField(
+        verbose_name='vytvorené', auto_now_add=True)
+
+    def __str__(self):
+        return self.subject
+
+
+class QueuedEmail(models.Model):
+    """Email čakajúci vo fronte na odoslanie príkazom send_emails"""
+    class Meta:
+        verbose_name = 'email vo fronte'
+        verbose_name_plural = 'emaily vo fronte'
+        indexes = [
+            models.Index(fields=['sent_at', 'next_attempt_at']),
+        ]
+
+    content = models.ForeignKey(
+        EmailContent, verbose_name='obsah', on_delete=models.CASCADE)
+    recipient = models.EmailField(verbose_name='adresát')
+    sent_at = models.DateTimeField(
+        verbose_name='odoslané', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name='počet pokusov', default=0)
+    next_attempt_at = models.DateTimeField(
+        verbose_name='ďalší pokus', default=now)
+    last_error = models.TextField(verbose_name='posledná chyba', blank=True)
+
+    def __str__(self):
+        return f'{self.recipient} - {self.content}'
+
+
+class SearchIndexEntry(models.Model):
+    """
+    Normalizovaný text (bez diakritiky, malými písmenami) prehľadávaných polí
+    jedného objektu. Plní ho base.search.SearchIndex, na PostgreSQL je nad ním
+    trigramový GIN index, na SQLite FTS5 tabuľka.
+    """
+    class Meta:
+        verbose_name = 'záznam vyhľadávacieho indexu'
+        verbose_name_plural = 'záznamy vyhľadávacieho indexu'
+        constraints = [
+            models.UniqueConstraint(fields=['content_type', 'object_id'],
+                                    name='single_search_index_entry'),
+        ]
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    document = models.TextField()
+
+    def __str__(self):
+        return self.document
@@ -0,0 +1,127 @@
+"""
+Štrukturálna kontrola PDF súborov bez ich načítania do pamäte a náhľady.
+
+Súbor sa číta po blokoch a pamätá sa iba jeho začiatok (hlavička `%PDF-`)
+a koniec (`startxref` a `%%EOF`, slovník trailera so `/Encrypt`). Nejde
+o úplné parsovanie PDF, iba o odhalenie súborov, ktoré PDF nie sú, sú
+useknuté alebo zašifrované. Pre ZIP archívy sa navyše strážia pomery
+kompresie, aby rozbalenie neprerástlo do zip bomby.
+"""
+import shutil
+import subprocess
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
+
+from pypdf import PdfReader
+from pypdf.errors import PyPdfError
+
+CHUNK_SIZE = 64 * 1024
+# Hlavička môže byť podľa špecifikácie kdekoľvek v prvom kB
+HEAD_SIZE = 1024
+# Trailer s `startxref` a `%%EOF` je na konci súboru
+TAIL_SIZE = 4096
+
+# Najväčší dovolený pomer rozbalenej a zbalenej veľkosti položky ZIPu
+MAX_COMPRESSION_RATIO = 100
+PDF_VALIDATION_WORKERS = 4
+
+# Šírka náhľadu prvej strany v pixeloch
+THUMBNAIL_WIDTH = 300
+THUMBNAIL_TIMEOUT = 30
+
+
+class PdfValidationError(Exception):
+    pass
+
+
+def validate_pdf_stream(stream: BinaryIO, max_size: Optional[int] = None) -> int:
+    """
+    Skontroluje PDF čítané z prúdu a vráti jeho veľkosť.
+    Pri chybe vyhodí PdfValidationError s popisom pre používateľa.
+    """
+    head = b''
+    tail = b''
+    size = 0
+    while chunk := stream.read(CHUNK_SIZE):
+        size += len(chunk)
+        if max_size is not None and size > max_size:
+            raise PdfValidationError('Súbor prekročil maximálnu povolenú veľkosť')
+        if len(head) < HEAD_SIZE:
+            head += chunk[:HEAD_SIZE - len(head)]
+        tail = (tail + chunk)[-TAIL_SIZE:]
+
+    if b'%PDF-' not in head:
+        raise PdfValidationError('Súbor nie je vo formáte pdf')
+    if b'%%EOF' not in tail or b'startxref' not in tail:
+        raise PdfValidationError('Súbor pdf je neúplný alebo poškodený')
+    if b'/Encrypt' in tail:
+        raise PdfValidationError('Súbor pdf je zašifrovaný')
+    return size
+
+
+def validate_zip_entry(archive: zipfile.ZipFile, name: str,
+                       max_size: Optional[int] = None) -> None:
+    """Skontroluje PDF uložené v ZIPe bez rozbalenia na disk"""
+    info = archive.getinfo(name)
+    if info.flag_bits & 0x1:
+        raise PdfValidationError('Súbor v archíve je zašifrovaný')
+    if max_size is not None and info.file_size > max_size:
+        raise PdfValidationError('Súbor prekročil maximálnu povolenú veľkosť')
+    if info.file_size > MAX_COMPRESSION_RATIO * max(info.compress_size, 1):
+        raise PdfValidationError('Súbor v archíve má podozrivo vysoký pomer kompresie')
+    try:
+        with archive.open(info) as stream:
+            # Hlavička ZIPu môže o veľkosti klamať, strážime skutočne rozbalené dáta
+            limit = info.file_size if max_size is None else min(info.file_size, max_size)
+            validate_pdf_stream(stream, max_size=limit)
+    except (zipfile.BadZipFile, EOFError) as exc:
+        raise PdfValidationError('Súbor v archíve je poškodený') from exc
+
+
+def validate_zip_entries(archive: zipfile.ZipFile, names: list[str],
+                         max_size: Optional[int] = None) -> dict[str, str]:
+    """
+    Skontroluje položky ZIPu súbežne (dekompresia uvoľňuje GIL) a vráti
+    chyby podľa mena položky. ZipFile zvláda čítanie viacerých položiek naraz.
+    """
+    def check(name: str) -> Optional[str]:
+        try:
+            validate_zip_entry(archive, name, max_size)
+        except PdfValidationError as exc:
+            return str(exc)
+        return None
+
+    with ThreadPoolExecutor(max_workers=PDF_VALIDATION_WORKERS) as executor:
+        results = executor.map(check, names)
+        return {name: error for name, error in zip(names, results) if error is not None}
+
+
+def page_count(stream: BinaryIO) -> Optional[int]:
+    """Počet strán PDF alebo None, ak sa nedá prečítať"""
+    try:
+        return len(PdfReader(stream, strict=False).pages)
+    except (PyPdfError, ValueError, KeyError, TypeError):
+        return None
+
+
+def can_render_thumbnails() -> bool:
+    return shutil.which('pdftoppm') is not None
+
+
+def render_thumbnail(path: str, width: int = THUMBNAIL_WIDTH) -> Optional[bytes]:
+    """
+    PNG náhľad prvej strany cez pdftoppm (poppler-utils). Bez neho, pri chybe
+    alebo po uplynutí limitu vráti None.
+    """
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        return None
+    try:
+        result = subprocess.run(
+            [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-png',
+             '-scale-to-x', str(width), '-scale-to-y', '-1', path, '-'],
+            capture_output=True, timeout=THUMBNAIL_TIMEOUT, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout or None
@@ -0,0 +1,146 @@
+"""
+Číselníky (kraje, okresy, školy, ročníky, ...), ktoré si frontend načítava
+pri každom otvorení stránky, ale menia sa len niekoľkokrát do roka.
+
+Každý model číselníka má v cache verziu, ktorá sa zmení pri jeho uložení
+alebo zmazaní. Z verzií sa skladá ETag odpovede aj kľúč, pod ktorým je
+v cache uložený serializovaný zoznam, takže zmena modelu zneplatní oboje.
+Hromadné `update` signály nevysiela, po ňom treba zavolať `bump_version`.
+"""
+from hashlib import sha1
+from uuid import uuid4
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+# Ako dlho si môže prehliadač nechať zoznam bez parametrov bez revalidácie
+REFERENCE_DATA_MAX_AGE = 60 * 60 * 24
+REFERENCE_DATA_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _version_key(model: type[models.Model]) -> str:
+    return f'reference-data:version:{model._meta.label_lower}'  # pylint: disable=protected-access
+
+
+def get_version(model: type[models.Model]) -> str:
+    return cache.get_or_set(_version_key(model), lambda: uuid4().hex, None)
+
+
+def bump_version(model: type[models.Model]) -> None:
+    # Náhodná verzia, aby po vyprázdnení cache nevznikol starý ETag
+    cache.set(_version_key(model), uuid4().hex, None)
+
+
+def _bump_on_change(model: type[models.Model]):
+    def on_change(sender, **kwargs):
+        # pylint: disable=unused-argument
+        bump_version(model)
+    return on_change
+
+
+def track(*tracked_models: type[models.Model]) -> None:
+    """
+    Pri zmene modelov (aj ich podtried) sa zmení ich verzia. Uloženie
+    podtriedy (napr. Semester pri Event) posiela signály iba so senderom
+    podtriedy, preto sa pripájajú aj podtriedy, musia byť už načítané.
+    """
+    for model in tracked_models:
+        receiver = _bump_on_change(model)
+        for sender in apps.get_models():
+            if not issubclass(sender, model):
+                continue
+            dispatch_uid = f'reference-data-{model._meta.label}-{sender._meta.label}'  # pylint: disable=protected-access
+            for signal in (post_save, post_delete):
+                signal.connect(receiver, sender=sender, weak=False, dispatch_uid=dispatch_uid)
+
+
+def make_etag(tracked_models, *parts) -> str:
+    versions = [f'{model._meta.label_lower}={get_version(model)}'  # pylint: disable=protected-access
+                for model in tracked_models]
+    digest = sha1('\n'.join([*versions, *map(str, parts)]).encode())
+    return f'"{digest.hexdigest()[:20]}"'
+
+
+def not_modified(request, etag: str) -> bool:
+    return etag in parse_etags(request.headers.get('If-None-Match', ''))
+
+
+def conditional_response(request, etag: str, build, max_age=None) -> Response:
+    """
+    Odpoveď s ETagom, pri zhode s If-None-Match bez tela (304).
+    `build` vráti dáta alebo Response a volá sa iba keď treba.
+    """
+    if not_modified(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = build()
+        if not isinstance(response, Response):
+            response = Response(response)
+    if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        if max_age is not None:
+            patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def cached_data(etag: str, build):
+    """Dáta uložené v cache pod ETagom (ten sa mení s verziami modelov)"""
+    key = f'reference-data:data:{etag}'
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, REFERENCE_DATA_CACHE_TIMEOUT)
+    return data
+
+
+class ReferenceDataMixin:
+    """
+    Read-only časť viewsetu číselníka. Zoznam bez parametrov je uložený
+    v cache a posiela sa s dlhým Cache-Control, ostatné GET odpovede
+    (filtre, vyhľadávanie, detail) majú aspoň verziovaný ETag.
+    """
+    # Modely, ktorých zmena mení odpoveď, predvolene model querysetu
+    reference_models = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.reference_models or getattr(cls, 'queryset', None) is not None:
+            track(*cls.get_reference_models())
+
+    @classmethod
+    def get_reference_models(cls) -> tuple:
+        return cls.reference_models or (cls.queryset.model,)
+
+    @classmethod
+    def list_etag(cls) -> str:
+        return make_etag(cls.get_reference_models(), cls.__name__)
+
+    @classmethod
+    def reference_data(cls):
+        """Serializovaný celý zoznam, rovnaký ako odpoveď `list` bez parametrov"""
+        return cached_data(cls.list_etag(), lambda: [
+            *cls.serializer_class(cls.queryset.all(), many=True).data])
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            etag = make_etag(self.get_reference_models(),
+                             type(self).__name__, request.get_full_path())
+            uncached_list = super().list
+            return conditional_response(
+                request, etag, lambda: uncached_list(request, *args, **kwargs))
+        return conditional_response(
+            request, self.list_etag(), self.reference_data,
+            max_age=REFERENCE_DATA_MAX_AGE)
+
+    def retrieve(self, request, *args, **kwargs):
+        etag = make_etag(self.get_reference_models(),
+                         type(self).__name__, request.get_full_path())
+        retrieve = super().retrieve
+        return conditional_response(
+            request, etag, lambda: retrieve(request, *args, **kwargs))
@@ -0,0 +1,171 @@
+"""
+Vyhľadávací index nad normalizovanými (bez diakritiky, malými písmenami)
+hodnotami prehľadávaných polí.
+
+Pre každý zaregistrovaný model sa polia objektu (aj cez cudzie kľúče) spoja
+do jedného dokumentu v tabuľke SearchIndexEntry. Dokumenty sa udržiavajú
+signálmi pri zmene modelu aj modelov, cez ktoré vedú cesty k poliam.
+Hľadá sa podreťazec, na PostgreSQL cez trigramový GIN index,
+na SQLite cez FTS5 tabuľku s trigramovým tokenizerom.
+"""
+from functools import partial
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connection, models
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+from base.models import SearchIndexEntry, normalized_fields
+from base.utils import normalize
+
+# Hľadaný výraz nikdy neobsahuje koniec riadku,
+# preto nemôže nájsť zhodu cez hranicu dvoch polí
+FIELD_SEPARATOR = '\n'
+
+FTS_TABLE = 'base_searchindexentry_fts'
+# Trigramový tokenizer FTS5 vie hľadať iba výrazy s aspoň tromi znakmi
+FTS_MIN_TERM_LENGTH = 3
+
+
+def _has_fts_table() -> bool:
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def normalized_path(model: type[models.Model], path: str) -> str | None:
+    """
+    Cesta k uloženej normalizovanej kópii poľa (NormalizedField),
+    ak ju model na konci cesty má
+    """
+    *relations, field_name = path.split('__')
+    try:
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+    except FieldDoesNotExist:
+        # Napr. pole s prefixom `^` alebo `=` zo SearchFilter
+        return None
+    for field in normalized_fields(model):
+        if field.source == field_name:
+            return '__'.join([*relations, field.attname])
+    return None
+
+
+class SearchIndex:
+    def __init__(self):
+        self._fields: dict[type[models.Model], list[str]] = {}
+
+    def register(self, model: type[models.Model], fields: list[str]) -> None:
+        """
+        Zaregistruje model s prehľadávanými poliami v tvare `search_fields`
+        (napr. `semester_registration__profile__first_name`)
+        """
+        self._fields[model] = list(fields)
+        for sender in [model, *model.__subclasses__()]:
+            post_save.connect(partial(self._on_save, model), sender=sender,
+                              weak=False, dispatch_uid=f'search-{model._meta.label}')
+            post_delete.connect(partial(self._on_delete, model), sender=sender,
+                                weak=False, dispatch_uid=f'search-{model._meta.label}')
+
+        relations = {}
+        for path in fields:
+            parts = path.split('__')
+            related_model = model
+            for i, part in enumerate(parts[:-1]):
+                related_model = related_model._meta.get_field(
+                    part).related_model
+                lookup = '__'.join(parts[:i + 1])
+                relations.setdefault(lookup, (related_model, set()))[
+                    1].add(parts[i + 1])
+        for lookup, (related_model, related_fields) in relations.items():
+            post_save.connect(
+                partial(self._on_related_save, model, lookup, related_fields),
+                sender=related_model, weak=False,
+                dispatch_uid=f'search-{model._meta.label}-{lookup}')
+
+    def covers(self, model: type[models.Model], fields: list[str]) -> bool:
+        """Či sa dá hľadanie v zadaných poliach modelu obslúžiť indexom"""
+        return model in self._fields and set(self._fields[model]) == set(fields)
+
+    def update(self, model: type[models.Model], queryset: models.QuerySet) -> None:
+        """Prepočíta dokumenty objektov z querysetu"""
+        # Polia s uloženou normalizovanou kópiou sa už znova nenormalizujú
+        paths = [(normalized_path(model, path), path)
+                 for path in self._fields[model]]
+        columns = [stored or path for stored, path in paths]
+        documents = {}
+        for pk, *values in queryset.values_list('pk', *columns):
+            documents[pk] = FIELD_SEPARATOR.join(
+                value if stored else normalize(value)
+                for (stored, _), value in zip(paths, values) if value is not None)
+        content_type = ContentType.objects.get_for_model(model)
+        SearchIndexEntry.objects.filter(
+            content_type=content_type, object_id__in=documents).delete()
+        SearchIndexEntry.objects.bulk_create(
+            SearchIndexEntry(content_type=content_type,
+                             object_id=pk, document=document)
+            for pk, document in documents.items()
+        )
+
+    def rebuild(self) -> None:
+        """Prepočíta dokumenty všetkých zaregistrovaných modelov"""
+        SearchIndexEntry.objects.all().delete()
+        for model in self._fields:
+            # pylint: disable=protected-access
+            self.update(model, model._default_manager.all())
+
+    def filter(self, queryset: models.QuerySet, terms: list[str]) -> models.QuerySet:
+        """Objekty querysetu, ktorých dokument obsahuje každý z výrazov"""
+        content_type = ContentType.objects.get_for_model(queryset.model)
+        has_fts = _has_fts_table()
+        for term in terms:
+            term = normalize(term)
+            if has_fts and len(term) >= FTS_MIN_TERM_LENGTH:
+                matching = RawSQL(
+                    f'SELECT entry.object_id FROM {SearchIndexEntry._meta.db_table} entry '
+                    f'JOIN {FTS_TABLE} fts ON fts.rowid = entry.id '
+                    f'WHERE entry.content_type_id = %s AND fts.document MATCH %s',
+                    [content_type.pk, '"' + term.replace('"', '""') + '"']
+                )
+            else:
+                matching = SearchIndexEntry.objects.filter(
+                    content_type=content_type, document__contains=term
+                ).values('object_id')
+            queryset = queryset.filter(pk__in=matching)
+        return queryset
+
+    def _on_save(self, model, sender, instance, raw=False, update_fields=None, **kwargs):
+        # pylint: disable=unused-argument,too-many-arguments,protected-access
+        if raw:
+            # loaddata, index sa po načítaní prepočíta príkazom rebuild_search_index
+            return
+        if update_fields is not None and not self._touches(model, update_fields):
+            return
+        self.update(model, model._default_manager.filter(pk=instance.pk))
+
+    def _on_delete(self, model, sender, instance, **kwargs):
+        # pylint: disable=unused-argument
+        SearchIndexEntry.objects.filter(
+            content_type=ContentType.objects.get_for_model(model),
+            object_id=instance.pk
+        ).delete()
+
+    def _on_related_save(self, model, lookup, related_fields, sender, instance,  # pylint: disable=too-many-positional-arguments
+                         created=False, raw=False, update_fields=None, **kwargs):
+        # pylint: disable=unused-argument,too-many-arguments,protected-access
+        if created or raw:
+            # Na nový objekt ešte nič neodkazuje
+            return
+        if update_fields is not None and not related_fields & set(update_fields):
+            return
+        self.update(model, model._default_manager.filter(**{lookup: instance}))
+
+    def _touches(self, model, update_fields) -> bool:
+        return any(path.split('__')[0] in update_fields for path in self._fields[model])
+
+
+search_index = SearchIndex()
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.functional import cached_property
+
+
+class PrivateStorage(FileSystemStorage):
+    """
+    Súbory prístupné iba cez downloads (riešenia). Umiestnenie sa číta
+    z PRIVATE_STORAGE_ROOT až pri použití, takže nie je zapečené v migráciách
+    a testy ho môžu zmeniť cez override_settings.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('base_url', '/protected/')
+        super().__init__(**kwargs)
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, settings.PRIVATE_STORAGE_ROOT)
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_STORAGE_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
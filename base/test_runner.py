@@ -0,0 +1,56 @@
+"""
+Testovací runner. Fixtures sa načítavajú zo snímok (base.fixture_snapshots)
+a nahrané súbory sa ukladajú do dočasného adresára, pri `--parallel`
+vlastného pre každý proces, aby si testy neprepisovali súbory navzájom
+ani v skutočnom MEDIA_ROOT.
+"""
+import os
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.test import runner as django_runner
+
+from base import fixture_snapshots
+
+# Spoločný dočasný adresár behu, procesy spustené cez spawn ho dedia v prostredí
+STORAGE_ROOT_ENV = 'WEBSTROM_TEST_STORAGE_ROOT'
+
+
+def use_storage_root(name: str) -> override_settings:
+    """Presmeruje MEDIA_ROOT a PRIVATE_STORAGE_ROOT do podadresára dočasného koreňa"""
+    root = os.path.join(os.environ[STORAGE_ROOT_ENV], name)
+    private_root = os.path.join(root, 'private')
+    storage_settings = override_settings(
+        MEDIA_ROOT=os.path.join(root, 'media'),
+        PRIVATE_STORAGE_ROOT=private_root,
+        SENDFILE_ROOT=private_root,
+    )
+    storage_settings.enable()
+    return storage_settings
+
+
+def _init_worker(counter, *args, **kwargs):
+    django_runner._init_worker(counter, *args, **kwargs)  # pylint: disable=protected-access
+    fixture_snapshots.enable()
+    use_storage_root(f'worker-{django_runner._worker_id}')  # pylint: disable=protected-access
+
+
+class ParallelTestSuite(django_runner.ParallelTestSuite):
+    init_worker = _init_worker
+
+
+class TestRunner(django_runner.DiscoverRunner):
+    parallel_test_suite = ParallelTestSuite
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        fixture_snapshots.enable()
+        os.environ[STORAGE_ROOT_ENV] = tempfile.mkdtemp(prefix='webstrom-tests-')
+        self._storage_settings = use_storage_root('main')  # pylint: disable=attribute-defined-outside-init
+
+    def teardown_test_environment(self, **kwargs):
+        self._storage_settings.disable()
+        shutil.rmtree(os.environ.pop(STORAGE_ROOT_ENV), ignore_errors=True)
+        fixture_snapshots.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,380 @@
+import json
+import os
+import sqlite3
+import tempfile
+import zipfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import RequestFactory, TestCase
+from django.utils.timezone import now
+
+from base.emails import (EMAIL_MAX_ATTEMPTS, send_bulk_html_emails,
+                         send_queued_emails)
+from base.file_serving import RangeNotSatisfiable, parse_range
+from base.fixture_snapshots import FixtureSnapshot
+from base.management.commands import load_db
+from base.models import EmailContent, QueuedEmail
+from base.pdf import (PdfValidationError, validate_pdf_stream,
+                      validate_zip_entries)
+from base.reference_data import get_version, track
+from base.uploads import RejectedUploadedFile, limit_upload_size
+from base.utils import mime_type
+from competition.models import (Event, EventRegistration, Problem, Semester,
+                                Series, Solution)
+from personal.models import County, Profile
+from tests.test_utils import get_app_fixtures
+from user.models import User
+from webstrom.settings import BASE_DIR
+
+
+class FailingConnection:
+    def open(self):
+        return False
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise OSError('Spojenie zlyhalo')
+
+
+class UnreachableConnection(FailingConnection):
+    def open(self):
+        raise ConnectionRefusedError('Server je nedostupný')
+
+
+class EmailQueueTest(TestCase):
+    '''
+    fronta emailov
+    '''
+
+    def queue_emails(self):
+        send_bulk_html_emails(
+            ['a@strom.sk', 'b@strom.sk', ''],
+            'competition/emails/comment_hidden',
+            'Skrytý komentár',
+            {'comment': 'Text', 'problem': 'Úloha', 'response': 'Odpoveď'}
+        )
+
+    def test_emails_are_queued(self):
+        self.queue_emails()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailContent.objects.count(), 1)
+        self.assertEqual(QueuedEmail.objects.count(), 2)
+
+    def test_send_queued_emails(self):
+        self.queue_emails()
+        self.assertEqual(send_queued_emails(), (2, 0))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(mail.outbox[0].subject, 'Skrytý komentár')
+        self.assertIn('Odpoveď', mail.outbox[0].body)
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+    def test_failed_emails_are_retried(self):
+        self.queue_emails()
+        self.assertEqual(send_queued_emails(FailingConnection()), (0, 2))
+        queued = QueuedEmail.objects.first()
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(queued.last_error, 'Spojenie zlyhalo')
+        # Ďalší pokus až po uplynutí odstupu
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+        QueuedEmail.objects.update(next_attempt_at=now())
+        self.assertEqual(send_queued_emails(), (2, 0))
+
+        QueuedEmail.objects.update(
+            sent_at=None, attempts=EMAIL_MAX_ATTEMPTS)
+        self.assertEqual(send_queued_emails(), (0, 0))
+
+    def test_unreachable_server(self):
+        self.queue_emails()
+        self.assertEqual(send_queued_emails(UnreachableConnection()), (0, 2))
+        self.assertEqual(
+            list(QueuedEmail.objects.values_list('attempts', 'last_error')),
+            [(1, 'Server je nedostupný')] * 2)
+
+
+class FixtureSnapshotTest(TestCase):
+    '''
+    opakované načítanie fixtures zo snímky
+    '''
+
+    def test_snapshot_restores_loaded_rows(self):
+        fixture = os.path.join(BASE_DIR, 'personal', 'fixtures', 'counties.json')
+        snapshot = FixtureSnapshot.capture(
+            'default', lambda: call_command('loaddata', fixture, verbosity=0))
+        self.assertEqual(snapshot.models, {County})
+        counties = list(County.objects.values_list('pk', 'name'))
+        County.objects.filter(name__startswith='K').delete()
+        County.objects.update(name='zmenený')
+        snapshot.restore('default')
+        self.assertEqual(list(County.objects.values_list('pk', 'name')), counties)
+
+
+class UploadHandlerTest(TestCase):
+    '''
+    určenie typu a kontrola veľkosti počas nahrávania
+    '''
+    PDF = b'%PDF-1.4\n' + b'0' * 4096 + b'\n%%EOF\n'
+
+    def upload(self, max_size=None):
+        request = RequestFactory().post('/', {'file': SimpleUploadedFile(
+            'riesenie.pdf', self.PDF, content_type='application/pdf')})
+        if max_size is not None:
+            limit_upload_size(request, max_size)
+        return request.FILES['file']
+
+    def test_mime_type_is_sniffed_once(self):
+        file = self.upload()
+        self.assertEqual(file.mime_type, 'application/pdf')
+        with mock.patch('base.utils.magic.from_buffer') as from_buffer:
+            self.assertEqual(mime_type(file), 'application/pdf')
+        from_buffer.assert_not_called()
+        self.assertEqual(file.read(), self.PDF)
+
+    def test_oversized_file_is_rejected(self):
+        file = self.upload(max_size=1024)
+        self.assertIsInstance(file, RejectedUploadedFile)
+        self.assertEqual(file.size, len(self.PDF))
+        self.assertEqual(mime_type(file), 'application/pdf')
+        with self.assertRaises(RequestDataTooBig):
+            file.read()
+
+
+class PdfValidationTest(TestCase):
+    '''
+    štrukturálna kontrola pdf a položiek zip archívu
+    '''
+    PDF = b'%PDF-1.7\n1 0 obj\n<<>>\nendobj\nstartxref\n9\n%%EOF\n'
+
+    def archive(self, name, content):
+        stream = BytesIO()
+        with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(name, content)
+        return zipfile.ZipFile(stream)
+
+    def test_validate_pdf_stream(self):
+        self.assertEqual(validate_pdf_stream(BytesIO(self.PDF)), len(self.PDF))
+        invalid = {
+            b'obycajny text': 'nie je vo formáte pdf',
+            self.PDF[:-20]: 'neúplný',
+            self.PDF.replace(b'<<>>', b'<</Encrypt 2 0 R>>'): 'zašifrovaný',
+        }
+        for content, message in invalid.items():
+            with self.assertRaisesMessage(PdfValidationError, message):
+                validate_pdf_stream(BytesIO(content))
+        with self.assertRaises(PdfValidationError):
+            validate_pdf_stream(BytesIO(self.PDF), max_size=10)
+
+    def test_validate_zip_entries(self):
+        archive = self.archive('riesenie.pdf', self.PDF)
+        self.assertEqual(validate_zip_entries(archive, ['riesenie.pdf']), {})
+        bomb = self.archive('bomba.pdf', self.PDF[:-6] + b'0' * 10 ** 6 + self.PDF[-6:])
+        self.assertEqual(
+            validate_zip_entries(bomb, ['bomba.pdf']),
+            {'bomba.pdf': 'Súbor v archíve má podozrivo vysoký pomer kompresie'})
+
+
+class ReferenceDataTest(TestCase):
+    '''
+    verzie sledovaných modelov
+    '''
+
+    fixtures = get_app_fixtures([
+        'base',
+        'user',
+        'personal',
+        'competition'
+    ])
+
+    def test_subclass_change_bumps_version(self):
+        track(Event)
+        version = get_version(Event)
+        Semester.objects.first().save()
+        self.assertNotEqual(version, get_version(Event))
+        version = get_version(Event)
+        Semester.objects.first().delete()
+        self.assertNotEqual(version, get_version(Event))
+
+
+class ParseRangeTest(TestCase):
+    '''
+    rozsahy bajtov z hlavičky Range
+    '''
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=2-5', 10), (2, 5))
+        self.assertEqual(parse_range('bytes=4-', 10), (4, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=0-100', 10), (0, 9))
+        for header in ['bytes=5-2', 'bytes=0-1,4-5', 'items=0-1', 'bytes=-']:
+            self.assertIsNone(parse_range(header, 10))
+        for header in ['bytes=10-', 'bytes=-0']:
+            with self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 10)
+
+
+LEGACY_SCHEMA = '''
+    CREATE TABLE competitions_season (
+        id, competition_id, "end", name, year, number, start);
+    CREATE TABLE competitions_series (
+        id, number, submission_deadline, sum_method, season_id, problemset_id);
+    CREATE TABLE problems_problemset (id);
+    CREATE TABLE problems_probleminset (problemset_id, problem_id, position);
+    CREATE TABLE problems_problem (id, text);
+    CREATE TABLE schools_school (id, name, address_id);
+    CREATE TABLE schools_address (id, street, city, postal_number);
+    CREATE TABLE auth_user (
+        id, email, is_staff, is_active, first_name, last_name, date_joined,
+        username, is_superuser, password);
+    CREATE TABLE profiles_userprofile (
+        user_id, phone_number, parent_phone_number, classlevel, school_id);
+    CREATE TABLE profiles_userseasonregistration (
+        id, user_id, season_id, classlevel, school_id);
+    CREATE TABLE problems_usersolution (id, score, problem_id, user_id, added_at);
+'''
+
+LEGACY_ROWS = {
+    'competitions_season': [
+        (1, 1, '2017-01-31 00:00:00', 'Zimný', 30, 1, '2016-09-01 00:00:00')],
+    'competitions_series': [
+        (1, 1, '2016-10-20 22:00:00', 'SUCET_SERIE_35', 1, 1),
+        (2, 2, '2016-12-01 22:00:00', 'SUCET_SERIE_35', 1, 2)],
+    'problems_problemset': [(1,), (2,)],
+    'problems_probleminset': [(1, 1, 1), (1, 2, 2), (2, 3, 1)],
+    'problems_problem': [(1, 'Úloha 1'), (2, 'Úloha 2'), (3, 'Úloha 3')],
+    'schools_school': [(7, 'FMFI UK', 1)],
+    'schools_address': [(1, 'Mlynská dolina', 'Bratislava', '84248')],
+    'auth_user': [
+        (1, 'jana@example.com', 0, 1, 'Jana', 'Nová', '2016-09-05 10:00:00',
+         'jana', 0, 'pbkdf2_sha256$1$x$y'),
+        (2, 'peter@example.com', 0, 1, 'Peter', 'Starý', '2016-09-06 10:00:00',
+         'peter', 0, 'pbkdf2_sha256$1$x$y'),
+        (3, '', 0, 1, 'Bez', 'Emailu', '2016-09-07 10:00:00',
+         'bez', 0, 'pbkdf2_sha256$1$x$y')],
+    'profiles_userprofile': [
+        (1, '+421900000000', None, 'S1', 7),
+        (2, None, None, 'Z9', 99),
+        (3, None, None, 'S2', None)],
+    'profiles_userseasonregistration': [(1, 1, 1, 'S1', 7), (2, 2, 1, '??', 99)],
+    'problems_usersolution': [
+        (1, 5, 1, 1, '2016-10-10 10:00:00'),
+        (2, 3, 3, 1, '2016-11-10 10:00:00'),
+        (3, 9, 2, 2, '2016-10-11 10:00:00'),
+        # Používateľ bez registrácie do semestra, riešenie sa preskočí
+        (4, 1, 1, 3, '2016-10-12 10:00:00')],
+}
+
+# Škola 7 zo starej databázy -> FMFI UK vo fixtures, v JSON ako reťazec
+LEGACY_SCHOOL_MAPPING = {'7': '2'}
+
+
+class LoadDbTest(TestCase):
+    '''
+    import zo starej databázy (load_db)
+    '''
+
+    fixtures = get_app_fixtures([
+        'base',
+        'user',
+        'personal',
+        'competition'
+    ])
+
+    MODELS = [Semester, Series, Problem, User, Profile, EventRegistration, Solution]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.source = os.path.join(directory.name, 'legacy.sqlite3')
+        self.state_file = os.path.join(directory.name, 'legacy.import.json')
+        with sqlite3.connect(self.source) as conn:
+            conn.executescript(LEGACY_SCHEMA)
+            for table, rows in LEGACY_ROWS.items():
+                placeholders = ','.join('?' * len(rows[0]))
+                conn.executemany(f'INSERT INTO {table} VALUES ({placeholders})', rows)
+        conn.close()
+        mapping_file = os.path.join(directory.name, 'schools_mapping.json')
+        with open(mapping_file, 'w', encoding='utf-8') as file:
+            json.dump(LEGACY_SCHOOL_MAPPING, file)
+        patch = mock.patch.object(load_db, 'SCHOOL_MAPPING_FILE', mapping_file)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.counts = self.model_counts()
+
+    def model_counts(self):
+        return {model.__name__: model.objects.count() for model in self.MODELS}
+
+    def created(self):
+        counts = self.model_counts()
+        return {name: counts[name] - self.counts[name] for name in counts}
+
+    def load(self):
+        call_command('load_db', self.source, state=self.state_file,
+                     batch_size=2, stdout=StringIO(), stderr=StringIO())
+
+    def test_load_stages(self):
+        self.load()
+        self.assertEqual(self.created(), {
+            'Semester': 1, 'Series': 2, 'Problem': 3, 'User': 2, 'Profile': 3,
+            'EventRegistration': 2, 'Solution': 3})
+        with open(self.state_file, 'r', encoding='utf-8') as file:
+            stages = json.load(file)['stages']
+        self.assertEqual(stages['schools']['mapping'], {'7': 2, 'None': 0})
+        self.assertEqual(stages['solutions']['mapping'], {'count': 3})
+
+        semester = Semester.objects.get(pk=stages['semesters']['mapping']['1'])
+        self.assertEqual(semester.competition_id, 1)
+        self.assertEqual(
+            list(semester.series_set.order_by('order').values_list('order', flat=True)),
+            [1, 2])
+        problem_id, semester_id = stages['problems']['mapping']['2']
+        problem = Problem.objects.get(pk=problem_id)
+        self.assertEqual((problem.text, problem.order, problem.series.semester_id),
+                         ('Úloha 2', 2, semester_id))
+
+        jana = Profile.objects.get(pk=stages['users']['mapping']['1'])
+        self.assertEqual((jana.user.email, jana.school_id, jana.phone),
+                         ('jana@example.com', 2, '+421900000000'))
+        self.assertTrue(jana.user.emailaddress_set.get().verified)
+        # Neznáma škola v mapovaní -> nešpecifikovaná škola
+        peter = Profile.objects.get(pk=stages['users']['mapping']['2'])
+        self.assertEqual(peter.school_id, 0)
+        self.assertIsNone(Profile.objects.get(pk=stages['users']['mapping']['3']).user)
+
+        registration = EventRegistration.objects.get(event=semester, profile=jana)
+        self.assertEqual((registration.school_id, registration.grade.tag), (2, 'S1'))
+        self.assertEqual(
+            EventRegistration.objects.get(event=semester, profile=peter).grade.tag, 'XX')
+        self.assertEqual(
+            sorted(registration.solution_set.values_list('score', flat=True)), [3, 5])
+
+    def test_resume_after_failed_stage(self):
+        with mock.patch.object(load_db.Command, '_stage_registrations',
+                               side_effect=RuntimeError('Chyba v registráciách')):
+            with self.assertRaises(CommandError):
+                self.load()
+        with open(self.state_file, 'r', encoding='utf-8') as file:
+            stages = json.load(file)['stages']
+        self.assertEqual(set(stages), {
+            'schools', 'competitions', 'semesters', 'series', 'problems', 'users'})
+        self.assertEqual(self.created(), {
+            'Semester': 1, 'Series': 2, 'Problem': 3, 'User': 2, 'Profile': 3,
+            'EventRegistration': 0, 'Solution': 0})
+
+        finished = ['schools', 'competitions', 'semesters', 'series', 'problems', 'users']
+        patches = [mock.patch.object(load_db.Command, f'_stage_{name}') for name in finished]
+        mocks = [patch.start() for patch in patches]
+        for patch in patches:
+            self.addCleanup(patch.stop)
+        self.load()
+        for stage_mock in mocks:
+            stage_mock.assert_not_called()
+        self.assertEqual(self.created(), {
+            'Semester': 1, 'Series': 2, 'Problem': 3, 'User': 2, 'Profile': 3,
+            'EventRegistration': 2, 'Solution': 3})
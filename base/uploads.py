@@ -0,0 +1,93 @@
+"""
+Spracovanie nahrávaných súborov.
+
+Handlery si počas prúdu dát zapamätajú začiatok súboru, z ktorého sa raz
+určí MIME typ (uloží sa na UploadedFile ako `mime_type`, base.utils.mime_type
+ho už nečíta znova), a strážia veľkosť. Súbor nad limit sa ďalej neukladá
+do pamäte ani na disk, namiesto neho príde RejectedUploadedFile so
+skutočnou veľkosťou, takže ho view odmietne bežnou kontrolou `file.size`.
+"""
+from typing import Optional
+
+import magic
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (MemoryFileUploadHandler,
+                                             TemporaryFileUploadHandler)
+
+# Rovnaký začiatok súboru, aký číta base.utils.mime_type
+SNIFF_SIZE = 2048
+
+
+def sniff_mime_type(head: bytes) -> str:
+    return magic.from_buffer(head, mime=True)
+
+
+class RejectedUploadedFile(UploadedFile):
+    """Súbor prekračujúci limit, známa je iba jeho veľkosť a typ, nie obsah"""
+
+    def __init__(self, name, content_type, size, charset, mime_type):
+        super().__init__(None, name, content_type, size, charset)
+        self.mime_type = mime_type
+
+    def _reject(self, *args, **kwargs):
+        raise RequestDataTooBig(f'Súbor {self.name} prekročil povolenú veľkosť')
+
+    open = read = chunks = __iter__ = _reject
+
+
+class ValidatingUploadMixin:
+    """Určenie typu a kontrola veľkosti počas nahrávania, pre handlery Djanga"""
+    max_size: Optional[int] = None
+
+    def new_file(self, *args, **kwargs):
+        self.head = b''
+        self.received = 0
+        self.rejected = False
+        super().new_file(*args, **kwargs)
+
+    def _handles_file(self) -> bool:
+        # Pamäťový handler pri veľkom requeste iba posiela dáta ďalej
+        return getattr(self, 'activated', True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self._handles_file():
+            return super().receive_data_chunk(raw_data, start)
+        self.received += len(raw_data)
+        if len(self.head) < SNIFF_SIZE:
+            self.head += raw_data[:SNIFF_SIZE - len(self.head)]
+        if not self.rejected and self.max_size is not None and self.received > self.max_size:
+            self.rejected = True
+            self.file.close()
+        if self.rejected:
+            return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self._handles_file():
+            return super().file_complete(file_size)
+        if self.rejected:
+            return RejectedUploadedFile(self.file_name, self.content_type, self.received,
+                                        self.charset, sniff_mime_type(self.head))
+        file = super().file_complete(file_size)
+        file.mime_type = sniff_mime_type(self.head)
+        return file
+
+
+class ValidatingMemoryFileUploadHandler(ValidatingUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class ValidatingTemporaryFileUploadHandler(ValidatingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def limit_upload_size(request, max_size: int) -> None:
+    """
+    Nastaví limit veľkosti nahrávaných súborov requestu. Treba ho zavolať
+    pred prvým prístupom k request.FILES, inak už platí iba kontrola
+    `file.size` vo view.
+    """
+    for handler in request.upload_handlers:
+        if isinstance(handler, ValidatingUploadMixin):
+            handler.max_size = max_size
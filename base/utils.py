@@ -1,11 +1,35 @@
+import unicodedata
+
 import magic
 from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
 
 
 def mime_type(file: File) -> str:
-    """Zistí mime type zadaného súboru"""
-
+    """
+    Zistí mime type zadaného súboru. Nahraté súbory ho majú určený už
+    z nahrávania (base.uploads), inak sa prečíta začiatok súboru a pozícia
+    v ňom sa vráti späť.
+    """
+    cached = getattr(file, 'mime_type', None)
+    if cached is not None:
+        return cached
+    if file.closed:
+        file.open(mode='rb')
+    position = file.tell()
+    file.seek(0)
     # Podľa dokumentácie python-magic by mali prvé dva kB
     # spoľahlivo stačiť na určenie typu
-    file.open(mode='rb')
-    return magic.from_buffer(file.read(2048), mime=True)
+    detected = magic.from_buffer(file.read(2048), mime=True)
+    file.seek(position)
+    if isinstance(file, UploadedFile):
+        file.mime_type = detected
+    return detected
+
+
+def normalize(text) -> str:
+    """Odstráni diakritiku a zmení na malé písmená"""
+    return ''.join(
+        c for c in unicodedata.normalize('NFKD', str(text))
+        if not unicodedata.combining(c)
+    ).lower()
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CmsConfig(AppConfig):
     name = 'cms'
     verbose_name = 'Správa obsahu'
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel
+        from cms.caching import connect_signals
+        connect_signals()
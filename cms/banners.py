@@ -0,0 +1,85 @@
+"""
+Správy info bannera pre sériu a súťaž.
+
+Všetky správy stránky sa vyrenderujú naraz (bannery s predlohami a akciou
+alebo sériou v jednom dotaze) a uložia sa do cache. Platia do najbližšej
+udalosti, ktorá mení text: koniec odovzdávania série, začiatok alebo
+koniec registrácie, koniec akcie. Skôr ich zneplatní iba uloženie
+niektorého zo zdrojových modelov (pozri cms.caching).
+"""
+from datetime import datetime
+from typing import Optional
+
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.timezone import now
+
+from cms.caching import (COMPETITION_BANNER_MODELS, SERIES_BANNER_MODELS,
+                         cached_payload)
+from cms.models import InfoBanner
+from competition.models import Event, Series
+
+
+def format_date(datetime_: datetime) -> str:
+    return timezone.localtime(datetime_).strftime("%d.%m.%Y %H:%M")
+
+
+def _render_banners(banners) -> list[str]:
+    return [banner.render_message()
+            for banner in banners.select_related('message_template', 'event', 'series')]
+
+
+def series_banner_messages(series_id: int) -> list[str]:
+    """Správy bannera pri úlohách série"""
+    return cached_payload('banner-series', series_id, SERIES_BANNER_MODELS,
+                          lambda: _build_series_messages(series_id))
+
+
+def _build_series_messages(series_id: int) -> tuple[list[str], Optional[datetime]]:
+    series = get_object_or_404(Series.objects.select_related('semester'), pk=series_id)
+    messages = _render_banners(InfoBanner.objects.filter(series=series))
+    expires_at = None
+    submission_end = series.submission_end
+    if series.complete:
+        messages.append('Séria je uzavretá')
+    elif now() < submission_end:
+        messages.append(f'Termín série: {format_date(series.deadline)}')
+        expires_at = submission_end
+    else:
+        messages.append('Prebieha opravovanie')
+    return messages, expires_at
+
+
+def competition_banner_messages(competition_id: int) -> list[str]:
+    """Správy bannera súťaže k jej najbližšej akcii"""
+    return cached_payload('banner-competition', competition_id, COMPETITION_BANNER_MODELS,
+                          lambda: _build_competition_messages(competition_id))
+
+
+def _build_competition_messages(competition_id: int) -> tuple[list[str], Optional[datetime]]:
+    try:
+        event = Event.objects.select_related(
+            'competition__competition_type', 'registration_link'
+        ).filter(competition=competition_id, end__gte=now()).earliest('start')
+    except Event.DoesNotExist:
+        return [], None
+    messages = _render_banners(InfoBanner.objects.filter(event=event))
+    # Keď akcia skončí, banner patrí ďalšej akcii
+    boundaries = [event.end]
+
+    link = event.registration_link
+    if link is not None:
+        seminar = event.competition.competition_type.name == 'Seminár'
+        if link.start > now():
+            prefix = ('Prihlasovanie na sústredenie bude spustené ' if seminar
+                      else 'Registrácia bude spustená ')
+            messages.append(prefix + format_date(link.start))
+            boundaries.append(link.start)
+        elif link.end > now():
+            prefix = ('Prihlasovanie na sústredenie končí ' if seminar
+                      else 'Registrácia bude uzavretá ')
+            messages.append(prefix + format_date(link.end))
+            boundaries.append(link.end)
+        elif not seminar:
+            messages.append('Registrácia ukončená')
+    return messages, min(boundaries)
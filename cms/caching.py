@@ -0,0 +1,68 @@
+"""
+Cache verejných CMS odpovedí (menu, príspevky, info banner, statické stránky),
+ktoré sa načítavajú pri každom zobrazení stránky.
+
+Kľúč sa skladá z endpointu, jeho parametrov (stránka, filtre) a verzií
+modelov, z ktorých odpoveď vzniká, takže uloženie alebo zmazanie
+ktoréhokoľvek z nich odpoveď zneplatní. Odpovede závislé od viditeľnosti
+(visible_after/visible_until) platia najviac do najbližšej hranice,
+keď sa niečo zobrazí alebo skryje.
+"""
+import math
+from datetime import datetime
+from typing import Callable, Optional
+
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed
+from django.utils.timezone import now
+
+from base.reference_data import bump_version, make_etag, track
+from cms.models import (FlatPage, InfoBanner, MenuItem, MessageTemplate, Post,
+                        PostLink)
+from competition.models import (Competition, CompetitionType, Event, LateTag,
+                                RegistrationLink, Semester, Series)
+
+CMS_CACHE_TIMEOUT = 60 * 60
+
+MENU_MODELS = (MenuItem,)
+POST_MODELS = (Post, PostLink)
+FLAT_PAGE_MODELS = (FlatPage,)
+INFO_BANNER_MODELS = (InfoBanner, MessageTemplate, Event, Semester, Series)
+SERIES_BANNER_MODELS = (InfoBanner, MessageTemplate, Series, Semester, LateTag)
+# Semester je podtrieda Event, jeho uloženie posiela signál iba so senderom Semester
+COMPETITION_BANNER_MODELS = (InfoBanner, MessageTemplate, Event, Semester, RegistrationLink,
+                             Competition, CompetitionType)
+
+
+def cached_payload(endpoint: str, params, tracked_models,
+                   build: Callable[[], tuple[object, Optional[datetime]]]):
+    """
+    Vráti dáta endpointu z cache, prípadne ich vyrobí. `build` vráti dáta
+    a čas, kedy prestanú platiť (None ak ich mení iba uloženie modelov).
+    """
+    key = f'cms:{endpoint}:{make_etag(tracked_models, endpoint, params)}'
+    payload = cache.get(key)
+    if payload is None:
+        payload, expires_at = build()
+        cache.set(key, payload, _cache_timeout(expires_at))
+    return payload
+
+
+def _cache_timeout(expires_at: Optional[datetime]) -> int:
+    if expires_at is None:
+        return CMS_CACHE_TIMEOUT
+    seconds = math.ceil((expires_at - now()).total_seconds())
+    return max(1, min(CMS_CACHE_TIMEOUT, seconds))
+
+
+def _bump_m2m_owner(sender, instance, action, reverse, model, **kwargs):
+    # pylint: disable=unused-argument,too-many-arguments
+    if action.startswith('post_'):
+        bump_version(model if reverse else type(instance))
+
+
+def connect_signals():
+    track(*MENU_MODELS, *POST_MODELS, *FLAT_PAGE_MODELS, *INFO_BANNER_MODELS,
+          *SERIES_BANNER_MODELS, *COMPETITION_BANNER_MODELS)
+    for through in (MenuItem.sites.through, Post.sites.through, Semester.late_tags.through):
+        m2m_changed.connect(_bump_m2m_owner, sender=through)
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cms', '0005_logo_url'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['visible_after', 'visible_until'], name='cms_post_visibility_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-added_at', '-id'], name='cms_post_added_at_idx'),
+        ),
+    ]
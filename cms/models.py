@@ -1,3 +1,7 @@
+import re
+from functools import lru_cache
+from string import Formatter
+
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.timezone import now
@@ -34,6 +38,16 @@ class FlatPage(models.Model):
         return f"{self.url} - {self.title}"
 
 
+@lru_cache(maxsize=256)
+def template_fields(message: str) -> tuple[str, ...]:
+    """Mená polí použitých v šablóne správy, šablóna sa parsuje iba raz"""
+    return tuple({
+        re.split(r'[.\[]', field_name, maxsplit=1)[0]
+        for _, field_name, _, _ in Formatter().parse(message)
+        if field_name
+    })
+
+
 class MessageTemplate(models.Model):
     class Meta:
         verbose_name = 'Generické správy pre banner a posty'
@@ -50,7 +64,9 @@ class MessageTemplate(models.Model):
     is_active = models.BooleanField(verbose_name='Aktívna', default=True)
 
     def render_with(self, event):
-        return self.message.format(**event.__dict__,)
+        values = event if isinstance(event, dict) else vars(event)
+        return self.message.format(
+            **{name: values[name] for name in template_fields(self.message)})
 
 
 class Post(ModelWithVisibility):
@@ -58,6 +74,12 @@ class Post(ModelWithVisibility):
         verbose_name = 'príspevok'
         verbose_name_plural = 'príspevky'
         ordering = ['-added_at', ]
+        indexes = [
+            models.Index(fields=['visible_after', 'visible_until'],
+                         name='cms_post_visibility_idx'),
+            # Stránkovanie kurzorom podľa času pridania
+            models.Index(fields=['-added_at', '-id'], name='cms_post_added_at_idx'),
+        ]
 
     caption = models.CharField(verbose_name='nadpis', max_length=50)
     short_text = models.CharField(
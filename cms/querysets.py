@@ -1,5 +1,5 @@
 
-from django.db.models import QuerySet
+from django.db.models import Min, Q, QuerySet
 from django.utils.timezone import now
 
 
@@ -7,3 +7,12 @@ class VisibilityQuerySet(QuerySet):
     def visible(self):
         today = now()
         return self.filter(visible_after__lte=today, visible_until__gte=today)
+
+    def next_visibility_change(self):
+        """Najbližší čas, keď sa niektorý objekt zobrazí alebo skryje"""
+        today = now()
+        boundaries = self.aggregate(
+            shown=Min('visible_after', filter=Q(visible_after__gt=today)),
+            hidden=Min('visible_until', filter=Q(visible_until__gte=today)))
+        return min((boundary for boundary in boundaries.values() if boundary is not None),
+                   default=None)
@@ -1,5 +1,15 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.utils.timezone import now
 from rest_framework.test import APITestCase
 
+from base.models import Site
+from base.reference_data import make_etag
+from cms.caching import COMPETITION_BANNER_MODELS, INFO_BANNER_MODELS
+from cms.models import MessageTemplate, Post, PostLink
+from competition.models import Semester, Series
+
 from tests.test_utils import PermissionTestMixin, get_app_fixtures
 
 
@@ -51,6 +61,63 @@ class TestPosts(APITestCase, PermissionTestMixin):
             for key in self.post_expected_keys:
                 self.assertIn(key, response)
 
+    def test_visible_posts_cache(self):
+        '''/visible is cached until a post changes or its visibility ends'''
+        url = self.URL_PREFIX + '/visible/'
+        visible = self.client.get(url).json()
+        with self.assertNumQueries(0):
+            self.assertEqual(visible, self.client.get(url).json())
+
+        post = Post.objects.get(pk=visible[0]['id'])
+        post.caption = 'Zmenený príspevok'
+        post.save()
+        self.assertEqual('Zmenený príspevok', self.client.get(url).json()[0]['caption'])
+
+    def create_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                caption=f'Príspevok {i}', short_text='Text',
+                visible_after=now() - timedelta(days=1),
+                visible_until=now() + timedelta(days=1))
+            post.sites.set(Site.objects.all())
+            for j in range(2):
+                PostLink.objects.create(post=post, caption=f'Link {j}', url='/')
+
+    def test_visible_posts_queries(self):
+        '''/visible renders in a constant number of queries'''
+        url = self.URL_PREFIX + '/visible/'
+        self.create_posts(1)
+        # príspevky, linky, stránky a najbližšia zmena viditeľnosti
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        self.create_posts(5)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertTrue(all(len(post['links']) == 2 for post in response.json()
+                            if post['caption'].startswith('Príspevok')))
+
+    def test_visible_posts_cursor(self):
+        '''/visible?page_size= pages by added_at without overlaps'''
+        self.create_posts(5)
+        visible = self.client.get(self.URL_PREFIX + '/visible/').json()
+        response = self.client.get(
+            self.URL_PREFIX + '/visible/', {'page_size': 3}).json()
+        ids = [post['id'] for post in response['results']]
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            ids += [post['id'] for post in response['results']]
+        self.assertEqual([post['id'] for post in visible], ids)
+
+    def test_visible_posts_cache_timeout(self):
+        '''cache expires at the next visibility boundary'''
+        post = Post.objects.visible().first()
+        post.visible_until = now() + timedelta(minutes=5)
+        post.save()
+        with patch('cms.caching.cache.set') as cache_set:
+            self.client.get(self.URL_PREFIX + '/visible/')
+        self.assertLessEqual(cache_set.call_args.args[2], 5 * 60)
+
 
 class TestMenuItems(APITestCase, PermissionTestMixin):
     '''cms/menu-item'''
@@ -81,3 +148,43 @@ class TestMenuItems(APITestCase, PermissionTestMixin):
         self.assertTrue(len(response.json()) > 0)
         self.check_permissions(self.URL_PREFIX + '/on-site/1',
                                'GET', self.PUBLIC_OK_RESPONSES, {})
+
+
+class TestInfoBanner(APITestCase):
+    '''cms/info-banner'''
+
+    URL_PREFIX = '/api/cms/info-banner'
+
+    fixtures = get_app_fixtures([
+        'base',
+        'competition',
+        'personal',
+        'user',
+        'cms'
+    ])
+
+    def test_series_problems_cached(self):
+        '''series banner is rendered once and refreshed on template change'''
+        url = self.URL_PREFIX + '/series-problems/0/'
+        series = Series.objects.get(pk=0)
+        messages = self.client.get(url).json()
+        self.assertIn(f'Termín série {series.deadline}', messages)
+        with self.assertNumQueries(0):
+            self.assertEqual(messages, self.client.get(url).json())
+
+        template = MessageTemplate.objects.get(pk=0)
+        template.message = 'Uzávierka {deadline}'
+        template.save()
+        self.assertIn(f'Uzávierka {series.deadline}', self.client.get(url).json())
+
+    def test_semester_change_invalidates_banners(self):
+        '''saving a semester (an Event subclass) invalidates event banners'''
+        for models in (INFO_BANNER_MODELS, COMPETITION_BANNER_MODELS):
+            etag = make_etag(models, 'banner')
+            Semester.objects.first().save()
+            self.assertNotEqual(etag, make_etag(models, 'banner'))
+
+    def test_render_template_without_object(self):
+        '''template without placeholders renders without event or series'''
+        template = MessageTemplate(message='Vitaj')
+        self.assertEqual('Vitaj', template.render_with({}))
@@ -1,17 +1,17 @@
 
 
-from datetime import datetime
-
-from django.utils import timezone
-from django.utils.timezone import now
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 from base.permissions import IsAdminOrReadOnly
+from cms.banners import competition_banner_messages, series_banner_messages
+from cms.caching import (FLAT_PAGE_MODELS, INFO_BANNER_MODELS, MENU_MODELS,
+                         POST_MODELS, cached_payload)
 from cms.models import (FileUpload, FlatPage, Gallery, InfoBanner, Logo,
                         MenuItem, MessageTemplate, Post)
 from cms.permissions import PostPermission
@@ -19,7 +19,7 @@ from cms.serializers import (FileUploadSerializer, FlatPageSerializer,
                              GallerySerializer, InfoBannerSerializer,
                              LogoSerializer, MenuItemShortSerializer,
                              MessageTemplateSerializer, PostSerializer)
-from competition.models import Competition, Event, Series
+from competition.models import Series
 
 
 class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
@@ -38,16 +38,28 @@ class MenuItemViewSet(viewsets.ReadOnlyModelViewSet):
     def on_site(self, request: Request, site_id):
         """Položky menu na stránke(na stránke Matik, Malynár ...)"""
         filter_by = request.query_params.get('type')
-        queryset = self.get_queryset().filter(
-            sites=site_id)
-        items = self.filter_(queryset, filter_by)
-        serializer = MenuItemShortSerializer(items, many=True)
-        return Response(serializer.data)
+
+        def build():
+            queryset = self.get_queryset().filter(
+                sites=site_id)
+            items = self.filter_(queryset, filter_by)
+            return MenuItemShortSerializer(items, many=True).data, None
+
+        return Response(cached_payload(
+            'menu-on-site', (site_id, filter_by), MENU_MODELS, build))
+
+
+class PostCursorPagination(CursorPagination):
+    """Stránkovanie príspevkov od najnovších, stabilné aj pri pridaní nového"""
+    ordering = ('-added_at', '-id')
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 class PostViewSet(viewsets.ModelViewSet):
     """Príspevky"""
-    queryset = Post.objects.all()
+    queryset = Post.objects.prefetch_related('links', 'sites')
     serializer_class = PostSerializer
     permission_classes = (PostPermission,)
     filter_backends = [DjangoFilterBackend,
@@ -59,10 +71,28 @@ class PostViewSet(viewsets.ModelViewSet):
 
     @action(detail=False)
     def visible(self, request):
-        """Iba príspevky viditeľné pre užívateľov"""
-        posts = self.filter_queryset(self.get_queryset()).visible()
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+        """
+        Iba príspevky viditeľné pre užívateľov. S parametrom `cursor`
+        alebo `page_size` stránkované kurzorom podľa času pridania.
+        """
+        paginate = {'cursor', 'page_size'} & request.query_params.keys()
+
+        def build():
+            posts = self.filter_queryset(self.get_queryset())
+            visible = posts.visible()
+            if paginate:
+                paginator = PostCursorPagination()
+                page = paginator.paginate_queryset(visible, request, view=self)
+                data = paginator.get_paginated_response(
+                    PostSerializer(page, many=True).data).data
+            else:
+                data = PostSerializer(visible, many=True).data
+            return data, posts.next_visibility_change()
+
+        # Odkazy na ďalšiu stránku sú absolútne, preto kľúč obsahuje aj adresu servera
+        return Response(cached_payload(
+            'post-visible', (request.build_absolute_uri('/'), sorted(request.query_params.lists())),
+            POST_MODELS, build))
 
 
 class LogoViewSet(viewsets.ReadOnlyModelViewSet):
@@ -74,26 +104,27 @@ class LogoViewSet(viewsets.ReadOnlyModelViewSet):
 class InfoBannerViewSet(viewsets.ModelViewSet):
     """Správy v čiernom info banneri"""
     serializer_class = InfoBannerSerializer
-    queryset = InfoBanner.objects.visible()
+    queryset = InfoBanner.objects.all()
     filterset_fields = ['event', 'page', 'series']
 
-    def format_date(self, datetime_: datetime):
-        return timezone.localtime(datetime_).strftime("%d.%m.%Y %H:%M")
+    def get_queryset(self):
+        # Viditeľnosť sa musí vyhodnotiť pri každej požiadavke
+        return InfoBanner.objects.visible().select_related(
+            'message_template', 'event', 'series')
+
+    def list(self, request, *args, **kwargs):
+        uncached_list = super().list
+
+        def build():
+            return (uncached_list(request, *args, **kwargs).data,
+                    InfoBanner.objects.next_visibility_change())
+
+        return Response(cached_payload(
+            'info-banner', sorted(request.query_params.lists()), INFO_BANNER_MODELS, build))
 
     @action(methods=['get'], detail=False, url_path=r'series-problems/(?P<series_id>\d+)')
-    def series_problems(self, request, series_id: int) -> list[str]:
-        series_messages = InfoBanner.objects.filter(series=series_id).all()
-        messages = [message.render_message() for message in series_messages]
-        series = Series.objects.get(pk=series_id)
-        if series.complete:
-            messages.append('Séria je uzavretá')
-        elif series.can_submit:
-            messages.append(
-                f'Termín série: {self.format_date(series.deadline)}'
-            )
-        else:
-            messages.append('Prebieha opravovanie')
-        return Response(messages)
+    def series_problems(self, request, series_id: int) -> Response:
+        return Response(series_banner_messages(int(series_id)))
 
     @action(methods=['get'], detail=False, url_path=r'series-results/(?P<series_id>\d+)')
     def series_results(self, request, series_id):
@@ -103,39 +134,8 @@ class InfoBannerViewSet(viewsets.ModelViewSet):
         return Response([])
 
     @action(methods=['get'], detail=False, url_path=r'competition/(?P<competition_id>\d+)')
-    def event(self, request, competition_id: int) -> list[str]:
-        competition = Competition.objects.get(pk=competition_id)
-        try:
-            event = Event.objects.filter(
-                competition=competition_id, end__gte=now()).earliest('start')
-        except Event.DoesNotExist:
-            return Response([])
-        event_messages = InfoBanner.objects.filter(event=event).all()
-        messages = [message.render_message() for message in event_messages]
-
-        if event.registration_link is not None:
-            if competition.competition_type.name == 'Seminár':
-                if event.registration_link.start > now():
-                    messages.append(
-                        'Prihlasovanie na sústredenie bude spustené '
-                        f'{self.format_date(event.registration_link.start)}')
-                elif event.registration_link.end > now():
-                    messages.append(
-                        'Prihlasovanie na sústredenie končí '
-                        f'{self.format_date(event.registration_link.end)}')
-            else:
-                if event.registration_link.start > now():
-                    messages.append(
-                        'Registrácia bude spustená '
-                        f'{self.format_date(event.registration_link.start)}')
-                elif event.registration_link.end > now():
-                    messages.append(
-                        'Registrácia bude uzavretá '
-                        f'{self.format_date(event.registration_link.end)}')
-
-                else:
-                    messages.append('Registrácia ukončená')
-        return Response(messages)
+    def event(self, request, competition_id: int) -> Response:
+        return Response(competition_banner_messages(int(competition_id)))
 
 
 class MessageTemplateViewSet(viewsets.ModelViewSet):
@@ -159,13 +159,14 @@ class FlatPageViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'], url_path='by-url/(?P<slug>.+)')
     def by_url(self, request, slug):
-        try:
-            page = self.queryset.get(url=slug)
-
-            return Response(FlatPageSerializer(page).data)
-
-        except FlatPage.DoesNotExist as exc:
-            raise NotFound from exc
+        def build():
+            try:
+                page = self.queryset.get(url=slug)
+            except FlatPage.DoesNotExist as exc:
+                raise NotFound from exc
+            return FlatPageSerializer(page).data, None
+
+        return Response(cached_payload('flat-page', slug, FLAT_PAGE_MODELS, build))
 
 
 class GalleryViewSet(viewsets.ModelViewSet):
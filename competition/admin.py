@@ -1,10 +1,13 @@
 from django.contrib import admin, messages
 from django.http import HttpResponseRedirect
+from django.utils.html import format_html
 
+from base.admin import BulkListEditableMixin, EstimatedCountPaginator
 from competition.models import (Comment, Competition, Event, EventRegistration,
                                 Grade, LateTag, Problem, ProblemCorrection,
                                 Publication, PublicationType, RegistrationLink,
                                 Semester, Series, Solution)
+from competition.results import freeze_competition_year
 
 
 @admin.register(Grade)
@@ -114,6 +117,24 @@ class SemesterAdmin(admin.ModelAdmin):
         'season_code'
     )
 
+    actions = ['freeze_competition_year']
+
+    @admin.action(description='Uzavrieť všetky série a semestre ročníka')
+    def freeze_competition_year(self, request, queryset):
+        years = queryset.values_list(
+            'competition', 'year').distinct().order_by()
+        for competition_pk, year in years:
+            competition = Competition.objects.get(pk=competition_pk)
+            blockers = freeze_competition_year(competition, year)
+            if not blockers:
+                self.message_user(
+                    request, f'{competition.name}, {year}. ročník bol uzavretý')
+                continue
+            for series, diagnostics in blockers.items():
+                self.message_user(
+                    request, f'{series}: {"; ".join(diagnostics.messages())}',
+                    level=messages.ERROR)
+
 
 @admin.register(Problem)
 class ProblemAdmin(admin.ModelAdmin):
@@ -134,7 +155,7 @@ class ProblemAdmin(admin.ModelAdmin):
 
 
 @admin.register(Solution)
-class SolutionAdmin(admin.ModelAdmin):
+class SolutionAdmin(BulkListEditableMixin, admin.ModelAdmin):
     list_display = (
         'solution_name',
         'problem',
@@ -143,9 +164,23 @@ class SolutionAdmin(admin.ModelAdmin):
         'late_tag',
         'is_online',
         'score',
+        'page_count',
+        'preview',
     )
 
     list_editable = ('score', )
+    # Všetko, čo potrebujú `solution_name` a __str__ riešiteľa a úlohy
+    list_select_related = (
+        'problem__series__semester__competition',
+        'semester_registration__profile',
+        'semester_registration__event__competition',
+        'semester_registration__event__semester__competition',
+        'late_tag',
+    )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    readonly_fields = ('page_count', 'preview')
 
     list_filter = (
         'semester_registration__event__competition',
@@ -164,6 +199,12 @@ class SolutionAdmin(admin.ModelAdmin):
         return obj.semester_registration.profile.get_full_name()\
             + ' | ' + str(obj.problem.order)
 
+    @admin.display(description='náhľad')
+    def preview(self, obj):
+        if not obj.thumbnail:
+            return '-'
+        return format_html('<img src="{}" width="100" alt="">', obj.thumbnail.url)
+
 
 @admin.register(PublicationType)
 class PublicationTypeAdmin(admin.ModelAdmin):
@@ -176,6 +217,7 @@ class PublicationTypeAdmin(admin.ModelAdmin):
 @admin.register(Publication)
 class PublicationAdmin(admin.ModelAdmin):
     change_form_template = 'competition/admin/publication_change.html'
+    readonly_fields = ('file_size', 'file_hash')
 
     def response_change(self, request, obj):
         if 'generate-name' in request.POST:
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CompetitionConfig(AppConfig):
     name = 'competition'
     verbose_name = 'Súťaže'
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel,unused-import
+        import competition.search
+        from competition import landing, previews
+        landing.connect_signals()
+        previews.connect_signals()
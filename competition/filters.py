@@ -1,7 +1,3 @@
-
-
-import unicodedata
-
 from django.db import connection
 from django.db.models import Func, Q
 from django.db.models.functions import Lower
@@ -10,6 +6,9 @@ from django.utils.timezone import now
 from django_filters import BooleanFilter
 from rest_framework.filters import SearchFilter
 
+from base.search import normalized_path, search_index
+from base.utils import normalize
+
 
 class UpcomingFilter(BooleanFilter):
     def filter(self, qs: BaseManager, value: bool):
@@ -47,17 +46,23 @@ class UnaccentSearchFilter(SearchFilter):
         if not search_terms:
             return queryset
 
+        if search_index.covers(queryset.model, self.get_search_fields(view, request)):
+            return search_index.filter(queryset, search_terms)
+
         engine = connection.vendor
 
         for term in search_terms:
+            normalized_term = normalize(term)
             term_filter = Q()
             for field in self.get_search_fields(view, request):
+                stored_field = normalized_path(queryset.model, field)
+
+                if stored_field is not None:
+                    # Uložená normalizovaná kópia, porovnáva sa priamo stĺpec
+                    term_filter |= Q(
+                        **{f"{stored_field}__contains": normalized_term})
 
-                if engine == 'postgresql':
-                    normalized_term = ''.join(
-                        c for c in unicodedata.normalize('NFKD', term)
-                        if not unicodedata.combining(c)
-                    ).lower()
+                elif engine == 'postgresql':
                     normalized_field = f'normalized_{field.replace(".", "_")}'
                     if normalized_field not in queryset.query.annotations:
                         queryset = queryset.annotate(**{
@@ -0,0 +1,97 @@
+"""
+Kešovaná úvodná stránka súťaže (súťaž s aktuálnou akciou a históriou akcií).
+
+Payload sa zahodí pri zmene súťaže, jej akcií, publikácií, registračných
+odkazov alebo galérií. Pri presune akcie do inej súťaže alebo publikácie
+či galérie k inej akcii sa zahodí aj payload pôvodnej súťaže. Inak platí
+najviac do konca aktuálnej akcie, keď sa presúva do histórie.
+"""
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+from django.utils.timezone import now
+
+from competition.models import (Competition, Event, Publication,
+                                RegistrationLink, Semester)
+from competition.serializers import CompetitionSerializer
+
+LANDING_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(competition_id: int) -> str:
+    return f'competition:landing:{competition_id}'
+
+
+def get_landing_payload(competition: Competition) -> dict:
+    """Vráti serializovanú súťaž z cache, prípadne ju vyrobí"""
+    key = _cache_key(competition.pk)
+    payload = cache.get(key)
+    if payload is None:
+        payload = CompetitionSerializer(competition).data
+        cache.set(key, payload, _cache_timeout(competition))
+    return payload
+
+
+def _cache_timeout(competition: Competition) -> int:
+    upcoming_end = competition.event_set.filter(
+        end__gte=now()).order_by('end').values_list('end', flat=True).first()
+    if upcoming_end is None:
+        return LANDING_CACHE_TIMEOUT
+    return max(1, min(LANDING_CACHE_TIMEOUT, int((upcoming_end - now()).total_seconds())))
+
+
+def invalidate_landing_payload(competition_id: int) -> None:
+    cache.delete(_cache_key(competition_id))
+
+
+def _invalidate_competition(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    invalidate_landing_payload(instance.pk)
+
+
+def _remember_competition(sender, instance, **kwargs):
+    # pylint: disable=unused-argument,protected-access
+    instance._landing_competition_id = instance.__dict__.get('competition_id')
+
+
+def _invalidate_event(sender, instance, **kwargs):
+    # pylint: disable=unused-argument,protected-access
+    previous = getattr(instance, '_landing_competition_id', None)
+    for competition_id in {instance.competition_id, previous} - {None}:
+        invalidate_landing_payload(competition_id)
+    instance._landing_competition_id = instance.competition_id
+
+
+def _remember_event(sender, instance, **kwargs):
+    # pylint: disable=unused-argument,protected-access
+    instance._landing_event_id = instance.__dict__.get('event_id')
+
+
+def _invalidate_event_relation(sender, instance, **kwargs):
+    # pylint: disable=unused-argument,protected-access
+    event_ids = {instance.event_id, getattr(instance, '_landing_event_id', None)} - {None}
+    if event_ids:
+        for competition_id in set(Event.objects.filter(
+                pk__in=event_ids).values_list('competition', flat=True)):
+            invalidate_landing_payload(competition_id)
+    instance._landing_event_id = instance.event_id
+
+
+def _invalidate_registration_link(sender, instance, **kwargs):
+    # pylint: disable=unused-argument
+    for competition_id in Event.objects.filter(
+            registration_link=instance.pk).values_list('competition', flat=True):
+        invalidate_landing_payload(competition_id)
+
+
+def connect_signals():
+    post_init.connect(_remember_competition, sender=Event)
+    post_init.connect(_remember_competition, sender=Semester)
+    post_init.connect(_remember_event, sender=Publication)
+    post_init.connect(_remember_event, sender='cms.Gallery')
+    for signal in (post_save, post_delete):
+        signal.connect(_invalidate_competition, sender=Competition)
+        signal.connect(_invalidate_event, sender=Event)
+        signal.connect(_invalidate_event, sender=Semester)
+        signal.connect(_invalidate_event_relation, sender=Publication)
+        signal.connect(_invalidate_event_relation, sender='cms.Gallery')
+        signal.connect(_invalidate_registration_link, sender=RegistrationLink)
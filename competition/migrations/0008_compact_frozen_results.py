@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:58
+
+from django.db import migrations, models
+
+# Kópia competition.utils.frozen_results z čias tejto migrácie,
+# aby ju neskoršie zmeny formátu neovplyvnili
+
+
+def _pack_points(points):
+    if points in ('?', '-'):
+        return None
+    return int(points)
+
+
+def _registration_pk(registration):
+    if isinstance(registration, dict):
+        return registration['id']
+    return registration
+
+
+def pack_results(results):
+    problems = [
+        [solution['problem_pk'] for solution in series]
+        for series in results[0]['solutions']
+    ] if results else []
+    return {
+        'version': 1,
+        'problems': problems,
+        'rows': [
+            [
+                _registration_pk(row['registration']),
+                row['rank_start'],
+                row['rank_end'],
+                row['rank_changed'],
+                row['subtotal'],
+                row['total'],
+                [[_pack_points(solution['points']) for solution in series]
+                 for series in row['solutions']],
+                [[solution['solution_pk'] for solution in series]
+                 for series in row['solutions']],
+            ]
+            for row in results
+        ]
+    }
+
+
+def is_packed(frozen_results):
+    return isinstance(frozen_results, dict) and 'version' in frozen_results
+
+
+def pack_frozen_results(apps, schema_editor):
+    for model_name in ['Semester', 'Series']:
+        model = apps.get_model('competition', model_name)
+        for obj in model.objects.filter(frozen_results__isnull=False):
+            if is_packed(obj.frozen_results):
+                continue
+            obj.frozen_results = pack_results(obj.frozen_results)
+            obj.save(update_fields=['frozen_results'])
+
+
+def unfreeze_packed_results(apps, schema_editor):
+    # Kompaktný formát neobsahuje údaje o registráciách,
+    # výsledky je po návrate potrebné znova zamraziť
+    for model_name in ['Semester', 'Series']:
+        model = apps.get_model('competition', model_name)
+        model.objects.filter(
+            frozen_results__isnull=False).update(frozen_results=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0007_competition_default_sum_method_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='semester',
+            name='frozen_results',
+            field=models.JSONField(blank=True, default=None, null=True),
+        ),
+        migrations.AlterField(
+            model_name='series',
+            name='frozen_results',
+            field=models.JSONField(blank=True, default=None, null=True),
+        ),
+        migrations.RunPython(pack_frozen_results, unfreeze_packed_results),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Stĺpce riadku kompaktného formátu verzie 1 (competition.utils.frozen_results)
+ROW_REGISTRATION = 0
+ROW_RANK_START = 1
+ROW_RANK_END = 2
+ROW_TOTAL = 5
+
+
+def is_packed(frozen_results):
+    return isinstance(frozen_results, dict) and 'version' in frozen_results
+
+
+def index_frozen_results(apps, schema_editor):
+    EventRegistration = apps.get_model('competition', 'EventRegistration')
+    FrozenResultRow = apps.get_model('competition', 'FrozenResultRow')
+    Semester = apps.get_model('competition', 'Semester')
+    Series = apps.get_model('competition', 'Series')
+
+    frozen = [
+        (semester.pk, None, semester.frozen_results)
+        for semester in Semester.objects.filter(frozen_results__isnull=False)
+    ] + [
+        (series.semester_id, series.pk, series.frozen_results)
+        for series in Series.objects.filter(frozen_results__isnull=False)
+    ]
+    profiles = dict(EventRegistration.objects.values_list('pk', 'profile'))
+    rows = []
+    for semester, series, frozen_results in frozen:
+        if not is_packed(frozen_results):
+            continue
+        rows += [
+            FrozenResultRow(
+                profile_id=profiles[row[ROW_REGISTRATION]],
+                registration_id=row[ROW_REGISTRATION],
+                semester_id=semester,
+                series_id=series,
+                rank_start=row[ROW_RANK_START],
+                rank_end=row[ROW_RANK_END],
+                total=row[ROW_TOTAL],
+            )
+            for row in frozen_results['rows']
+            if row[ROW_REGISTRATION] in profiles
+        ]
+    FrozenResultRow.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0008_compact_frozen_results'),
+        ('personal', '0005_alter_otherschoolrequest_options'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FrozenResultRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank_start', models.PositiveIntegerField(verbose_name='poradie od')),
+                ('rank_end', models.PositiveIntegerField(verbose_name='poradie do')),
+                ('total', models.IntegerField(verbose_name='súčet bodov')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='personal.profile', verbose_name='profil')),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='competition.eventregistration', verbose_name='registrácia')),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='competition.semester', verbose_name='semester')),
+                ('series', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='competition.series', verbose_name='séria')),
+            ],
+            options={
+                'verbose_name': 'riadok zamrazenej výsledkovky',
+                'verbose_name_plural': 'riadky zamrazených výsledkoviek',
+                'ordering': ['semester', 'series'],
+                'indexes': [models.Index(fields=['profile', 'semester'], name='competition_profile_f22220_idx')],
+            },
+        ),
+        migrations.RunPython(index_frozen_results, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:24
+
+import base.models
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    base.models.backfill_normalized_fields(
+        apps.get_model('competition', 'Competition'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0009_frozen_result_row'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='competition',
+            name='name_normalized',
+            field=base.models.NormalizedField(blank=True, db_index=True, default='', editable=False, max_length=50, source='name'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
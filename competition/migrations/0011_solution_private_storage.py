@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:57
+
+import base.models
+import base.storage
+import competition.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0010_competition_name_normalized'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='solution',
+            name='corrected_solution',
+            field=base.models.RestrictedFileField(blank=True, storage=base.storage.PrivateStorage(), upload_to=competition.models.get_corrected_solution_path, verbose_name='opravené riešenie'),
+        ),
+        migrations.AlterField(
+            model_name='solution',
+            name='solution',
+            field=base.models.RestrictedFileField(blank=True, storage=base.storage.PrivateStorage(), upload_to=competition.models.get_solution_path, verbose_name='účastnícke riešenie'),
+        ),
+    ]
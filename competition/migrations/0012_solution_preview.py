@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:06
+
+import base.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0011_solution_private_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solution',
+            name='page_count',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, verbose_name='počet strán'),
+        ),
+        migrations.AddField(
+            model_name='solution',
+            name='thumbnail',
+            field=models.FileField(blank=True, editable=False, storage=base.storage.PrivateStorage(), upload_to='solutions/thumbnails/', verbose_name='náhľad prvej strany'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:12
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def file_metadata(file):
+    # Kópia base.file_serving.file_metadata z čias tejto migrácie
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks(64 * 1024):
+        size += len(chunk)
+        digest.update(chunk)
+    return size, digest.hexdigest()
+
+
+def fill_file_metadata(apps, schema_editor):
+    publication_model = apps.get_model('competition', 'Publication')
+    for publication in publication_model.objects.exclude(file=''):
+        try:
+            publication.file_size, publication.file_hash = file_metadata(publication.file)
+        except OSError:
+            # Chýbajúci súbor, metadáta sa doplnia pri ďalšom uložení
+            continue
+        finally:
+            publication.file.close()
+        publication.save(update_fields=['file_size', 'file_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0012_solution_preview'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publication',
+            name='file_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='SHA-256 súboru'),
+        ),
+        migrations.AddField(
+            model_name='publication',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='veľkosť súboru'),
+        ),
+        migrations.RunPython(fill_file_metadata, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('competition', '0013_publication_file_metadata'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='solution',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='dátum pridania'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:02
+
+from django.db import migrations
+
+# Index sa skladá cez aktuálne (nie historické) modely a ich normalizované
+# polia, preto ho migrácia nenapĺňa. Po nasadení treba spustiť
+# `python manage.py rebuild_search_index`.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0003_search_index'),
+        ('personal', '0006_normalized_fields'),
+        ('competition', '0014_solution_uploaded_at_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, migrations.RunPython.noop),
+    ]
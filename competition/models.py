@@ -1,9 +1,7 @@
 import datetime
 from typing import Optional
 
-from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.files.storage import FileSystemStorage
 from django.core.validators import validate_slug
 from django.db import models
 from django.db.models import Q
@@ -11,12 +9,17 @@ from django.db.models.constraints import UniqueConstraint
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils.functional import cached_property
 from django.utils.timezone import now
 from unidecode import unidecode
 
+from base.caching import TableCache
+from base.file_serving import file_metadata
 from base.managers import UnspecifiedValueManager
-from base.models import RestrictedFileField, Site
+from base.models import (NormalizedField, NormalizedFieldsModel,
+                         RestrictedFileField, Site)
+from base.storage import PrivateStorage
 from base.validators import school_year_validator
 from competition.querysets import ActiveQuerySet
 from competition.utils.school_year_manipulation import \
@@ -25,9 +28,7 @@ from competition.utils.validations import validate_points
 from personal.models import Profile, School
 from user.models import User
 
-private_storage = FileSystemStorage(location=settings.PRIVATE_STORAGE_ROOT,
-                                    base_url='/protected/'
-                                    )
+private_storage = PrivateStorage()
 
 SERIES_SUM_METHODS = [
     ('series_simple_sum', 'Jednoduchý súčet bodov'),
@@ -55,7 +56,7 @@ class CompetitionType(models.Model):
         return self.name
 
 
-class Competition(models.Model):
+class Competition(NormalizedFieldsModel):
     """
     Model súťaže, ktorý pokrýva súťaž ako koncept. Napríklad Matboj, Seminár STROM, Kôš
     """
@@ -64,6 +65,7 @@ class Competition(models.Model):
         verbose_name_plural = 'súťaže'
 
     name = models.CharField(verbose_name='názov', max_length=50)
+    name_normalized = NormalizedField(source='name', max_length=50)
     slug = models.SlugField()
     start_year = models.PositiveSmallIntegerField(
         verbose_name='rok prvého ročníka súťaže', blank=True)
@@ -250,7 +252,7 @@ class Semester(Event):
 
     late_tags = models.ManyToManyField(
         LateTag, verbose_name='Stavy omeškania', blank=True)
-    frozen_results = models.TextField(
+    frozen_results = models.JSONField(
         null=True,
         blank=True,
         default=None)
@@ -275,6 +277,7 @@ class Semester(Event):
     def unfreeze_results(self) -> None:
         self.frozen_results = None
         self.save()
+        self.frozenresultrow_set.filter(series__isnull=True).delete()
 
     @property
     def complete(self) -> bool:
@@ -311,7 +314,7 @@ class Series(models.Model):
     sum_method = models.CharField(
         verbose_name='Súčtová metóda', max_length=50, blank=True,
         choices=SERIES_SUM_METHODS)
-    frozen_results = models.TextField(
+    frozen_results = models.JSONField(
         null=True,
         blank=True,
         default=None)
@@ -337,17 +340,22 @@ class Series(models.Model):
 
         return remaining_time
 
+    @property
+    def submission_end(self) -> datetime.datetime:
+        """Koniec odovzdávania vrátane maximálneho možného omeškania v LateFlagoch"""
+        max_late_tag_value = self.semester.late_tags.aggregate(
+            models.Max('upper_bound'))['upper_bound__max']
+        if max_late_tag_value is None:
+            max_late_tag_value = datetime.timedelta(0)
+        return self.deadline + max_late_tag_value
+
     @property
     def can_submit(self) -> bool:
         """
         Vráti True, ak užívateľ ešte môže odovzdať úlohu.
         Pozerá sa na maximálne možné omeškanie v LateFlagoch.
         """
-        max_late_tag_value = self.semester.late_tags.aggregate(
-            models.Max('upper_bound'))['upper_bound__max']
-        if max_late_tag_value is None:
-            max_late_tag_value = datetime.timedelta(0)
-        return now() < self.deadline + max_late_tag_value
+        return now() < self.submission_end
 
     @property
     def can_resubmit(self) -> bool:
@@ -391,6 +399,7 @@ class Series(models.Model):
     def unfreeze_results(self) -> None:
         self.frozen_results = None
         self.save()
+        self.frozenresultrow_set.all().delete()
 
 
 class Problem(models.Model):
@@ -574,6 +583,10 @@ class Grade(models.Model):
 
     objects = UnspecifiedValueManager(unspecified_value_pk=13)
 
+    @staticmethod
+    def get_by_pk(pk) -> 'Grade':
+        return grade_cache.get(pk=pk)
+
     def get_year_of_graduation_by_date(self, date=None):
         return get_school_year_end_by_date(date) + self.years_until_graduation
 
@@ -583,10 +596,10 @@ class Grade(models.Model):
             get_school_year_end_by_date(date)
 
         try:
-            grade = Grade.objects.get(
+            grade = grade_cache.get(
                 years_until_graduation=years_until_graduation)
         except Grade.DoesNotExist:
-            grade = Grade.objects.get_unspecified_value()
+            grade = grade_cache.get(pk=Grade.objects.unspecified_value_pk)
 
         return grade
 
@@ -594,6 +607,11 @@ class Grade(models.Model):
         return self.name
 
 
+# Ročníkov je niekoľko a takmer sa nemenia, pri serializácii profilov
+# a registrácií sa preto hľadajú v pamäti namiesto dotazu pre každý riadok
+grade_cache = TableCache(Grade)
+
+
 class EventRegistration(models.Model):
     """
     Registruje účastníka na instanciu súťaže(napríklad Matboj 2020,
@@ -643,6 +661,37 @@ class EventRegistration(models.Model):
         return self.solution_set.exists()
 
 
+class FrozenResultRow(models.Model):
+    """
+    Riadok zamrazenej výsledkovky série alebo semestra indexovaný podľa profilu.
+    Slúži na porovnanie výsledkov riešiteľa naprieč históriou súťaže
+    bez rozbaľovania všetkých zamrazených výsledkoviek.
+    """
+    class Meta:
+        verbose_name = 'riadok zamrazenej výsledkovky'
+        verbose_name_plural = 'riadky zamrazených výsledkoviek'
+        ordering = ['semester', 'series']
+        indexes = [
+            models.Index(fields=['profile', 'semester']),
+        ]
+
+    profile = models.ForeignKey(
+        Profile, verbose_name='profil', on_delete=models.CASCADE)
+    registration = models.ForeignKey(
+        EventRegistration, verbose_name='registrácia', on_delete=models.CASCADE)
+    semester = models.ForeignKey(
+        Semester, verbose_name='semester', on_delete=models.CASCADE)
+    # Prázdna séria znamená výsledky celého semestra
+    series = models.ForeignKey(
+        Series, verbose_name='séria', on_delete=models.CASCADE, null=True, blank=True)
+    rank_start = models.PositiveIntegerField(verbose_name='poradie od')
+    rank_end = models.PositiveIntegerField(verbose_name='poradie do')
+    total = models.IntegerField(verbose_name='súčet bodov')
+
+    def __str__(self):
+        return f'{self.profile.get_full_name()} @ {self.series or self.semester}'
+
+
 class Vote(models.IntegerChoices):
     '''
     Enum hlasov
@@ -688,7 +737,7 @@ class Solution(models.Model):
                                default=Vote.NONE)
 
     uploaded_at = models.DateTimeField(
-        verbose_name='dátum pridania', auto_now_add=True)
+        verbose_name='dátum pridania', auto_now_add=True, db_index=True)
 
     # V prípade, že riešenie prišlo po termíne nastaví sa na príslušný tag
     late_tag = models.ForeignKey(
@@ -698,6 +747,13 @@ class Solution(models.Model):
     is_online = models.BooleanField(
         verbose_name='internetové riešenie', default=False)
 
+    # Dopĺňa ich na pozadí competition.previews po nahraní riešenia
+    page_count = models.PositiveSmallIntegerField(
+        verbose_name='počet strán', null=True, blank=True, editable=False)
+    thumbnail = models.FileField(
+        storage=private_storage, upload_to='solutions/thumbnails/',
+        verbose_name='náhľad prvej strany', blank=True, editable=False)
+
     def __str__(self):
         return f'Riešiteľ: {self.semester_registration} - úloha {self.problem}'
 
@@ -715,6 +771,9 @@ class Solution(models.Model):
     def get_corrected_solution_file_path(self):
         return f'solutions/corrected/{self.get_corrected_solution_file_name()}'
 
+    def get_thumbnail_file_path(self):
+        return f'solutions/thumbnails/{self.get_solution_file_name()[:-len(".pdf")]}.png'
+
     def can_user_modify(self, user):
         return self.problem.can_user_modify(user)
 
@@ -730,7 +789,7 @@ class Solution(models.Model):
             try:
                 return cls.objects.get(corrected_solution=path)
             except cls.DoesNotExist:
-                return None
+                return cls.objects.filter(thumbnail=path).first()
 
     @classmethod
     def can_user_create(cls, user: User, data: dict) -> bool:
@@ -778,10 +837,50 @@ class Publication(models.Model):
         verbose_name='súbor',
         blank=True,
     )
+    file_size = models.PositiveBigIntegerField(
+        verbose_name='veľkosť súboru', null=True, blank=True, editable=False)
+    file_hash = models.CharField(
+        verbose_name='SHA-256 súboru', max_length=64, blank=True, editable=False)
 
     order = models.PositiveSmallIntegerField(
         verbose_name='poradie', null=True, blank=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Súbor, ku ktorému patria uložené metadáta
+        instance._metadata_source = instance.__dict__.get('file')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.file.name != getattr(self, '_metadata_source', None) or \
+                (self.file and not self.file_hash):
+            self.update_file_metadata()
+        super().save(*args, **kwargs)
+        self._metadata_source = self.file.name  # pylint: disable=attribute-defined-outside-init
+
+    def update_file_metadata(self):
+        """Spočíta veľkosť a hash súboru (ETag a adresa na stiahnutie)"""
+        if not self.file:
+            self.file_size, self.file_hash = None, ''
+            return
+        committed = self.file._committed  # pylint: disable=protected-access
+        try:
+            self.file_size, self.file_hash = file_metadata(self.file)
+        except OSError:
+            # Súbor chýba v úložisku, publikácia sa uloží bez metadát
+            self.file_size, self.file_hash = None, ''
+        finally:
+            if committed:
+                self.file.close()
+
+    def get_file_url(self) -> Optional[str]:
+        """Adresa súboru s hashom obsahu, pri zmene súboru sa zmení aj ona"""
+        if not self.file_hash:
+            return None
+        return reverse('competition:publication-download',
+                       kwargs={'pk': self.pk, 'file_hash': self.file_hash})
+
     def generate_name(self, forced=False):
         if self.name and not forced:
             return
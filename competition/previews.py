@@ -0,0 +1,118 @@
+"""
+Počet strán a náhľad prvej strany nahraných riešení, aby opravovatelia
+nemuseli kvôli prehľadu sťahovať celé PDF.
+
+Po uložení riešenia s novým súborom sa metadáta vynulujú a po commite sa
+spracovanie zaradí do lokálneho poolu vlákien. Výsledok sa zapíše cez
+`update`, iba ak má riešenie stále rovnaký súbor, takže neskoršie
+nahranie neprepíše staršie spracovanie.
+"""
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models.signals import post_init, post_save
+
+from base.pdf import can_render_thumbnails, page_count, render_thumbnail
+from competition.models import Solution
+
+PREVIEW_WORKERS = 2
+
+logger = logging.getLogger(__name__)
+_executor: Optional[ThreadPoolExecutor] = None  # pylint: disable=invalid-name
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=PREVIEW_WORKERS, thread_name_prefix='solution-preview')
+    return _executor
+
+
+def _file_name(value) -> str:
+    return getattr(value, 'name', value) or ''
+
+
+def _render(field_file) -> Optional[bytes]:
+    if not can_render_thumbnails():
+        return None
+    try:
+        return render_thumbnail(field_file.path)
+    except NotImplementedError:
+        # Úložisko bez ciest na disku, pdftoppm dostane dočasnú kópiu
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as copy:
+            for chunk in field_file.chunks():
+                copy.write(chunk)
+            copy.flush()
+            return render_thumbnail(copy.name)
+
+
+def process_solution_preview(solution_pk: int) -> None:
+    """Doplní počet strán a náhľad riešenia"""
+    solution = Solution.objects.select_related(
+        'semester_registration__profile').filter(pk=solution_pk).first()
+    if solution is None or not solution.solution:
+        return
+    name = solution.solution.name
+    with solution.solution.open('rb') as file:
+        pages = page_count(file)
+    thumbnail = _render(solution.solution)
+
+    storage = solution.thumbnail.storage
+    thumbnail_name = ''
+    if thumbnail is not None:
+        thumbnail_name = storage.save(
+            solution.get_thumbnail_file_path(), ContentFile(thumbnail))
+    updated = Solution.objects.filter(pk=solution_pk, solution=name).update(
+        page_count=pages, thumbnail=thumbnail_name)
+    if not updated and thumbnail_name:
+        storage.delete(thumbnail_name)
+
+
+def process_in_worker(solution_pk: int) -> bool:
+    """Spracovanie vo vlákne poolu, chybu iba zaloguje. Vráti, či sa podarilo."""
+    try:
+        process_solution_preview(solution_pk)
+    except Exception:  # pylint: disable=broad-exception-caught
+        logger.exception('Náhľad riešenia %s sa nepodarilo vytvoriť', solution_pk)
+        return False
+    finally:
+        # Spojenia do databázy sú pre každé vlákno zvlášť
+        connections.close_all()
+    return True
+
+
+def schedule_solution_preview(solution_pk: int) -> None:
+    get_executor().submit(process_in_worker, solution_pk)
+
+
+def _remember_solution_file(sender, instance, **kwargs):
+    # pylint: disable=unused-argument,protected-access
+    instance._preview_source = _file_name(instance.__dict__.get('solution'))
+
+
+def _on_solution_save(sender, instance, raw, **kwargs):
+    # pylint: disable=unused-argument,protected-access
+    name = instance.solution.name or ''
+    if raw or name == getattr(instance, '_preview_source', None):
+        return
+    instance._preview_source = name
+    old_thumbnail = instance.thumbnail.name
+    storage = instance.thumbnail.storage
+    instance.thumbnail = ''
+    instance.page_count = None
+    Solution.objects.filter(pk=instance.pk).update(page_count=None, thumbnail='')
+    if old_thumbnail:
+        # Po rollbacku by riadok ukazoval na zmazaný súbor
+        transaction.on_commit(lambda: storage.delete(old_thumbnail))
+    if name:
+        transaction.on_commit(lambda: schedule_solution_preview(instance.pk))
+
+
+def connect_signals():
+    post_init.connect(_remember_solution_file, sender=Solution)
+    post_save.connect(_on_solution_save, sender=Solution)
@@ -1,76 +1,411 @@
-from django.conf import settings
-from json import dumps as json_dumps
-from json import loads as json_loads
+from collections.abc import Sequence
+from copy import copy
 from operator import itemgetter
+from typing import Optional
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
 from django.utils.timezone import now
 
-from competition.models import EventRegistration, Semester, Series, Profile
+from competition.models import (Competition, Event, EventRegistration,
+                                FrozenResultRow, Problem, Profile, Semester,
+                                Series, Solution)
 from competition.serializers import EventRegistrationReadSerializer
 from competition.utils import sum_methods
+from competition.utils.frozen_results import (ROW_REGISTRATION, is_packed,
+                                              pack_results, unpack_row)
 
 
 class FreezingNotClosedResults(Exception):
     """Snažíš sa zamraziť výsledky série, ktorá nemá opravené všetky riešenia"""
 
+    def __init__(self, diagnostics: Optional['FreezeDiagnostics'] = None):
+        super().__init__()
+        self.diagnostics = diagnostics
+
 
 class UserHasInvalidSchool(Exception):
     """Snažíš sa zamraziť výsledky semestra, kde je riešiteľ nemá priradenú platnú školu"""
 
-    def __init__(self, users: list[Profile]):
+    def __init__(self, users: list[Profile],
+                 diagnostics: Optional['FreezeDiagnostics'] = None):
         users = ', '.join(user.get_full_name() for user in users)
         super().__init__(f'Užívatelia nemajú priradenú školu: {users}')
+        self.diagnostics = diagnostics
+
+
+RESULT_FIELDS = ['rank_start', 'rank_end', 'rank_changed',
+                 'registration', 'subtotal', 'total', 'solutions']
+
+RESULT_FIELD_GROUPS = {
+    'rank': ['rank_start', 'rank_end', 'rank_changed'],
+}
+
+
+def parse_result_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """
+    Spracuje zoznam polí riadku výsledkovky oddelený čiarkami.
+    Skupina `rank` zahŕňa všetky polia poradia.
+    """
+    if not fields:
+        return None
+    parsed = []
+    for field in fields.split(','):
+        field = field.strip()
+        for expanded in RESULT_FIELD_GROUPS.get(field, [field]):
+            if expanded not in RESULT_FIELDS:
+                raise ValueError(f'Neznáme pole výsledkovky: {field}')
+            if expanded not in parsed:
+                parsed.append(expanded)
+    return parsed
 
 
-def semester_results(self: Semester) -> dict:
+class LazyResults(Sequence):
+    """
+    Výsledkovka, ktorej riadky obsahujú namiesto registrácie iba jej id.
+    Registrácie sa serializujú až pri prístupe, jedným dotazom pre celý požadovaný úsek.
+    """
+
+    def __init__(self, event: Event, rows: list, fields: Optional[list[str]] = None):
+        self._event = event
+        self._rows = rows
+        self._fields = fields
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._assemble(self._rows[index])
+        return self._assemble([self._rows[index]])[0]
+
+    def __iter__(self):
+        return iter(self._assemble(self._rows))
+
+    def only(self, fields: Optional[list[str]]) -> 'LazyResults':
+        """Obmedzí riadky výsledkovky iba na zadané polia"""
+        return self._copy(self._rows, fields)
+
+    def filter_school(self, school: int) -> 'LazyResults':
+        """Iba riešitelia zo zadanej školy, poradie ostáva z celej výsledkovky"""
+        registrations = set(EventRegistration.objects.filter(
+            event=self._event, school=school).values_list('pk', flat=True))
+        return self._copy(
+            [row for row in self._rows if self._registration_pk(
+                row) in registrations],
+            self._fields
+        )
+
+    def _copy(self, rows: list, fields: Optional[list[str]]) -> 'LazyResults':
+        results = copy(self)
+        results._rows = rows  # pylint: disable=protected-access
+        results._fields = fields
+        return results
+
+    def _registration_pk(self, row) -> int:
+        return row['registration']
+
+    def _expand(self, row) -> dict:
+        return dict(row)
+
+    def _assemble(self, rows: list) -> list[dict]:
+        rows = [self._expand(row) for row in rows]
+        if self._fields is None or 'registration' in self._fields:
+            registrations = self._serialize_registrations(
+                [row['registration'] for row in rows])
+            for row in rows:
+                row['registration'] = registrations.get(row['registration'])
+        if self._fields is not None:
+            rows = [{field: row[field] for field in self._fields}
+                    for row in rows]
+        return rows
+
+    def _serialize_registrations(self, registration_pks: list[int]) -> dict[int, dict]:
+        registrations = EventRegistration.objects.filter(
+            pk__in=registration_pks
+        ).select_related('profile', 'school', 'grade')
+        for registration in registrations:
+            # Všetky registrácie patria k rovnakému semestru,
+            # netreba ho načítavať pre každú zvlášť
+            registration.event = self._event
+        return {
+            registration['id']: registration
+            for registration in EventRegistrationReadSerializer(registrations, many=True).data
+        }
+
+
+class FrozenResults(LazyResults):
+    """Zamrazená výsledkovka v kompaktnom formáte"""
+
+    def __init__(self, event: Event, frozen_results: dict, fields: Optional[list[str]] = None):
+        super().__init__(event, frozen_results['rows'], fields)
+        self._problems = frozen_results['problems']
+
+    def _registration_pk(self, row) -> int:
+        return row[ROW_REGISTRATION]
+
+    def _expand(self, row) -> dict:
+        return unpack_row(row, self._problems, row[ROW_REGISTRATION])
+
+
+def load_frozen_results(event: Event, results) -> Sequence[dict]:
+    """Vráti zamrazené výsledky semestra alebo série"""
+    if not is_packed(results):
+        # Výsledky uložené v pôvodnom formáte (celá výsledkovka)
+        return results
+    return FrozenResults(event, results)
+
+
+def semester_results(self: Semester) -> Sequence[dict]:
     """Vyrobí výsledky semestra"""
     if self.frozen_results is not None:
-        return json_loads(self.frozen_results)
-    results = []
-    for registration in self.eventregistration_set.all():
-        if registration.has_solutions():
-            results.append(_generate_result_row(registration, self))
+        return load_frozen_results(self, self.frozen_results)
+    return LazyResults(self, _compute_semester_results(self))
 
-    results.sort(key=itemgetter('total'), reverse=True)
-    results = _rank_results(results)
-    return results
+
+def _compute_semester_results(self: Semester) -> list[dict]:
+    return _compute_results(
+        _registrations_with_solutions(self),
+        _series_with_problems(self.series_set.all())
+    )
 
 
 def freeze_semester_results(semester: Semester):
     if any(not series.complete for series in semester.series_set.all()):
         raise FreezingNotClosedResults()
 
-    semester.frozen_results = json_dumps(semester_results(semester))
-    semester.save()
+    _store_frozen_results(
+        semester, None, _compute_semester_results(semester))
+
 
+@transaction.atomic
+def _store_frozen_results(semester: Semester, series: Optional[Series], results: list[dict]):
+    """
+    Uloží zamrazené výsledky semestra (bez série) alebo série
+    a zaindexuje ich riadky podľa profilov riešiteľov
+    """
+    frozen = series if series is not None else semester
+    frozen.frozen_results = pack_results(results)
+    frozen.save(update_fields=['frozen_results'])
 
-def series_results(series: Series):
+    FrozenResultRow.objects.filter(semester=semester, series=series).delete()
+    profiles = dict(semester.eventregistration_set.values_list('pk', 'profile'))
+    FrozenResultRow.objects.bulk_create(
+        FrozenResultRow(
+            profile_id=profiles[row['registration']],
+            registration_id=row['registration'],
+            semester=semester,
+            series=series,
+            rank_start=row['rank_start'],
+            rank_end=row['rank_end'],
+            total=row['total'],
+        )
+        for row in results
+    )
+
+
+def series_results(series: Series) -> Sequence[dict]:
+    """Vyrobí výsledky série"""
+    if series.frozen_results is not None:
+        return load_frozen_results(series.semester, series.frozen_results)
+    return LazyResults(series.semester, _compute_series_results(series))
+
+
+def _compute_series_results(series: Series) -> list[dict]:
+    return _compute_results(
+        _registrations_with_solutions(series.semester),
+        _series_with_problems(Series.objects.filter(pk=series.pk))
+    )
+
+
+def _registrations_with_solutions(semester: Semester) -> list[EventRegistration]:
+    registrations = semester.eventregistration_set.select_related('grade').prefetch_related(
+        Prefetch('solution_set', queryset=Solution.objects.order_by('pk'))
+    )
+    return [registration for registration in registrations
+            if registration.solution_set.all()]
+
+
+def _series_with_problems(series_set) -> list[Series]:
+    return list(series_set.order_by('order').prefetch_related(
+        Prefetch('problems', queryset=Problem.objects.order_by('order'))
+    ))
+
+
+def _compute_results(registrations: list[EventRegistration],
+                     series_set: list[Series]) -> list[dict]:
     results = [
-        _generate_result_row(registration, only_series=series)
-        for registration in series.semester.eventregistration_set.all()
-        if registration.has_solutions()
+        _generate_result_row(registration, series_set)
+        for registration in registrations
     ]
-
     results.sort(key=itemgetter('total'), reverse=True)
-
     return _rank_results(results)
 
 
+class FreezeDiagnostics:
+    """Prekážky, ktoré bránia uzavretiu série"""
+
+    def __init__(self, series: Series):
+        self.series = series
+        self.deadline_not_passed = series.deadline > now()
+        # Počty neopravených riešení podľa id úlohy
+        self.uncorrected_solutions: dict[int, int] = {}
+        self.users_without_school: list[Profile] = []
+
+    def __bool__(self):
+        return bool(self.deadline_not_passed or self.uncorrected_solutions
+                    or self.users_without_school)
+
+    def messages(self) -> list[str]:
+        messages = []
+        if self.deadline_not_passed:
+            messages.append('Termín série ešte neuplynul')
+        for problem, count in self.uncorrected_solutions.items():
+            messages.append(f'Úloha {problem}: neopravené riešenia: {count}')
+        if self.users_without_school:
+            users = ', '.join(user.get_full_name()
+                              for user in self.users_without_school)
+            messages.append(f'Užívatelia nemajú priradenú školu: {users}')
+        return messages
+
+    def as_dict(self) -> dict:
+        return {
+            'series': self.series.pk,
+            'deadline_not_passed': self.deadline_not_passed,
+            'uncorrected_solutions': [
+                {'problem': problem, 'count': count}
+                for problem, count in self.uncorrected_solutions.items()
+            ],
+            'users_without_school': [
+                {'id': user.pk, 'full_name': user.get_full_name()}
+                for user in self.users_without_school
+            ],
+        }
+
+
+def series_freeze_diagnostics(series_set: list[Series]) -> dict[Series, FreezeDiagnostics]:
+    """
+    Zistí, čo bráni uzavretiu zadaných sérií. Namiesto dotazov pre každú
+    registráciu a úlohu stačia dva agregované dotazy pre všetky série naraz.
+    Vráti iba série, ktoré uzavrieť nemožno.
+    """
+    diagnostics = {series.pk: FreezeDiagnostics(series)
+                   for series in series_set}
+    uncorrected = (
+        Solution.objects.filter(problem__series__in=series_set)
+        .exclude(Q(score__isnull=False) &
+                 Q(Q(corrected_solution__isnull=False) | Q(is_online=False)))
+        .values('problem__series', 'problem')
+        .annotate(count=Count('pk'))
+        .order_by('problem__series', 'problem__order')
+        .values_list('problem__series', 'problem', 'count')
+    )
+    for series_pk, problem_pk, count in uncorrected:
+        diagnostics[series_pk].uncorrected_solutions[problem_pk] = count
+
+    without_school = {}
+    for registration in EventRegistration.objects.filter(
+        event__in={series.semester_id for series in series_set},
+        school=settings.OTHER_SCHOOL_CODE
+    ).select_related('profile'):
+        without_school.setdefault(registration.event_id, []).append(
+            registration.profile)
+    for series in series_set:
+        diagnostics[series.pk].users_without_school = without_school.get(
+            series.semester_id, [])
+
+    return {series_diagnostics.series: series_diagnostics
+            for series_diagnostics in diagnostics.values() if series_diagnostics}
+
+
 def freeze_series_results(series: Series):
-    registrations_without_school = list(
-        registration for registration in series.semester.eventregistration_set.all()
-        if registration.school.pk == settings.OTHER_SCHOOL_CODE)
-    if registrations_without_school:
-        raise UserHasInvalidSchool([registration.profile
-                                    for registration in registrations_without_school])
-    if any(
-        problem.num_solutions != problem.num_corrected_solutions
-        for problem in series.problems.all()
-    ) or series.deadline > now():
-        raise FreezingNotClosedResults()
+    diagnostics = series_freeze_diagnostics([series]).get(series)
+    if diagnostics is not None:
+        if diagnostics.users_without_school:
+            raise UserHasInvalidSchool(
+                diagnostics.users_without_school, diagnostics)
+        raise FreezingNotClosedResults(diagnostics)
+
+    _store_frozen_results(
+        series.semester, series, _compute_series_results(series))
+
 
-    series.frozen_results = json_dumps(series_results(series))
-    series.save()
+def freeze_competition_year(competition: Competition,
+                            year: int) -> dict[Series, FreezeDiagnostics]:
+    """
+    Uzavrie všetky série a semestre ročníka súťaže naraz.
+    Ak niektorú zo sérií nemožno uzavrieť, neuzavrie sa nič
+    a vrátia sa prekážky po sériách.
+    """
+    semesters = list(Semester.objects.filter(
+        competition=competition, year=year))
+    series_set = list(
+        Series.objects.filter(semester__in=semesters, frozen_results__isnull=True)
+        .select_related('semester')
+    )
+    diagnostics = series_freeze_diagnostics(series_set)
+    if diagnostics:
+        return diagnostics
+
+    with transaction.atomic():
+        for semester in semesters:
+            # Riešenia sa načítajú raz pre celý semester a použijú
+            # sa pre výsledky všetkých jeho sérií aj semestra
+            registrations = _registrations_with_solutions(semester)
+            semester_series = _series_with_problems(semester.series_set.all())
+            for series in semester_series:
+                if series.frozen_results is not None:
+                    continue
+                _store_frozen_results(
+                    semester, series, _compute_results(registrations, [series]))
+            if semester.frozen_results is None:
+                _store_frozen_results(
+                    semester, None, _compute_results(registrations, semester_series))
+    return {}
+
+
+def profile_trajectories(competition: Competition, profiles: list[int]) -> list[dict]:
+    """
+    Poradie a body zadaných riešiteľov vo všetkých zamrazených semestroch
+    a sériách súťaže. Číta sa iba index riadkov, nie celé výsledkovky.
+    """
+    rows = FrozenResultRow.objects.filter(
+        semester__competition=competition, profile__in=profiles
+    ).order_by(
+        'profile', 'semester__year', 'semester__season_code', 'series__order'
+    ).values(
+        'profile', 'semester', 'semester__year', 'semester__season_code',
+        'semester__school_year', 'series', 'series__order',
+        'rank_start', 'rank_end', 'total'
+    )
+    trajectories = {}
+    for row in rows:
+        semesters = trajectories.setdefault(row['profile'], {})
+        semester = semesters.setdefault(row['semester'], {
+            'semester': row['semester'],
+            'year': row['semester__year'],
+            'season_code': row['semester__season_code'],
+            'school_year': row['semester__school_year'],
+            'rank_start': None,
+            'rank_end': None,
+            'total': None,
+            'series': []
+        })
+        ranking = {
+            'rank_start': row['rank_start'],
+            'rank_end': row['rank_end'],
+            'total': row['total'],
+        }
+        if row['series'] is None:
+            semester.update(ranking)
+        else:
+            semester['series'].append(
+                {'series': row['series'], 'order': row['series__order'], **ranking})
+    return [
+        {'profile': profile, 'semesters': list(semesters.values())}
+        for profile, semesters in trajectories.items()
+    ]
 
 
 def generate_praticipant_invitations(
@@ -99,23 +434,22 @@ def generate_praticipant_invitations(
 
 def _generate_result_row(
     semester_registration: EventRegistration,
-    semester: Semester | None = None,
-    only_series: Series | None = None,
+    series_set: list[Series],
 ):
     """
-    Vygeneruje riadok výsledku pre používateľa.
-    Ak je uvedený only_semester vygenerujú sa výsledky iba sa daný semester
+    Vygeneruje riadok výsledku pre používateľa zo zadaných sérií.
+    Riešenia registrácie a úlohy sérií musia byť prednačítané.
     """
-    user_solutions = semester_registration.solution_set
-    series_set = semester.series_set.order_by(
-        'order') if semester is not None else [only_series]
+    user_solutions = {}
+    for sol in semester_registration.solution_set.all():
+        user_solutions.setdefault(sol.problem_id, sol)
     solutions = []
     subtotal = []
     for series in series_set:
         series_solutions = []
         solution_points = []
-        for problem in series.problems.order_by('order'):
-            sol = user_solutions.filter(problem=problem).first()
+        for problem in series.problems.all():
+            sol = user_solutions.get(problem.pk)
 
             solution_points.append(sol.score or 0 if sol is not None else 0)
             series_solutions.append(
@@ -140,8 +474,9 @@ def _generate_result_row(
         'rank_end': 0,
         # Indikuje či sa zmenilo poradie od minulej priečky, slúži na delené miesta
         'rank_changed': True,
-        # primary key riešiteľovej registrácie do semestra
-        'registration': EventRegistrationReadSerializer(semester_registration).data,
+        # primary key riešiteľovej registrácie do semestra,
+        # serializuje sa až pri výdaji výsledkovky (LazyResults)
+        'registration': semester_registration.pk,
         # Súčty bodov po sériách
         'subtotal': subtotal,
         # Celkový súčet za danú entitu
@@ -0,0 +1,15 @@
+"""
+Modely prehľadávané cez vyhľadávací index (base.search). Polia musia
+zodpovedať `search_fields` príslušných viewsetov, inak UnaccentSearchFilter
+index nepoužije.
+"""
+from base.search import search_index
+from competition.models import Event, Semester, Solution
+from personal.models import Profile, School
+
+search_index.register(Profile, ['first_name', 'last_name'])
+search_index.register(School, ['name', 'street', 'city'])
+search_index.register(Solution, ['semester_registration__profile__first_name',
+                                 'semester_registration__profile__last_name'])
+search_index.register(Event, ['competition__name', 'year', 'additional_name'])
+search_index.register(Semester, ['competition__name', 'year', 'school_year'])
@@ -42,6 +42,8 @@ class PublicationTypeSerializer(serializers.ModelSerializer):
 @ts_interface(context='competition')
 class PublicationSerializer(serializers.ModelSerializer):
     verbose_name = serializers.SerializerMethodField('get_verbose_name')
+    file_url = serializers.CharField(
+        source='get_file_url', read_only=True, allow_null=True)
 
     class Meta:
         model = models.Publication
@@ -52,6 +54,12 @@ class PublicationSerializer(serializers.ModelSerializer):
 
         self.fields['file'].parent = None
 
+    @staticmethod
+    def prefetch(queryset):
+        """Akcia (aj semester so súťažou) pre `verbose_name` v tom istom dotaze"""
+        return queryset.select_related(
+            'event__competition', 'event__semester__competition')
+
     def get_verbose_name(self, obj):
         return str(obj)
 
@@ -78,6 +86,13 @@ class EventSerializer(ModelWithParticipationSerializer):
         model = models.Event
         fields = '__all__'
 
+    @staticmethod
+    def prefetch(queryset):
+        """Prednačíta všetko, čo serializer potrebuje, aby počet dotazov nezávisel od počtu akcií"""
+        return queryset.select_related(
+            'competition', 'registration_link', 'semester__competition'
+        ).prefetch_related('publication_set', 'galleries')
+
     def validate_school_year(self, value: str):
         try:
             school_year_validator(value)
@@ -142,7 +157,7 @@ class CompetitionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Competition
-        exclude = ['permission_group', 'alert_email']
+        exclude = ['permission_group', 'alert_email', 'name_normalized']
         read_only_fields = [
             'upcoming_or_current_event',
             'history_events',
@@ -161,7 +176,25 @@ class CompetitionSerializer(serializers.ModelSerializer):
             return None
 
     def get_history_events(self, obj):
-        return EventSerializer(obj.event_set.history(), many=True).data
+        return EventSerializer(
+            EventSerializer.prefetch(obj.event_set.history()), many=True).data
+
+
+class GradeField(serializers.PrimaryKeyRelatedField):
+    """Ročník zadaný cez id, hľadá sa v pamäti namiesto databázy"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('queryset', models.Grade.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        try:
+            return models.Grade.get_by_pk(data)
+        except models.Grade.DoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError, exceptions.ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        return None
 
 
 @ts_interface(context='competition')
@@ -193,8 +226,7 @@ class EventRegistrationWriteSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField()
     school = serializers.PrimaryKeyRelatedField(
         queryset=models.School.objects.all())
-    grade = serializers.PrimaryKeyRelatedField(
-        queryset=models.Grade.objects.all())
+    grade = GradeField()
     profile = serializers.PrimaryKeyRelatedField(
         queryset=models.Profile.objects.all())
     event = serializers.PrimaryKeyRelatedField(
@@ -324,7 +356,8 @@ class SolutionAdministrationSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Solution
         fields = ['id', 'corrected_solution', 'vote', 'solution',
-                  'late_tag', 'score', 'semester_registration', 'is_online']
+                  'late_tag', 'score', 'semester_registration', 'is_online',
+                  'page_count', 'thumbnail']
         read_only_fields = ['corrected_solution',
                             'semester_registration']
 
@@ -483,6 +516,14 @@ class SemesterWithProblemsSerializer(ModelWithParticipationSerializer):
         read_only_fields = ['complete']
         validators = []
 
+    @staticmethod
+    def prefetch(queryset):
+        """
+        Publikácie všetkých semestrov jedným dotazom. Prednačítaná publikácia
+        má ako `event` priamo svoj semester, `verbose_name` už nič nedotazuje.
+        """
+        return queryset.select_related('competition').prefetch_related('publication_set')
+
     def validate_season_code(self, value: int):
         if value not in (0, 1):
             raise ValidationError(
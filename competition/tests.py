@@ -1,9 +1,29 @@
+import zipfile
 from datetime import datetime, timezone
-
+from hashlib import sha256
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from pypdf import PdfWriter
+from rest_framework import status
 from rest_framework.test import APITestCase
 
+from cms.models import Gallery
 from competition import models
-from tests.test_utils import PermissionTestMixin, get_app_fixtures
+from competition.admin import SolutionAdmin
+from competition.previews import process_solution_preview
+from competition.results import (freeze_competition_year, semester_results,
+                                 series_results)
+from competition.utils.frozen_results import pack_results
+from tests.test_utils import (InMemoryStorageMixin, PermissionTestMixin,
+                              get_app_fixtures)
+from user.models import User
 
 series_expected_keys = [
     'id',
@@ -114,6 +134,33 @@ class TestSeries(APITestCase, PermissionTestMixin):
         self.assertTrue(len(response.json()) > 0)
         results_row_assert_format(self, response.json()[0], 1)
 
+    def test_get_series_frozen_results(self):
+        '''/0/results from frozen results same as live'''
+        series = models.Series.objects.get(pk=0)
+        live_results = series_results(series)
+        series.frozen_results = pack_results(live_results)
+        series.save()
+        response = self.client.get(self.URL_PREFIX + '/0/results', {}, 'json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), list(live_results))
+
+    def test_freeze_series_diagnostics(self):
+        '''/0/results/freeze vráti prekážky uzavretia'''
+        self.get_client('strom')
+        response = self.client.post(self.URL_PREFIX + '/0/results/freeze/')
+        self.assertEqual(response.status_code, 405)
+        diagnostics = response.json()['diagnostics']
+        self.assertEqual(diagnostics['series'], 0)
+        self.assertTrue(diagnostics['deadline_not_passed'])
+        uncorrected = sum(
+            problem.num_solutions - problem.num_corrected_solutions
+            for problem in models.Problem.objects.filter(series=0))
+        self.assertEqual(
+            sum(problem['count']
+                for problem in diagnostics['uncorrected_solutions']),
+            uncorrected)
+        self.assertIsNone(models.Series.objects.get(pk=0).frozen_results)
+
     def test_permission_list(self):
         responses = {user_name: 200 for user_name in self.user_settings}
         responses[None] = 200
@@ -178,6 +225,78 @@ class TestSemester(APITestCase, PermissionTestMixin):
         self.assertTrue(len(response.json()) > 0)
         results_row_assert_format(self, response.json()[0], 2)
 
+    def test_get_semester_frozen_results(self):
+        '''/0/results from frozen results same as live'''
+        semester = models.Semester.objects.get(pk=0)
+        live_results = semester_results(semester)
+        semester.frozen_results = pack_results(live_results)
+        semester.save()
+        response = self.client.get(self.URL_PREFIX + '/0/results', {}, 'json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), list(live_results))
+
+    def test_get_semester_results_paginated(self):
+        '''/0/results?limit&offset&fields&school vráti iba požadovaný úsek'''
+        live_results = list(semester_results(
+            models.Semester.objects.get(pk=0)))
+        response = self.client.get(
+            self.URL_PREFIX + '/0/results/', {'limit': 1, 'offset': 1, 'fields': 'rank,total'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], len(live_results))
+        self.assertEqual(response.json()['results'], [{
+            'rank_start': live_results[1]['rank_start'],
+            'rank_end': live_results[1]['rank_end'],
+            'rank_changed': live_results[1]['rank_changed'],
+            'total': live_results[1]['total'],
+        }])
+        school = live_results[0]['registration']['school']['code']
+        response = self.client.get(
+            self.URL_PREFIX + '/0/results/', {'school': school, 'fields': 'registration'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(len(response.json()) > 0)
+        for row in response.json():
+            self.assertEqual(row['registration']['school']['code'], school)
+        response = self.client.get(
+            self.URL_PREFIX + '/0/results/', {'fields': 'unknown'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(
+            self.URL_PREFIX + '/0/results/', {'school': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_freeze_competition_year(self):
+        '''uzavretie celého ročníka naraz'''
+        competition = models.Competition.objects.get(pk=0)
+        blockers = freeze_competition_year(competition, 44)
+        self.assertIn(models.Series.objects.get(pk=0), blockers)
+        self.assertFalse(models.Series.objects.filter(
+            semester__year=44, frozen_results__isnull=False).exists())
+
+        solutions = models.Solution.objects.filter(
+            problem__series__semester__year=43)
+        solutions.update(is_online=False)
+        solutions.filter(score__isnull=True).update(score=0)
+        semester = models.Semester.objects.get(pk=2)
+        live_results = list(semester_results(semester))
+        self.assertEqual(freeze_competition_year(competition, 43), {})
+        semester.refresh_from_db()
+        self.assertTrue(semester.complete)
+        self.assertEqual(list(semester_results(semester)), live_results)
+        self.assertFalse(models.Series.objects.filter(
+            semester__year=43, frozen_results__isnull=True).exists())
+
+        profile = live_results[0]['registration']['profile']['id']
+        response = self.client.get(
+            '/api/competition/competition/0/trajectories/', {'profile': profile})
+        self.assertEqual(response.status_code, 200)
+        trajectory = response.json()[0]
+        self.assertEqual(trajectory['profile'], profile)
+        semester_row = next(row for row in trajectory['semesters']
+                            if row['semester'] == semester.pk)
+        self.assertEqual(semester_row['rank_start'],
+                         live_results[0]['rank_start'])
+        self.assertEqual(semester_row['total'], live_results[0]['total'])
+        self.assertEqual(len(semester_row['series']), 2)
+
     def test_update_permissions(self):
         ''' update permission OK '''
         self.check_permissions(self.URL_PREFIX + '/0/',
@@ -287,6 +406,45 @@ class TestCompetition(APITestCase, PermissionTestMixin):
         self.assertEqual(response.status_code, 200)
         self.competition_assert_format(response.json(), 1)
 
+    def test_competition_detail_cache_invalidation(self):
+        '''detail sa po zmene akcie znova vyrobí'''
+        response = self.client.get(self.URL_PREFIX + '/slug/matik', {}, 'json')
+        self.competition_assert_format(response.json(), 1)
+        models.Event.objects.create(
+            competition=models.Competition.objects.get(pk=1),
+            year=45,
+            school_year="2020/2021",
+            start="2021-01-01T20:00:00+02:00",
+            end="2021-06-01T20:00:00+02:00"
+        )
+        response = self.client.get(self.URL_PREFIX + '/slug/matik', {}, 'json')
+        self.competition_assert_format(response.json(), 2)
+
+    def test_moved_gallery_cache_invalidation(self):
+        '''galéria presunutá k akcii inej súťaže zmizne aj z pôvodnej súťaže'''
+        event = models.Competition.objects.get(pk=1).event_set.history().first()
+        gallery = Gallery.objects.create(
+            name='Sústredenie', event=event, gallery_link='https://strom.sk/galeria')
+
+        def galleries():
+            response = self.client.get(self.URL_PREFIX + '/slug/matik', {}, 'json')
+            return [gallery['name'] for event in response.json()['history_events']
+                    for gallery in event['galleries']]
+
+        self.assertEqual(galleries(), ['Sústredenie'])
+        gallery = Gallery.objects.get(pk=gallery.pk)
+        gallery.event = models.Event.objects.exclude(competition=1).first()
+        gallery.save()
+        self.assertEqual(galleries(), [])
+
+    def test_get_competition_history(self):
+        '''/1/history stránkovanie OK'''
+        response = self.client.get(
+            self.URL_PREFIX + '/1/history/', {'limit': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 1)
+        self.assertEqual(response.json()['results'][0]['year'], 44)
+
     def test_permission_list(self):
         '''list permission OK'''
         self.check_permissions(self.URL_PREFIX + '/',
@@ -321,7 +479,7 @@ class TestCompetition(APITestCase, PermissionTestMixin):
                                {'name': 'Ilegalna sutaz', 'start_year': 2020})
 
 
-class TestSolution(APITestCase, PermissionTestMixin):
+class TestSolution(InMemoryStorageMixin, APITestCase, PermissionTestMixin):
     '''competition/solution'''
     URL_PREFIX = '/api/competition/solution'
 
@@ -359,3 +517,247 @@ class TestSolution(APITestCase, PermissionTestMixin):
                                self.ONLY_STAFF_OK_RESPONSES, {})
         vote = models.Solution.objects.get(pk=0).vote
         self.assertEqual(vote, 0)
+
+    def test_upload_solution_file(self):
+        ''' nahraté riešenie sa uloží do úložiska, iné ako pdf sa odmietne'''
+        client = self.get_client('strom')
+        url = self.URL_PREFIX + '/0/upload-solution-file/'
+        response = client.post(url, {'file': SimpleUploadedFile(
+            'riesenie.txt', b'obycajny text', content_type='text/plain')})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = client.post(url, {'file': SimpleUploadedFile(
+            'riesenie.pdf', b'%PDF-1.4\n%%EOF\n', content_type='application/pdf')})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        solution = models.Solution.objects.get(pk=0)
+        self.assertTrue(self.storage.exists(solution.solution.name))
+        self.assertEqual(solution.solution.read(), b'%PDF-1.4\n%%EOF\n')
+
+    def test_solution_preview(self):
+        ''' po nahraní riešenia sa doplní počet strán, ktorý vráti API'''
+        writer = PdfWriter()
+        for _ in range(3):
+            writer.add_blank_page(width=595, height=842)
+        pdf = BytesIO()
+        writer.write(pdf)
+        client = self.get_client('strom')
+        with mock.patch('competition.previews.schedule_solution_preview',
+                        process_solution_preview), \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = client.post(self.URL_PREFIX + '/0/upload-solution-file/', {
+                'file': SimpleUploadedFile('riesenie.pdf', pdf.getvalue())})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(callbacks), 1)
+        response = client.get(self.URL_PREFIX + '/0/')
+        self.assertEqual(response.data['page_count'], 3)
+
+        # Zmena bodov bez nového súboru spracovanie nespúšťa
+        with self.captureOnCommitCallbacks() as callbacks:
+            solution = models.Solution.objects.get(pk=0)
+            solution.score = 2
+            solution.save()
+        self.assertEqual(callbacks, [])
+
+    def test_thumbnail_deleted_on_commit(self):
+        ''' starý náhľad sa zmaže až po commite nového súboru riešenia'''
+        solution = models.Solution.objects.get(pk=0)
+        solution.thumbnail.save('nahlad.png', ContentFile(b'png'), save=False)
+        models.Solution.objects.filter(pk=0).update(thumbnail=solution.thumbnail.name)
+        thumbnail = solution.thumbnail.name
+        solution = models.Solution.objects.get(pk=0)
+        with mock.patch('competition.previews.schedule_solution_preview'), \
+                self.captureOnCommitCallbacks(execute=True):
+            solution.solution = SimpleUploadedFile('riesenie.pdf', b'%PDF-1.4\n%%EOF\n')
+            solution.save()
+            self.assertTrue(self.storage.exists(thumbnail))
+        self.assertFalse(self.storage.exists(thumbnail))
+
+    def test_generate_solution_previews(self):
+        ''' chybné riešenie nezastaví dopĺňanie náhľadov ostatných'''
+        models.Solution.objects.filter(pk__in=[0, 1, 2]).update(
+            solution='solutions/riesenie.pdf', page_count=None)
+        models.Solution.objects.exclude(pk__in=[0, 1, 2]).update(solution='')
+        processed = []
+
+        def process(solution_pk):
+            if solution_pk == 1:
+                raise OSError('Poškodený súbor')
+            processed.append(solution_pk)
+
+        with mock.patch('competition.previews.process_solution_preview', process), \
+                self.assertLogs('competition.previews', 'ERROR'):
+            call_command('generate_solution_previews', stdout=StringIO())
+        self.assertEqual(sorted(processed), [0, 2])
+
+    def test_upload_corrected_zip(self):
+        ''' chybné pdf v archíve zastaví nahranie ešte pred uložením riešení'''
+        client = self.get_client('strom')
+        pdf = b'%PDF-1.4\n1 0 obj\n<<>>\nendobj\nstartxref\n0\n%%EOF\n'
+
+        def upload(entries):
+            archive = BytesIO()
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zfile:
+                for name, content in entries.items():
+                    zfile.writestr(name, content)
+            return client.post('/api/competition/problem/24/upload-corrected/', {
+                'file': SimpleUploadedFile('opravene.zip', archive.getvalue())})
+
+        response = upload({'5-Meno-24-0.pdf': pdf, '4-Meno-25-0.pdf': b'nie je pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['filename'] for error in response.data], ['4-Meno-25-0.pdf'])
+        self.assertEqual(models.Solution.objects.get(pk=0).score, 3)
+
+        response = upload({'5-Meno-24-0.pdf': pdf})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        solution = models.Solution.objects.get(pk=0)
+        self.assertEqual(solution.score, 5)
+        self.assertEqual(solution.corrected_solution.read(), pdf)
+
+    def test_admin_changelist(self):
+        ''' zoznam riešení v administrácii a hromadné uloženie bodov'''
+        admin_user = User.objects.create(
+            email='admin@test.sk', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        url = reverse('admin:competition_solution_changelist')
+
+        def count_queries(per_page):
+            with mock.patch.object(SolutionAdmin, 'list_per_page', per_page), \
+                    CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        # Počet dotazov nezávisí od počtu riadkov na stránke
+        self.assertEqual(count_queries(10), count_queries(100))
+
+        solutions = list(models.Solution.objects.order_by('-pk')[:3])
+        data = {
+            '_save': 'Uložiť',
+            'form-TOTAL_FORMS': len(solutions),
+            'form-INITIAL_FORMS': len(solutions),
+        }
+        for index, obj in enumerate(solutions):
+            data[f'form-{index}-id'] = obj.pk
+            data[f'form-{index}-score'] = index + 1
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        updates = [query['sql'] for query in queries
+                   if query['sql'].startswith('UPDATE "competition_solution"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            [obj.score for obj in models.Solution.objects.order_by('-pk')[:3]], [1, 2, 3])
+
+
+class TestPublication(InMemoryStorageMixin, APITestCase):
+    '''competition/publication'''
+    URL_PREFIX = '/api/competition/publication'
+    CONTENT = b'%PDF-1.4\n' + bytes(range(256)) + b'\n%%EOF\n'
+
+    fixtures = get_app_fixtures([
+        'base',
+        'competition',
+        'personal',
+        'user'
+    ])
+
+    def create_publication(self, event, content=CONTENT):
+        return models.Publication.objects.create(
+            event=event, name='Zadania',
+            file=SimpleUploadedFile('zadania.pdf', content))
+
+    def test_download(self):
+        ''' súbor na adrese s hashom, ETag, rozsahy a presmerovanie po zmene súboru'''
+        publication = self.create_publication(models.Event.objects.first())
+        self.assertEqual(publication.file_size, len(self.CONTENT))
+        self.assertEqual(publication.file_hash, sha256(self.CONTENT).hexdigest())
+        url = self.client.get(f'{self.URL_PREFIX}/{publication.pk}/').data['file_url']
+        self.assertEqual(url, f'{self.URL_PREFIX}/{publication.pk}/file/{publication.file_hash}/')
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        etag = response['ETag']
+        self.assertEqual(etag, f'"{publication.file_hash}"')
+        self.assertIn('immutable', response['Cache-Control'])
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(url, HTTP_RANGE='bytes=2-9')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT[2:10])
+        self.assertEqual(response['Content-Range'], f'bytes 2-9/{len(self.CONTENT)}')
+
+        response = self.client.get(url, HTTP_RANGE='bytes=2-9', HTTP_IF_RANGE='"iny"')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.get(url, HTTP_RANGE=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code,
+                         status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+        publication.file = SimpleUploadedFile('zadania.pdf', b'%PDF-1.4\n%%EOF\n')
+        publication.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(response['Location'], publication.get_file_url())
+
+    def test_missing_file(self):
+        ''' publikáciu so súborom chýbajúcim v úložisku sa dá upraviť'''
+        publication = self.create_publication(models.Event.objects.first())
+        publication.file.storage.delete(publication.file.name)
+        models.Publication.objects.filter(pk=publication.pk).update(file_size=None, file_hash='')
+        publication = models.Publication.objects.get(pk=publication.pk)
+        publication.name = 'Premenované'
+        publication.save()
+        publication.refresh_from_db()
+        self.assertEqual((publication.file_size, publication.file_hash), (None, ''))
+        self.assertIsNone(publication.get_file_url())
+
+    def test_event_list_queries(self):
+        ''' publikácie v zozname akcií a semestrov nepridávajú dotazy za každú akciu'''
+        def count_queries(url):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        urls = ['/api/competition/event/', '/api/competition/semester/', self.URL_PREFIX + '/']
+        expected = [count_queries(url) for url in urls]
+        for event in models.Event.objects.all():
+            self.create_publication(event)
+            self.create_publication(event)
+        self.assertEqual([count_queries(url) for url in urls], expected)
+
+
+class TestReferenceData(APITestCase):
+    '''reference-data'''
+    URL = '/api/reference-data/'
+
+    fixtures = get_app_fixtures([
+        'base',
+        'competition',
+        'personal',
+        'user'
+    ])
+
+    def test_reference_data_bundle(self):
+        response = self.client.get(self.URL)
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            len(response.data['grades']),
+            models.Grade.objects.filter(is_active=True).count())
+        self.assertEqual(
+            len(response.data['late_tags']), models.LateTag.objects.count())
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        late_tag = models.LateTag.objects.first()
+        late_tag.name = 'Zmenené omeškanie'
+        late_tag.save()
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn('Zmenené omeškanie',
+                      [tag['name'] for tag in response.data['late_tags']])
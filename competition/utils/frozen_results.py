@@ -0,0 +1,115 @@
+"""
+Kompaktný formát zamrazených výsledkov.
+
+Namiesto celej výsledkovky (vrátane serializovanej registrácie v každom riadku)
+sa ukladajú iba čísla: id registrácie, poradie, súčty a body po úlohách.
+Úlohy sú pre všetky riadky rovnaké, preto sa ukladajú iba raz.
+
+Formát verzie 1:
+
+    {
+        'version': 1,
+        'problems': [[problem_pk, ...], ...],   # po sériách
+        'rows': [
+            [registration_pk, rank_start, rank_end, rank_changed,
+             subtotal, total, scores, solution_pks],
+            ...
+        ]
+    }
+
+kde `scores` a `solution_pks` sú zoznamy po sériách. Skóre `None` znamená
+neopravené riešenie ('?'), ak k nemu existuje riešenie, inak neodovzdanú úlohu ('-').
+"""
+
+FROZEN_RESULTS_VERSION = 1
+
+(
+    ROW_REGISTRATION,
+    ROW_RANK_START,
+    ROW_RANK_END,
+    ROW_RANK_CHANGED,
+    ROW_SUBTOTAL,
+    ROW_TOTAL,
+    ROW_SCORES,
+    ROW_SOLUTION_PKS,
+) = range(8)
+
+
+def _pack_points(points: str):
+    if points in ('?', '-'):
+        return None
+    return int(points)
+
+
+def _unpack_points(score, solution_pk) -> str:
+    if score is not None:
+        return str(score)
+    return '?' if solution_pk is not None else '-'
+
+
+def _registration_pk(registration) -> int:
+    # Počítané výsledky obsahujú iba id registrácie,
+    # výsledky v pôvodnom formáte celú serializovanú registráciu
+    if isinstance(registration, dict):
+        return registration['id']
+    return registration
+
+
+def pack_results(results: list[dict]) -> dict:
+    """Zbalí výsledkovku do kompaktného formátu"""
+    problems = [
+        [solution['problem_pk'] for solution in series]
+        for series in results[0]['solutions']
+    ] if results else []
+    return {
+        'version': FROZEN_RESULTS_VERSION,
+        'problems': problems,
+        'rows': [
+            [
+                _registration_pk(row['registration']),
+                row['rank_start'],
+                row['rank_end'],
+                row['rank_changed'],
+                row['subtotal'],
+                row['total'],
+                [[_pack_points(solution['points']) for solution in series]
+                 for series in row['solutions']],
+                [[solution['solution_pk'] for solution in series]
+                 for series in row['solutions']],
+            ]
+            for row in results
+        ]
+    }
+
+
+def is_packed(frozen_results) -> bool:
+    return isinstance(frozen_results, dict) and 'version' in frozen_results
+
+
+def unpack_row(packed_row: list, problems: list[list[int]], registration) -> dict:
+    """
+    Rozbalí jeden riadok výsledkovky. Registrácia sa dodáva zvonka,
+    aby ju bolo možné serializovať naraz pre viacero riadkov.
+    """
+    return {
+        'rank_start': packed_row[ROW_RANK_START],
+        'rank_end': packed_row[ROW_RANK_END],
+        'rank_changed': packed_row[ROW_RANK_CHANGED],
+        'registration': registration,
+        'subtotal': packed_row[ROW_SUBTOTAL],
+        'total': packed_row[ROW_TOTAL],
+        'solutions': [
+            [
+                {
+                    'points': _unpack_points(score, solution_pk),
+                    'solution_pk': solution_pk,
+                    'problem_pk': problem_pk,
+                    'votes': 0
+                }
+                for score, solution_pk, problem_pk in zip(
+                    series_scores, series_solution_pks, series_problems)
+            ]
+            for series_scores, series_solution_pks, series_problems in zip(
+                packed_row[ROW_SCORES], packed_row[ROW_SOLUTION_PKS], problems)
+        ]
+    }
@@ -1,7 +1,6 @@
 # pylint:disable=too-many-lines
 
 import csv
-import json
 import zipfile
 from io import BytesIO
 from operator import itemgetter
@@ -12,6 +11,7 @@ from django.core.files import File
 # pylint: disable=unused-argument
 from django.db.models.manager import BaseManager
 from django.http import FileResponse, Http404, HttpResponse
+from django.shortcuts import redirect
 from django_filters import BooleanFilter, Filter, FilterSet, ModelChoiceFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import exceptions, filters, mixins, status, viewsets
@@ -21,10 +21,17 @@ from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 
 from base.emails import send_bulk_html_emails
+from base.file_serving import serve_file
+from base.pdf import validate_zip_entries
+from base.reference_data import (REFERENCE_DATA_MAX_AGE, ReferenceDataMixin,
+                                 conditional_response, make_etag)
+from base.uploads import limit_upload_size
 from base.utils import mime_type
 from competition.filters import UnaccentSearchFilter, UpcomingFilter
+from competition.landing import get_landing_payload
 from competition.models import (SERIES_SUM_METHODS, Comment, Competition,
                                 CompetitionType, Event, EventRegistration,
                                 Grade, LateTag, Problem, Publication,
@@ -37,6 +44,7 @@ from competition.results import (FreezingNotClosedResults,
                                  UserHasInvalidSchool, freeze_semester_results,
                                  freeze_series_results,
                                  generate_praticipant_invitations,
+                                 parse_result_fields, profile_trajectories,
                                  semester_results, series_results)
 from competition.serializers import (CommentSerializer, CompetitionSerializer,
                                      CompetitionTypeSerializer,
@@ -54,6 +62,41 @@ from competition.serializers import (CommentSerializer, CompetitionSerializer,
 from competition.utils.validations import validate_points
 from personal.models import Profile, School
 from personal.serializers import ProfileExportSerializer, SchoolSerializer
+from personal.views import CountyViewSet, DistrictViewSet, SchoolViewSet
+
+SOLUTION_MAX_SIZE = 20 * 1024 * 1024
+
+
+def check_solution_size(file) -> None:
+    if file.size > SOLUTION_MAX_SIZE:
+        raise exceptions.ParseError(
+            detail='Riešenie prekročilo maximálnu povolenú veľkosť',
+        )
+
+
+def results_response(viewset: viewsets.GenericViewSet, request: Request, results) -> Response:
+    """
+    Odpoveď s výsledkovkou. Podporuje výber polí (?fields=rank,total),
+    filtrovanie podľa školy (?school=) a stránkovanie (?limit=, ?offset=).
+    Registrácie sa serializujú iba pre riadky vo vrátenom úseku.
+    """
+    if hasattr(results, 'only'):
+        try:
+            results = results.only(
+                parse_result_fields(request.query_params.get('fields')))
+        except ValueError as exc:
+            raise ValidationError({'fields': str(exc)}) from exc
+        school = request.query_params.get('school')
+        if school:
+            try:
+                school = int(school)
+            except ValueError as exc:
+                raise ValidationError({'school': 'Škola musí byť zadaná číslom'}) from exc
+            results = results.filter_school(school)
+    page = viewset.paginate_queryset(results)
+    if page is not None:
+        return viewset.get_paginated_response(page)
+    return Response(list(results), status=status.HTTP_200_OK)
 
 
 def parse_corrected_solution_file_name(file_name: str):
@@ -146,15 +189,39 @@ class CompetitionViewSet(mixins.RetrieveModelMixin,
         try:
             competition: Competition = self.get_queryset().get(slug=slug)
 
-            return Response(
-                CompetitionSerializer(competition, many=False).data
-            )
+            return Response(get_landing_payload(competition))
 
         except Competition.DoesNotExist as exc:
             raise Http404 from exc
 
+    @action(detail=True)
+    def history(self, request: Request, pk: Optional[int] = None) -> Response:
+        """Ukončené akcie súťaže, stránkované cez ?limit a ?offset"""
+        events = EventSerializer.prefetch(
+            self.get_object().event_set.history())
+        page = self.paginate_queryset(events)
+        if page is not None:
+            return self.get_paginated_response(EventSerializer(page, many=True).data)
+        return Response(EventSerializer(events, many=True).data)
+
+    @action(detail=True)
+    def trajectories(self, request: Request, pk: Optional[int] = None) -> Response:
+        """
+        Vývoj poradia a bodov riešiteľov (?profile=1&profile=2)
+        naprieč zamrazenými výsledkami celej histórie súťaže
+        """
+        competition = self.get_object()
+        try:
+            profiles = [int(profile)
+                        for profile in request.query_params.getlist('profile')]
+        except ValueError as exc:
+            raise ValidationError({'profile': 'Profil musí byť číslo'}) from exc
+        if not profiles:
+            raise ValidationError({'profile': 'Treba zadať aspoň jeden profil'})
+        return Response(profile_trajectories(competition, profiles))
+
 
-class CompetitionTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class CompetitionTypeViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     queryset = CompetitionType.objects.all()
     serializer_class = CompetitionTypeSerializer
 
@@ -336,15 +403,12 @@ class ProblemViewSet(ModelViewSetWithSerializerContext):
         event_registration = EventRegistration.get_registration_by_profile_and_event(
             request.user.profile, problem.series.semester)
 
+        limit_upload_size(request, SOLUTION_MAX_SIZE)
         if 'file' not in request.FILES:
             raise exceptions.ParseError(detail='Request neobsahoval súbor')
 
         file = request.FILES['file']
-
-        if file.size > 20971520:  # 20 MB
-            raise exceptions.ParseError(
-                detail='Riešenie prekročilo maximálnu povolenú veľkosť',
-            )
+        check_solution_size(file)
 
         if mime_type(file) != 'application/pdf':
             raise exceptions.ParseError(
@@ -377,9 +441,11 @@ class ProblemViewSet(ModelViewSetWithSerializerContext):
     def upload_model_solution(self, request, pk=None):
         """Nahrá užívateľské riešenie k úlohe"""
         problem: Problem = self.get_object()
+        limit_upload_size(request, SOLUTION_MAX_SIZE)
         if 'file' not in request.FILES:
             raise exceptions.ParseError(detail='Request neobsahoval súbor')
         file = request.FILES['file']
+        check_solution_size(file)
         if mime_type(file) != 'application/pdf':
             raise exceptions.ParseError(
                 detail='Riešenie nie je vo formáte pdf')
@@ -469,13 +535,9 @@ class ProblemViewSet(ModelViewSetWithSerializerContext):
                 detail='Priložený súbor nie je zip')
 
         with zipfile.ZipFile(zfile) as zfile:
-            if zfile.testzip():
-                raise exceptions.ParseError(detail='Súbor zip je poškodený')
-
             parsed_filenames = []
             errors = []
 
-            # TODO: checks file are really pdfs
             for filename in zfile.namelist():
                 if not filename.endswith(".pdf"):
                     # Ignore other non-pdf files in the archive
@@ -497,6 +559,12 @@ class ProblemViewSet(ModelViewSetWithSerializerContext):
 
                 parsed_filenames.append((filename, score, solution))
 
+            # Obsah sa kontroluje ešte pred uložením prvého riešenia
+            invalid = validate_zip_entries(
+                zfile, [filename for filename, _, _ in parsed_filenames], SOLUTION_MAX_SIZE)
+            errors += [{'filename': filename, 'status': error}
+                       for filename, error in invalid.items()]
+
             if errors:
                 return Response(errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -577,10 +645,7 @@ class SeriesViewSet(ModelViewSetWithSerializerContext):
     def results(self, request: Request, pk: Optional[int] = None):
         """Vráti výsledkovku pre sériu"""
         series = self.get_object()
-        if series.frozen_results is not None:
-            return Response(json.loads(series.frozen_results), status=status.HTTP_200_OK)
-        results = series_results(series)
-        return Response(results, status=status.HTTP_200_OK)
+        return results_response(self, request, series_results(series))
 
     @action(methods=['post'], detail=True, url_path='results/freeze')
     def freeze_results(self, request: Request, pk: Optional[int] = None):
@@ -588,13 +653,15 @@ class SeriesViewSet(ModelViewSetWithSerializerContext):
         try:
             freeze_series_results(series)
         except FreezingNotClosedResults as exc:
-            raise exceptions.MethodNotAllowed(
-                method='series/results/freeze',
-                detail='Séria nemá opravené všetky úlohy a teda sa nedá uzavrieť.') from exc
+            return Response({
+                'detail': 'Séria nemá opravené všetky úlohy a teda sa nedá uzavrieť.',
+                'diagnostics': exc.diagnostics.as_dict()
+            }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
         except UserHasInvalidSchool as exc:
-            raise exceptions.MethodNotAllowed(
-                method='series/results/freeze',
-                detail=str(exc)) from exc
+            return Response({
+                'detail': str(exc),
+                'diagnostics': exc.diagnostics.as_dict()
+            }, status=status.HTTP_405_METHOD_NOT_ALLOWED)
         try:
             freeze_semester_results(series.semester)
         except FreezingNotClosedResults:
@@ -763,10 +830,12 @@ class SolutionViewSet(viewsets.ModelViewSet):
             permission_classes=[ProblemPermission])
     def upload_solution_file(self, request, pk=None):
         solution: Solution = self.get_object()
+        limit_upload_size(request, SOLUTION_MAX_SIZE)
         if 'file' not in request.FILES:
             raise exceptions.ParseError(detail='Request neobsahoval súbor')
 
         file = request.FILES['file']
+        check_solution_size(file)
         if mime_type(file) != 'application/pdf':
             raise exceptions.ParseError(
                 detail='Riešenie nie je vo formáte pdf')
@@ -780,10 +849,12 @@ class SolutionViewSet(viewsets.ModelViewSet):
             permission_classes=[ProblemPermission])
     def upload_corrected_solution_file(self, request, pk=None):
         solution: Solution = self.get_object()
+        limit_upload_size(request, SOLUTION_MAX_SIZE)
         if 'file' not in request.FILES:
             raise exceptions.ParseError(detail='Request neobsahoval súbor')
 
         file = request.FILES['file']
+        check_solution_size(file)
         if mime_type(file) != 'application/pdf':
             raise exceptions.ParseError(
                 detail='Riešenie nie je vo formáte pdf')
@@ -818,7 +889,7 @@ class SemesterListViewSet(viewsets.ReadOnlyModelViewSet):
 
 class SemesterViewSet(ModelViewSetWithSerializerContext):
     """Semestre - aj so sériami a problémami"""
-    queryset = Semester.objects.all()
+    queryset = SemesterWithProblemsSerializer.prefetch(Semester.objects.all())
     serializer_class = SemesterWithProblemsSerializer
     permission_classes = (CompetitionRestrictedPermission,)
     filter_backends = [DjangoFilterBackend,
@@ -863,8 +934,7 @@ class SemesterViewSet(ModelViewSetWithSerializerContext):
     def results(self, request, pk=None):
         """Vráti výsledkovku semestra"""
         semester = self.get_object()
-        current_results = semester_results(semester)
-        return Response(current_results, status=status.HTTP_200_OK)
+        return results_response(self, request, semester_results(semester))
 
     @action(methods=['get'], detail=True, permission_classes=[IsAdminUser])
     def schools(self, request, pk=None):
@@ -946,7 +1016,7 @@ class SemesterViewSet(ModelViewSetWithSerializerContext):
         current_semester = self.get_queryset().filter(
             competition=competition_id).current()
         current_results = semester_results(current_semester)
-        return Response(current_results, status=status.HTTP_201_CREATED)
+        return Response(list(current_results), status=status.HTTP_201_CREATED)
 
     def __get_participants(self):
         semester = self.get_object()
@@ -1034,7 +1104,7 @@ class EventViewSet(ModelViewSetWithSerializerContext):
             fields = ['school_year',
                       'season_code', 'location', 'competition']
 
-    queryset = Event.objects.all()
+    queryset = EventSerializer.prefetch(Event.objects.all())
     serializer_class = EventSerializer
     permission_classes = (CompetitionRestrictedPermission,)
     filter_backends = [DjangoFilterBackend,
@@ -1156,7 +1226,7 @@ class PublicationTypeViewSet(viewsets.ReadOnlyModelViewSet):
 
 class PublicationViewSet(viewsets.ModelViewSet):
     """Publikácie(výsledky, brožúrky, časopisy, ...)"""
-    queryset = Publication.objects.all()
+    queryset = PublicationSerializer.prefetch(Publication.objects.all())
     serializer_class = PublicationSerializer
     permission_classes = (CompetitionRestrictedPermission,)
     filter_backends = [DjangoFilterBackend,
@@ -1185,6 +1255,20 @@ class PublicationViewSet(viewsets.ModelViewSet):
 
         return super().perform_update(serializer)
 
+    @action(detail=True, url_path=r'file/(?P<file_hash>[0-9a-f]{64})')
+    def download(self, request, pk=None, file_hash=None):
+        """
+        Súbor publikácie na adrese s hashom obsahu. Po výmene súboru
+        presmeruje stará adresa na novú.
+        """
+        publication: Publication = self.get_object()
+        if not publication.file_hash:
+            raise Http404
+        if file_hash != publication.file_hash:
+            return redirect(publication.get_file_url())
+        return serve_file(request, publication.file, publication.file_size,
+                          f'"{publication.file_hash}"', immutable=True)
+
     @staticmethod
     def _ensure_file_attached(serializer: PublicationSerializer):
         if 'file' not in serializer.validated_data:
@@ -1193,13 +1277,34 @@ class PublicationViewSet(viewsets.ModelViewSet):
             )
 
 
-class GradeViewSet(viewsets.ReadOnlyModelViewSet):
+class GradeViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     """Ročníky riešiteľov (Z9,S1 ...)"""
     queryset = Grade.objects.filter(is_active=True).all()
     serializer_class = GradeSerializer
 
 
-class LateTagViewSet(viewsets.ReadOnlyModelViewSet):
+class LateTagViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     """Omeškania"""
     queryset = LateTag.objects.all()
     serializer_class = LateTagSerializer
+
+
+class ReferenceDataView(APIView):
+    """Všetky číselníky naraz, frontend ich pri štarte načíta jednou požiadavkou"""
+    reference_viewsets = {
+        'counties': CountyViewSet,
+        'districts': DistrictViewSet,
+        'schools': SchoolViewSet,
+        'grades': GradeViewSet,
+        'late_tags': LateTagViewSet,
+        'competition_types': CompetitionTypeViewSet,
+    }
+
+    def get(self, request):
+        etag = make_etag((), type(self).__name__, *(
+            viewset.list_etag() for viewset in self.reference_viewsets.values()))
+        return conditional_response(
+            request, etag,
+            lambda: {name: viewset.reference_data()
+                     for name, viewset in self.reference_viewsets.items()},
+            max_age=REFERENCE_DATA_MAX_AGE)
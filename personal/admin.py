@@ -1,6 +1,10 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.db import transaction
 
-from personal.models import OtherSchoolRequest, School
+from competition.models import EventRegistration
+from personal.models import OtherSchoolRequest, Profile, School
+from personal.school_matching import SchoolMatcher
 
 
 @admin.register(School)
@@ -25,3 +29,33 @@ class OtherSchoolRequestAdmin(admin.ModelAdmin):
         'profile',
         'school_info'
     )
+
+    actions = ['resolve_with_existing_schools']
+
+    @admin.action(description='Priradiť existujúce školy podľa popisu')
+    def resolve_with_existing_schools(self, request, queryset):
+        matcher = SchoolMatcher()
+        matches = {}
+        for school_request in queryset.only('pk', 'profile_id', 'school_info'):
+            code = matcher.match_text(school_request.school_info)
+            if code is not None:
+                matches.setdefault(code, []).append(school_request)
+        resolved = [school_request for requests in matches.values()
+                    for school_request in requests]
+        with transaction.atomic():
+            for code, requests in matches.items():
+                profiles = [school_request.profile_id for school_request in requests]
+                Profile.objects.filter(pk__in=profiles).update(school=code)
+                # Registrácie s "inou školou" patria tiež nájdenej škole
+                EventRegistration.objects.filter(
+                    profile__in=profiles, school=settings.OTHER_SCHOOL_CODE
+                ).update(school=code)
+            OtherSchoolRequest.objects.filter(
+                pk__in=[school_request.pk for school_request in resolved]).delete()
+        # Vyriešené žiadosti sú už zmazané, queryset vráti iba zvyšné
+        unresolved = queryset.count()
+        self.message_user(request, f'Vyriešených žiadostí: {len(resolved)}')
+        if unresolved:
+            self.message_user(
+                request, f'Bez jednoznačnej školy, treba vyriešiť ručne: {unresolved}',
+                level=messages.WARNING)
@@ -0,0 +1,125 @@
+"""
+Našepkávanie škôl z indexu v pamäti procesu.
+
+Index sa načíta pri prvom dopyte a zahodí pri každej zmene školy.
+Slová dopytu sa hľadajú ako prefixy slov názvu, obce a ulice školy
+(zoradený slovník + bisect), pri preklepe sa použije trigramová podobnosť.
+"""
+import heapq
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.db.models.signals import post_delete, post_migrate, post_save
+
+from base.utils import normalize
+from personal.models import School
+from personal.serializers import SchoolSerializer
+
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+# Podiel trigramov dopytu, ktoré musí mať škola, aby sa ponúkla pri preklepe
+TRIGRAM_MIN_SIMILARITY = 0.5
+
+
+def _words(text: str) -> list[str]:
+    return ''.join(c if c.isalnum() else ' ' for c in text).split()
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SchoolAutocompleteIndex:
+    def __init__(self):
+        self._index = None
+        for signal in (post_save, post_delete):
+            signal.connect(self.invalidate, sender=School, weak=False)
+        post_migrate.connect(self.invalidate, weak=False)
+
+    def invalidate(self, *args, **kwargs):
+        # pylint: disable=unused-argument
+        self._index = None
+
+    def _load(self) -> dict:
+        index = self._index
+        if index is not None:
+            return index
+
+        entries = {}
+        sort_keys = {}
+        postings = defaultdict(set)
+        trigrams = defaultdict(set)
+        for school in School.objects.all():
+            code = school.code
+            # Rovnaký tvar ako v zozname škôl, serializuje sa raz pri načítaní
+            entries[code] = SchoolSerializer(school).data
+            name = school.name_normalized
+            sort_keys[code] = (len(name), name, code)
+            for word in _words(f'{name} {school.street_normalized} {school.city_normalized}'):
+                postings[word].add(code)
+            for trigram in _trigrams(name):
+                trigrams[trigram].add(code)
+
+        index = {
+            'entries': entries,
+            'sort_keys': sort_keys,
+            'vocabulary': sorted(postings),
+            'postings': dict(postings),
+            'trigrams': dict(trigrams),
+        }
+        self._index = index
+        return index
+
+    @staticmethod
+    def _prefix_matches(index: dict, word: str) -> set:
+        vocabulary = index['vocabulary']
+        matches = set()
+        i = bisect_left(vocabulary, word)
+        while i < len(vocabulary) and vocabulary[i].startswith(word):
+            matches |= index['postings'][vocabulary[i]]
+            i += 1
+        return matches
+
+    @staticmethod
+    def _similar(index: dict, query: str, limit: int) -> list:
+        query_trigrams = _trigrams(query)
+        counts = Counter()
+        for trigram in query_trigrams:
+            counts.update(index['trigrams'].get(trigram, ()))
+        threshold = TRIGRAM_MIN_SIMILARITY * len(query_trigrams)
+        return heapq.nsmallest(
+            limit,
+            (code for code, count in counts.items() if count >= threshold),
+            key=lambda code: (-counts[code], index['sort_keys'][code])
+        )
+
+    def search(self, query: str, limit: int = AUTOCOMPLETE_DEFAULT_LIMIT) -> list[dict]:
+        """Najviac `limit` škôl, ktorých slová začínajú slovami dopytu"""
+        index = self._load()
+        words = _words(normalize(query))
+        if not words:
+            return []
+
+        matches = None
+        for word in sorted(words, key=len, reverse=True):
+            word_matches = self._prefix_matches(index, word)
+            matches = word_matches if matches is None else matches & word_matches
+            if not matches:
+                break
+
+        if matches:
+            # Najprv školy, ktorých názov začína dopytom, potom kratšie názvy
+            phrase = ' '.join(words)
+            sort_keys = index['sort_keys']
+            codes = heapq.nsmallest(
+                limit, matches,
+                key=lambda code: (not sort_keys[code][1].startswith(phrase),
+                                  sort_keys[code])
+            )
+        else:
+            codes = self._similar(index, ' '.join(words), limit)
+        return [index['entries'][code] for code in codes]
+
+
+school_autocomplete = SchoolAutocompleteIndex()
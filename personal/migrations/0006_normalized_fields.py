@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:24
+
+import base.models
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    for model_name in ['Profile', 'School']:
+        base.models.backfill_normalized_fields(
+            apps.get_model('personal', model_name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('personal', '0005_alter_otherschoolrequest_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='first_name_normalized',
+            field=base.models.NormalizedField(blank=True, db_index=True, default='', editable=False, max_length=150, source='first_name'),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='last_name_normalized',
+            field=base.models.NormalizedField(blank=True, db_index=True, default='', editable=False, max_length=150, source='last_name'),
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='city_normalized',
+            field=base.models.NormalizedField(blank=True, db_index=True, default='', editable=False, max_length=100, source='city'),
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='name_normalized',
+            field=base.models.NormalizedField(blank=True, db_index=True, default='', editable=False, max_length=100, source='name'),
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='street_normalized',
+            field=base.models.NormalizedField(blank=True, db_index=True, default='', editable=False, max_length=100, source='street'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,7 @@ from django.conf import settings
 from django.db import models
 
 from base.managers import UnspecifiedValueManager
+from base.models import NormalizedField, NormalizedFieldsModel
 from base.validators import phone_number_validator
 
 
@@ -48,7 +49,7 @@ def unspecified_district():
     return District.objects.get_unspecified_value()
 
 
-class School(models.Model):
+class School(NormalizedFieldsModel):
     class Meta:
         verbose_name = 'škola'
         verbose_name_plural = 'školy'
@@ -68,6 +69,10 @@ class School(models.Model):
         on_delete=models.SET(unspecified_district)
     )
 
+    name_normalized = NormalizedField(source='name', max_length=100)
+    street_normalized = NormalizedField(source='street', max_length=100)
+    city_normalized = NormalizedField(source='city', max_length=100)
+
     objects = UnspecifiedValueManager(unspecified_value_pk=0)
 
     @property
@@ -89,7 +94,7 @@ def unspecified_school():
     return School.objects.get_unspecified_value()
 
 
-class Profile(models.Model):
+class Profile(NormalizedFieldsModel):
     class Meta:
         verbose_name = 'profil'
         verbose_name_plural = 'profily'
@@ -98,6 +103,9 @@ class Profile(models.Model):
 
     last_name = models.CharField(verbose_name='priezvisko', max_length=150)
 
+    first_name_normalized = NormalizedField(source='first_name', max_length=150)
+    last_name_normalized = NormalizedField(source='last_name', max_length=150)
+
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -132,8 +140,8 @@ class Profile(models.Model):
 
     @grade.setter
     def grade(self, value):
-        self.year_of_graduation = apps.get_model('competition', 'Grade').get(
-            pk=value).get_year_of_graduation_by_date()
+        self.year_of_graduation = apps.get_model('competition', 'Grade').get_by_pk(
+            value).get_year_of_graduation_by_date()
 
     def get_full_name(self):
         return f'{self.first_name.strip()} {self.last_name.strip()}'
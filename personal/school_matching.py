@@ -0,0 +1,121 @@
+"""
+Párovanie voľne zadaných škôl (stará databáza, požiadavky na založenie
+školy) na existujúce školy.
+
+Všetky školy sa raz rozložia na normalizované tokeny (názov, ulica, obec,
+PSČ) do invertovaného indexu. Kandidáti sa hodnotia váženým prekryvom
+tokenov (Dice koeficient s váhami podľa vzácnosti tokenu), takže bežné
+slová ako "gymnázium" rozhodujú menej ako ulica alebo obec.
+"""
+import math
+import re
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.conf import settings
+
+from base.utils import normalize
+from personal.models import School
+
+# Skratky v názvoch škôl, po normalizácii
+ABBREVIATIONS = {
+    'gym': ['gymnazium'],
+    'gymn': ['gymnazium'],
+    'spoj': ['spojena'],
+    'zs': ['zakladna', 'skola'],
+    'ss': ['stredna', 'skola'],
+    'sos': ['stredna', 'odborna', 'skola'],
+    'sou': ['stredne', 'odborne', 'uciliste'],
+    'ou': ['odborne', 'uciliste'],
+}
+STOP_WORDS = {'a', 'c', 'na', 'ul', 'ulica', 'v', 'vo'}
+ZIP_CODE = re.compile(r'\b(\d{3}) ?(\d{2})\b')
+
+# Najnižšie skóre (0 až 1) a náskok pred druhým kandidátom pre istú zhodu
+MIN_SCORE = 0.5
+MIN_MARGIN = 0.1
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    if not text:
+        return []
+    tokens = []
+    for word in re.split(r'[^0-9a-z]+', normalize(text)):
+        if not word or word in STOP_WORDS:
+            continue
+        tokens.extend(ABBREVIATIONS.get(word, [word]))
+    return tokens
+
+
+def zip_token(zip_code: Optional[str]) -> list[str]:
+    digits = re.sub(r'\D', '', zip_code or '')
+    return [f'psc:{digits}'] if len(digits) == 5 else []
+
+
+def school_tokens(name, street='', city='', zip_code='') -> set[str]:
+    return {*tokenize(name), *tokenize(street), *tokenize(city), *zip_token(zip_code)}
+
+
+def text_tokens(text: str) -> set[str]:
+    """Tokeny voľného textu, PSČ sa v ňom hľadá podľa tvaru"""
+    zip_codes = [f'psc:{first}{second}' for first, second in ZIP_CODE.findall(text)]
+    return {*tokenize(ZIP_CODE.sub(' ', text)), *zip_codes}
+
+
+class SchoolMatcher:
+    def __init__(self, schools: Optional[Iterable[School]] = None):
+        if schools is None:
+            schools = School.objects.exclude(
+                code__in=[settings.OTHER_SCHOOL_CODE, settings.NO_SCHOOL_CODE])
+        postings = defaultdict(set)
+        self._tokens = {}
+        for school in schools:
+            tokens = school_tokens(
+                school.name, school.street, school.city, school.zip_code)
+            self._tokens[school.code] = tokens
+            for token in tokens:
+                postings[token].add(school.code)
+        self._postings = dict(postings)
+        count = max(len(self._tokens), 1)
+        self._weights = {
+            token: math.log(1 + count / len(codes)) for token, codes in postings.items()
+        }
+        self._school_weights = {
+            code: sum(self._weights[token] for token in tokens)
+            for code, tokens in self._tokens.items()
+        }
+
+    def _weight(self, token: str) -> float:
+        # Neznámy token je vzácnejší ako všetky známe
+        return self._weights.get(token, math.log(1 + len(self._tokens) + 1))
+
+    def scores(self, tokens: set[str], limit: int = 5) -> list[tuple[float, int]]:
+        """Najlepší kandidáti ako (skóre, kód školy), zoradení od najlepšieho"""
+        query_weight = sum(self._weight(token) for token in tokens)
+        if not query_weight:
+            return []
+        shared = defaultdict(float)
+        for token in tokens:
+            for code in self._postings.get(token, ()):
+                shared[code] += self._weights[token]
+        ranked = sorted(
+            ((2 * weight / (query_weight + self._school_weights[code]), code)
+             for code, weight in shared.items()),
+            key=lambda item: (-item[0], item[1]))
+        return ranked[:limit]
+
+    def _best(self, tokens: set[str]) -> Optional[int]:
+        ranked = self.scores(tokens, limit=2)
+        if not ranked or ranked[0][0] < MIN_SCORE:
+            return None
+        if len(ranked) > 1 and ranked[0][0] - ranked[1][0] < MIN_MARGIN:
+            return None
+        return ranked[0][1]
+
+    def match(self, name, street='', city='', zip_code='') -> Optional[int]:
+        """Kód jednoznačne zodpovedajúcej školy alebo None"""
+        return self._best(school_tokens(name, street, city, zip_code))
+
+    def match_text(self, text: str) -> Optional[int]:
+        """Ako `match`, ale pre školu zadanú jedným textom (napr. OtherSchoolRequest)"""
+        return self._best(text_tokens(text))
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django_typomatic import ts_interface
 from rest_framework import serializers
 
@@ -48,7 +49,8 @@ class SchoolSerializer(serializers.ModelSerializer):
 class SchoolShortSerializer(serializers.ModelSerializer):
     class Meta:
         model = School
-        exclude = ['email', 'district']
+        exclude = ['email', 'district', 'name_normalized',
+                   'street_normalized', 'city_normalized']
 
 
 @ts_interface(context='personal')
@@ -101,10 +103,10 @@ class ProfileSerializer(serializers.ModelSerializer):
         return str(obj)
 
     def get_is_student(self, obj):
-        return obj.school != School.objects.get(pk=1)
+        return obj.school_id != settings.NO_SCHOOL_CODE
 
     def get_has_school(self, obj):
-        return obj.school != School.objects.get(pk=0) and obj.school != School.objects.get(pk=1)
+        return obj.school_id not in (settings.OTHER_SCHOOL_CODE, settings.NO_SCHOOL_CODE)
 
     def get_grade_name(self, obj):
         return Grade.get_grade_by_year_of_graduation(
@@ -112,7 +114,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         ).name
 
     def update(self, instance, validated_data):
-        grade = Grade.objects.get(pk=validated_data.pop('grade'))
+        grade = Grade.get_by_pk(validated_data.pop('grade'))
         school = School.objects.get(pk=validated_data.pop('school_id'))
         other_school_data = validated_data.pop('other_school_request', None)
 
@@ -136,7 +138,7 @@ class ProfileSerializer(serializers.ModelSerializer):
         return instance
 
     def create(self, validated_data):
-        grade = Grade.objects.get(pk=validated_data['grade'])
+        grade = Grade.get_by_pk(validated_data['grade'])
         school = School.objects.get(pk=validated_data['school_id'])
         return Profile.objects.create(
             first_name=validated_data['first_name'],
@@ -166,7 +168,7 @@ class ProfileCreateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        grade = Grade.objects.get(pk=validated_data['grade'])
+        grade = Grade.get_by_pk(validated_data['grade'])
         setattr(
             instance,
             'year_of_graduation',
@@ -1,11 +1,17 @@
 from django.test import TestCase
+from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-# from user.models import User
-from personal.models import County, District, School
+from competition.models import grade_cache
+from personal.models import (County, District, OtherSchoolRequest, Profile,
+                             School)
+from personal.school_matching import SchoolMatcher
 from personal.serializers import (CountySerializer, DistrictSerializer,
-                                  SchoolSerializer)
+                                  ProfileSerializer, SchoolSerializer)
+from personal.views import ProfileViewSet
+from tests.test_utils import get_app_fixtures
+from user.models import User
 
 
 class TestProfile(TestCase):
@@ -24,6 +30,25 @@ class TestProfile(TestCase):
     #                     msg="Profile pre Usera nebol vytvorený automaticky.")
 
 
+class ProfileSerializerQueriesTest(TestCase):
+    '''
+    serializácia profilov bez dotazov pre každý profil
+    '''
+    fixtures = get_app_fixtures(['base', 'user', 'personal', 'competition'])
+
+    def test_profile_list_queries(self):
+        grade_cache.invalidate()
+        profiles = ProfileViewSet.queryset.all()
+        self.assertTrue(Profile.objects.count() > 1)
+        # Profily a jednorazové načítanie ročníkov
+        with self.assertNumQueries(2):
+            data = ProfileSerializer(profiles, many=True).data
+        profile = next(profile for profile in data
+                       if profile['school']['code'] == 0)
+        self.assertTrue(profile['is_student'])
+        self.assertFalse(profile['has_school'])
+
+
 class TestCounty(TestCase):
     '''
     county create
@@ -62,6 +87,24 @@ class CountyViewsTest(APITestCase):
                 response.data
             )
 
+    def test_counties_etag(self):
+        response = self.client.get(self.URL_PREFIX + '/')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn('max-age', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client.get(
+            self.URL_PREFIX + '/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+
+        County.objects.create(name="Žilinský kraj")
+        response = self.client.get(
+            self.URL_PREFIX + '/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertNotEqual(etag, response['ETag'])
+        self.assertEqual(len(self.counties) + 1, len(response.data))
+
 
 class TestDistrict(TestCase):
     '''
@@ -171,6 +214,14 @@ class TestSchoolWithAddress(TestCase):
         self.assertTrue(isinstance(mod, School))
         self.assertEqual(mod.printable_zip_code, '040 01')
 
+    def test_normalized_fields(self):
+        mod = self.setUp()
+        self.assertEqual(mod.street_normalized, 'postova 9')
+        mod.street = 'Šrobárova 1'
+        mod.save(update_fields=['street'])
+        mod.refresh_from_db()
+        self.assertEqual(mod.street_normalized, 'srobarova 1')
+
     def test_stitok(self):
         mod = self.setUp()
         self.assertTrue(isinstance(mod, School))
@@ -282,3 +333,87 @@ class SchoolViewsTest(APITestCase):
                 SchoolSerializer(instance=school).data,
                 response.data
             )
+
+    def test_search_schools_without_diacritics(self):
+        response = self.client.get(
+            self.URL_PREFIX + '/?search=postova', {}, 'json')
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, len(response.data))
+        self.assertIn(
+            SchoolSerializer(instance=self.schools[0]).data,
+            response.data
+        )
+
+    def test_autocomplete_schools(self):
+        response = self.client.get(
+            self.URL_PREFIX + '/autocomplete/', {'q': 'gymn posto'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            [SchoolSerializer(instance=self.schools[0]).data], response.data)
+
+        response = self.client.get(
+            self.URL_PREFIX + '/autocomplete/', {'q': 'Košice', 'limit': 2})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(2, len(response.data))
+
+        # Preklep, ponúknu sa podobné názvy
+        response = self.client.get(
+            self.URL_PREFIX + '/autocomplete/', {'q': 'gymnazim'})
+
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(3, len(response.data))
+
+    def test_autocomplete_refreshed_on_change(self):
+        response = self.client.get(
+            self.URL_PREFIX + '/autocomplete/', {'q': 'sport'})
+        self.assertEqual([], response.data)
+
+        school = School.objects.create(
+            name='Športové gymnázium',
+            district=self.schools[0].district,
+            street='Trieda SNP 104',
+            city='Košice',
+            zip_code='04011'
+        )
+        response = self.client.get(
+            self.URL_PREFIX + '/autocomplete/', {'q': 'sport'})
+        self.assertEqual([SchoolSerializer(instance=school).data], response.data)
+
+
+class SchoolMatcherTest(TestCase):
+    '''
+    párovanie škôl zadaných textom na existujúce školy
+    '''
+    fixtures = get_app_fixtures(['base', 'user', 'personal'])
+
+    def test_match_school(self):
+        matcher = SchoolMatcher()
+        self.assertEqual(
+            matcher.match('Gymnázium', 'Poštová 9', 'Košice', '042 52'), 160997)
+        self.assertEqual(
+            matcher.match('Gym.', 'Postova 9', 'Kosice-Stare Mesto', ''), 160997)
+        self.assertEqual(matcher.match_text('Gymnázium Šrobárova 1, Košice'), 160989)
+        # Gymnázií v Košiciach je veľa, bez ulice nie je zhoda istá
+        self.assertIsNone(matcher.match_text('Gymnázium Košice'))
+        self.assertIsNone(matcher.match_text('Neexistujúca akadémia'))
+
+    def test_resolve_other_school_requests(self):
+        admin_user = User.objects.create(
+            email='admin@test.sk', is_staff=True, is_superuser=True)
+        self.client.force_login(admin_user)
+        profiles = list(Profile.objects.all()[:2])
+        resolved = OtherSchoolRequest.objects.create(
+            profile=profiles[0], school_info='Gymnázium, Poštová 9, 042 52 Košice')
+        unresolved = OtherSchoolRequest.objects.create(
+            profile=profiles[1], school_info='Súkromná škola na Marse')
+        response = self.client.post(
+            reverse('admin:personal_otherschoolrequest_changelist'),
+            {'action': 'resolve_with_existing_schools',
+             '_selected_action': [resolved.pk, unresolved.pk]})
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(list(OtherSchoolRequest.objects.all()), [unresolved])
+        profiles[0].refresh_from_db()
+        self.assertEqual(profiles[0].school_id, 160997)
@@ -6,6 +6,11 @@ from rest_framework.filters import SearchFilter
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
+from base.reference_data import ReferenceDataMixin
+from competition.filters import UnaccentSearchFilter
+from personal.autocomplete import (AUTOCOMPLETE_DEFAULT_LIMIT,
+                                   AUTOCOMPLETE_MAX_LIMIT,
+                                   school_autocomplete)
 from personal.models import County, District, Profile, School
 from personal.serializers import (CountySerializer, DistrictSerializer,
                                   ProfileSerializer, SchoolSerializer)
@@ -14,7 +19,7 @@ from personal.serializers import (CountySerializer, DistrictSerializer,
 # Search filter umoznuju pouzit URL v tvare profile/schools/?search=Alej
 
 
-class CountyViewSet(viewsets.ReadOnlyModelViewSet):
+class CountyViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     """Kraje"""
     queryset = County.objects.all()
     serializer_class = CountySerializer
@@ -22,7 +27,7 @@ class CountyViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name']
 
 
-class DistrictViewSet(viewsets.ReadOnlyModelViewSet):
+class DistrictViewSet(ReferenceDataMixin, viewsets.ReadOnlyModelViewSet):
     """Okresy"""
     queryset = District.objects.all()
     serializer_class = DistrictSerializer
@@ -31,14 +36,29 @@ class DistrictViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['name', 'abbreviation']
 
 
-class SchoolViewSet(viewsets.ModelViewSet):
+class SchoolViewSet(ReferenceDataMixin, viewsets.ModelViewSet):
     """Školy"""
     queryset = School.objects.all()
     serializer_class = SchoolSerializer
     filterset_fields = ['district', 'district__county']
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, UnaccentSearchFilter]
     search_fields = ['name', 'street', 'city']
 
+    @action(methods=['get'], detail=False)
+    def autocomplete(self, request):
+        """
+        Našepkávanie škôl podľa začiatkov slov názvu, ulice a obce
+        (?q=gym posto&limit=10), bez dotazu do databázy
+        """
+        try:
+            limit = min(int(request.query_params.get(
+                'limit', AUTOCOMPLETE_DEFAULT_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError as exc:
+            raise exceptions.ValidationError(
+                detail='Parameter limit musí byť číslo.') from exc
+        return Response(school_autocomplete.search(
+            request.query_params.get('q', ''), max(limit, 1)))
+
     def destroy(self, request, *args, **kwargs):
         """Zmazanie školy"""
         instance = self.get_object()
@@ -62,11 +82,12 @@ class SchoolViewSet(viewsets.ModelViewSet):
 
 class ProfileViewSet(viewsets.ModelViewSet):
     """Užívateľské profily"""
-    queryset = Profile.objects.all()
+    queryset = Profile.objects.select_related(
+        'user', 'school__district', 'other_school_request')
     serializer_class = ProfileSerializer
     filterset_fields = ['school', 'year_of_graduation', ]
     permission_classes = [IsAdminUser]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
+    filter_backends = [DjangoFilterBackend, UnaccentSearchFilter]
     search_fields = ['first_name', 'last_name']
 
     # pylint: disable=inconsistent-return-statements
@@ -1,6 +1,11 @@
 import os
 from pathlib import Path
+from unittest import mock
 
+from django.apps import apps
+from django.core.files.storage import InMemoryStorage, default_storage
+from django.db import models
+from django.test import override_settings
 from rest_framework.test import APIClient
 
 from user.models import User
@@ -20,6 +25,40 @@ def get_app_fixtures(app_list):
     return fixtures
 
 
+class InMemoryStorageMixin:
+    '''
+    Nahrané súbory (predvolené úložisko aj súkromné riešení) ostanú
+    počas testov triedy iba v pamäti
+    '''
+
+    @classmethod
+    def setUpClass(cls):
+        cls.storage = InMemoryStorage()
+        cls.storage_settings = override_settings(STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+            'staticfiles': {
+                'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+        })
+        cls.storage_settings.enable()
+        # Polia s vlastným úložiskom (súkromné riešenia) default_storage nepoužívajú
+        cls.storage_patches = [
+            mock.patch.object(field, 'storage', cls.storage)
+            for model in apps.get_models()
+            for field in model._meta.get_fields()  # pylint: disable=protected-access
+            if isinstance(field, models.FileField) and field.storage is not default_storage
+        ]
+        for patch in cls.storage_patches:
+            patch.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        for patch in cls.storage_patches:
+            patch.stop()
+        cls.storage_settings.disable()
+
+
 class PermissionTestMixin:
     user_settings = {
         'competitor': {
@@ -120,8 +120,8 @@ class UserDetailsSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         profile_data = validated_data.pop('profile')
 
-        profile_data['year_of_graduation'] = Grade.objects.get(
-            pk=profile_data.get('grade')).get_year_of_graduation_by_date()
+        profile_data['year_of_graduation'] = Grade.get_by_pk(
+            profile_data.get('grade')).get_year_of_graduation_by_date()
         # Profile by mal byť stále vytvorený pomocou post_save User signálu.
         # Pre prípad, že sa tak nestalo, vytvorí sa Profile
         if not instance.profile:
@@ -227,7 +227,7 @@ class RegisterSerializer(UserDetailsSerializer):
         self.cleaned_data = self.get_cleaned_data()
         adapter.save_user(request, user, self)
         profile_data = self.validated_data['profile']
-        grade = Grade.objects.get(pk=profile_data['grade'])
+        grade = Grade.get_by_pk(profile_data['grade'])
 
         Profile.objects.create(user=user,
                                first_name=profile_data['first_name'],
@@ -98,6 +98,8 @@ DATABASES = {
     }
 }
 
+TEST_RUNNER = 'base.test_runner.TestRunner'
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
@@ -178,6 +180,11 @@ MEDIA_URL = 'media/'
 PRIVATE_STORAGE_ROOT = os.path.join(BASE_DIR, 'protected_media/')
 SENDFILE_ROOT = PRIVATE_STORAGE_ROOT
 SENDFILE_BACKEND = "django_sendfile.backends.simple"
+# Typ nahraného súboru sa určí a limit veľkosti stráži už počas nahrávania
+FILE_UPLOAD_HANDLERS = [
+    'base.uploads.ValidatingMemoryFileUploadHandler',
+    'base.uploads.ValidatingTemporaryFileUploadHandler',
+]
 # Email backend
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -190,3 +197,4 @@ MANAGERS = [('Web', 'webmaster@strom.sk'), ]
 DEFAULT_FROM_EMAIL = 'noreply@strom.sk'    # z tade sa odosielaju maily
 EMAIL_ALERT = 'otazky.strom@strom.sk'  # tu sa prijimaju maily
 OTHER_SCHOOL_CODE = 0
+NO_SCHOOL_CODE = 1
@@ -3,12 +3,15 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from competition.views import ReferenceDataView
+
 api_urlpatterns = [
     path('user/', include('user.urls')),
     path('competition/', include('competition.urls')),
     path('cms/', include('cms.urls')),
     path('personal/', include('personal.urls')),
     path('protected/', include('downloads.urls')),
+    path('reference-data/', ReferenceDataView.as_view(), name='reference-data'),
 ]
 
 urlpatterns = [